@@ -0,0 +1,14 @@
+"""Shared-secret check for admin-only routes and request flags."""
+import hmac
+import os
+from typing import Optional
+
+
+def admin_token_configured() -> bool:
+    return bool(os.environ.get("ADMIN_TOKEN"))
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """True when ADMIN_TOKEN is set and `token` matches it"""
+    expected = os.environ.get("ADMIN_TOKEN")
+    return bool(expected and token and hmac.compare_digest(token, expected))
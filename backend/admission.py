@@ -0,0 +1,161 @@
+"""Admission control: per-lane concurrency limits with bounded queues.
+
+Routes are split into lanes. "heavy" covers exports, bulk writes and batch
+tasks; "interactive" covers everything else. Each lane admits a fixed number
+of concurrent requests and queues a bounded number more. Once the queue is
+full, or a request has waited too long, the request is rejected with
+429 and Retry-After, so one large export cannot stall the interactive routes.
+The lane is published in a context variable, so database work can be
+routed to a reserved connection pool as well.
+"""
+import asyncio
+import json
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from .metrics import Counter, Gauge, route_template
+
+INTERACTIVE = "interactive"
+HEAVY = "heavy"
+
+# Lane of the request being served; empty outside admission-controlled requests
+current_lane: ContextVar[str] = ContextVar("current_lane", default="")
+
+ADMISSION_ACTIVE = Gauge("admission_active_requests", "Requests admitted and running", ["lane"])
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Requests waiting for a slot", ["lane"])
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests rejected with 429", ["lane", "reason"])
+
+
+@dataclass
+class LaneSettings:
+    concurrency: int
+    queue_limit: int
+    queue_timeout_seconds: float
+    retry_after_seconds: int
+
+    @classmethod
+    def from_env(cls, lane: str, concurrency: int, queue_limit: int,
+                 queue_timeout_seconds: float, retry_after_seconds: int) -> "LaneSettings":
+        """Read ADMISSION_<LANE>_* overrides of the given defaults"""
+        prefix = f"ADMISSION_{lane.upper()}_"
+        return cls(
+            concurrency=int(os.environ.get(prefix + "CONCURRENCY", concurrency)),
+            queue_limit=int(os.environ.get(prefix + "QUEUE_LIMIT", queue_limit)),
+            queue_timeout_seconds=float(os.environ.get(prefix + "QUEUE_TIMEOUT_SECONDS", queue_timeout_seconds)),
+            retry_after_seconds=int(os.environ.get(prefix + "RETRY_AFTER_SECONDS", retry_after_seconds)),
+        )
+
+
+class AdmissionLane:
+    """A bounded semaphore plus a bounded wait queue"""
+
+    def __init__(self, name: str, settings: LaneSettings):
+        self.name = name
+        self.settings = settings
+        self.active = 0
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one loop; test clients and benchmarks may start several
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.settings.concurrency)
+            self.active = self.waiting = 0
+        return self._semaphore
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; returns the rejection reason when the request should get a 429"""
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            if self.waiting >= self.settings.queue_limit:
+                return "queue_full"
+            self.waiting += 1
+            ADMISSION_QUEUED.inc((self.name,))
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.settings.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                return "queue_timeout"
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUED.dec((self.name,))
+        else:
+            await semaphore.acquire()
+        self.active += 1
+        ADMISSION_ACTIVE.inc((self.name,))
+        return None
+
+    def release(self):
+        self.active -= 1
+        ADMISSION_ACTIVE.dec((self.name,))
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "concurrency": self.settings.concurrency,
+            "queue_limit": self.settings.queue_limit,
+            "active": self.active,
+            "waiting": self.waiting,
+        }
+
+
+def default_lanes() -> Dict[str, AdmissionLane]:
+    return {
+        INTERACTIVE: AdmissionLane(INTERACTIVE, LaneSettings.from_env(INTERACTIVE, 64, 256, 10.0, 1)),
+        HEAVY: AdmissionLane(HEAVY, LaneSettings.from_env(HEAVY, 2, 4, 30.0, 10)),
+    }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests through their route's lane
+
+    `heavy_routes` and `exempt_routes` hold (method, route template) pairs;
+    exempt routes such as health probes are never queued or rejected.
+    """
+
+    def __init__(self, app, lanes: Dict[str, AdmissionLane], heavy_routes: Set[Tuple[str, str]],
+                 exempt_routes: Set[Tuple[str, str]] = frozenset()):
+        self.app = app
+        self.lanes = lanes
+        self.heavy_routes = heavy_routes
+        self.exempt_routes = exempt_routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = (scope["method"], route_template(scope))
+        if route in self.exempt_routes or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.lanes[HEAVY if route in self.heavy_routes else INTERACTIVE]
+        rejection = await lane.acquire()
+        if rejection is not None:
+            ADMISSION_REJECTED.inc((lane.name, rejection))
+            await self._reject(send, lane)
+            return
+
+        token = current_lane.set(lane.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_lane.reset(token)
+            lane.release()
+
+    async def _reject(self, send, lane: AdmissionLane):
+        body = json.dumps({"detail": f"Too many concurrent {lane.name} requests; retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(lane.settings.retry_after_seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,256 @@
+"""Hot/cold tiering of old sold and archived items.
+
+Sold and archived items that have not changed for ARCHIVE_AFTER_DAYS are
+moved from `vinted_items` to `vinted_items_archive`, so the hot collection,
+its indexes and the scans over it only cover items that are still in play.
+Each (seller, month) of archived items is summarized in `archived_item_rollups`
+(counts, revenue, profit, ROI and days-to-sell sums). The dashboard adds
+those sums to its hot totals, and the item event rollups stay where they are.
+Reads only touch the archive when asked to with include_archived=true.
+
+A background task in every worker runs the job each ARCHIVE_INTERVAL_SECONDS,
+and a lease in `job_leases` lets one worker at a time do it. Every step can be
+repeated safely. Items are upserted into the archive, rollups are recomputed
+from the archive rather than incremented, and only then are the hot copies
+deleted, each guarded by the version that was archived. An item modified in
+between keeps its hot copy and loses the archived one. For the moment
+between the rollup refresh and the delete, the dashboard may count a batch
+twice.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+import numpy as np
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from .item_metrics import ITEM_COST_FIELDS, item_metric_columns
+from .metrics import Counter
+from .models import ItemStatus
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "vinted_items_archive"
+ARCHIVE_ROLLUP_COLLECTION = "archived_item_rollups"
+JOB_LEASE_COLLECTION = "job_leases"
+ARCHIVAL_JOB = "item_archival"
+
+ARCHIVABLE_STATUSES = [ItemStatus.SOLD, ItemStatus.ARCHIVED]
+
+# Archive-only bookkeeping left out of item responses
+ARCHIVE_ITEM_PROJECTION = {"_id": 0, "rollup_month": 0}
+
+ROLLUP_SOURCE_PROJECTION = {
+    "_id": 0, "status": 1, "sold_price": 1, "listed_at": 1, "sold_at": 1, **{field: 1 for field in ITEM_COST_FIELDS}
+}
+ROLLUP_SUM_FIELDS = (
+    "items", "sold_items", "revenue", "profit", "roi_sum", "roi_count", "days_to_sell_sum", "days_to_sell_count"
+)
+
+ITEMS_ARCHIVED = Counter("items_archived_total", "Items moved from the hot collection to the archive")
+ARCHIVE_CONFLICTS = Counter("archive_conflicts_total", "Items left hot because they changed while being archived")
+ARCHIVAL_RUNS = Counter("archival_runs_total", "Archival job runs", ["outcome"])
+
+
+@dataclass
+class ArchivalSettings:
+    enabled: bool
+    after_days: int
+    interval_seconds: float
+    batch_size: int
+    lease_seconds: float
+
+    @classmethod
+    def from_env(cls) -> "ArchivalSettings":
+        return cls(
+            enabled=os.environ.get("ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes"),
+            after_days=int(os.environ.get("ARCHIVE_AFTER_DAYS", 365)),
+            interval_seconds=float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600)),
+            batch_size=int(os.environ.get("ARCHIVE_BATCH_SIZE", 500)),
+            # Longer than a run takes; a crashed worker's lease expires after this
+            lease_seconds=float(os.environ.get("ARCHIVE_LEASE_SECONDS", 600)),
+        )
+
+
+def month_start(at: datetime) -> datetime:
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_month(item: dict) -> datetime:
+    """The month an archived item is summarized under: its sale, else its last change"""
+    return month_start(item.get("sold_at") or item.get("updated_at") or item.get("created_at") or datetime.utcnow())
+
+
+def summarize(items: List[dict]) -> dict:
+    """Rollup sums for archived items, using the same metrics as the dashboard"""
+    sold = [item for item in items if item.get("status") == ItemStatus.SOLD and item.get("sold_price") is not None]
+    summary = {field: 0 for field in ROLLUP_SUM_FIELDS}
+    summary["items"] = len(items)
+    summary["sold_items"] = sum(1 for item in items if item.get("status") == ItemStatus.SOLD)
+    if sold:
+        columns = item_metric_columns(sold)
+        roi = columns["roi"][~np.isnan(columns["roi"])]
+        days = columns["days_to_sell"][~np.isnan(columns["days_to_sell"])]
+        summary.update(
+            revenue=float(columns["sold_price"].sum()),
+            profit=float(columns["profit"].sum()),
+            roi_sum=float(roi.sum()),
+            roi_count=len(roi),
+            days_to_sell_sum=float(days.sum()),
+            days_to_sell_count=len(days),
+        )
+    return summary
+
+
+async def create_archive_indexes(db):
+    await db[ARCHIVE_COLLECTION].create_index([("seller_id", ASCENDING), ("id", ASCENDING)], unique=True)
+    await db[ARCHIVE_COLLECTION].create_index([("seller_id", ASCENDING), ("status", ASCENDING)])
+    # Order of include_archived item pages
+    await db[ARCHIVE_COLLECTION].create_index([("seller_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)])
+    await db[ARCHIVE_COLLECTION].create_index([("seller_id", ASCENDING), ("rollup_month", ASCENDING)])
+    await db[ARCHIVE_ROLLUP_COLLECTION].create_index([("seller_id", ASCENDING), ("month", ASCENDING)], unique=True)
+    await db[JOB_LEASE_COLLECTION].create_index([("name", ASCENDING)], unique=True)
+
+
+async def archived_totals(db, seller_id: str, current_month: datetime) -> dict:
+    """A seller's rollup sums over all archived months, plus the current month's on its own"""
+    totals = {field: 0 for field in ROLLUP_SUM_FIELDS}
+    totals["current_month"] = {field: 0 for field in ROLLUP_SUM_FIELDS}
+    async for rollup in db[ARCHIVE_ROLLUP_COLLECTION].find({"seller_id": seller_id}, {"_id": 0}):
+        for field in ROLLUP_SUM_FIELDS:
+            totals[field] += rollup.get(field, 0)
+            if rollup["month"] == current_month:
+                totals["current_month"][field] += rollup.get(field, 0)
+    return totals
+
+
+class ItemArchiver:
+    """Moves cold items to the archive in the background"""
+
+    def __init__(self, settings: ArchivalSettings):
+        self.settings = settings
+        self.owner = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        if self.settings.enabled:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db):
+        while True:
+            try:
+                if await self._acquire_lease(db):
+                    try:
+                        await self.archive(db)
+                        ARCHIVAL_RUNS.inc(("success",))
+                    finally:
+                        await self._release_lease(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ARCHIVAL_RUNS.inc(("failure",))
+                logger.error(f"Error archiving items: {str(e)}")
+            await asyncio.sleep(self.settings.interval_seconds)
+
+    async def _acquire_lease(self, db) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db[JOB_LEASE_COLLECTION].update_one(
+                {"name": ARCHIVAL_JOB, "expires_at": {"$lt": now}},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.settings.lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by another worker
+            return False
+
+    async def _release_lease(self, db):
+        await db[JOB_LEASE_COLLECTION].update_one(
+            # Already in the past however soon the next acquire runs; stored dates are only millisecond precise
+            {"name": ARCHIVAL_JOB, "owner": self.owner}, {"$set": {"expires_at": datetime.min}}
+        )
+
+    async def archive(self, db, seller_ids: Optional[Iterable[str]] = None) -> int:
+        """Archive every due item of the given sellers (all sellers by default); returns the number moved"""
+        if seller_ids is None:
+            seller_ids = await db.vinted_items.distinct("seller_id")
+        cutoff = datetime.utcnow() - timedelta(days=self.settings.after_days)
+        archived = 0
+        for seller_id in seller_ids:
+            query = {"seller_id": seller_id, "status": {"$in": ARCHIVABLE_STATUSES}, "$or": [
+                {"updated_at": {"$lt": cutoff}},
+                # Items written before updated_at existed age from their creation
+                {"updated_at": None, "created_at": {"$lt": cutoff}},
+            ]}
+            skip = 0
+            while True:
+                # Conflicting items stay hot and still match, so page past them
+                batch = await db.vinted_items.find(query, {"_id": 0}).sort("id", ASCENDING).skip(skip).limit(
+                    self.settings.batch_size
+                ).to_list(self.settings.batch_size)
+                if not batch:
+                    break
+                moved = await self._archive_batch(db, seller_id, batch)
+                archived += moved
+                skip += len(batch) - moved
+        return archived
+
+    async def _archive_batch(self, db, seller_id: str, items: List[dict]) -> int:
+        now = datetime.utcnow()
+        await db[ARCHIVE_COLLECTION].bulk_write([
+            ReplaceOne(
+                {"seller_id": seller_id, "id": item["id"]},
+                {**item, "archived_at": now, "rollup_month": rollup_month(item)},
+                upsert=True
+            )
+            for item in items
+        ], ordered=False)
+        await self._refresh_rollups(db, seller_id, {rollup_month(item) for item in items})
+
+        result = await db.vinted_items.bulk_write([
+            DeleteOne({"seller_id": seller_id, "id": item["id"],
+                       **({"version": {"$in": [0, None]}} if not item.get("version") else {"version": item["version"]})})
+            for item in items
+        ], ordered=False)
+        if result.deleted_count < len(items):
+            ids = [item["id"] for item in items]
+            kept = {item["id"] async for item in db.vinted_items.find(
+                {"seller_id": seller_id, "id": {"$in": ids}}, {"_id": 0, "id": 1}
+            )}
+            await db[ARCHIVE_COLLECTION].delete_many({"seller_id": seller_id, "id": {"$in": list(kept)}})
+            await self._refresh_rollups(db, seller_id, {rollup_month(item) for item in items if item["id"] in kept})
+            ARCHIVE_CONFLICTS.inc(amount=len(kept))
+        ITEMS_ARCHIVED.inc(amount=result.deleted_count)
+        return result.deleted_count
+
+    async def _refresh_rollups(self, db, seller_id: str, months: Set[datetime]):
+        """Recompute the rollups of the given months from the archive"""
+        for month in months:
+            items = await db[ARCHIVE_COLLECTION].find(
+                {"seller_id": seller_id, "rollup_month": month}, ROLLUP_SOURCE_PROJECTION
+            ).to_list(None)
+            key = {"seller_id": seller_id, "month": month}
+            if items:
+                await db[ARCHIVE_ROLLUP_COLLECTION].replace_one(
+                    key, {**key, **summarize(items), "updated_at": datetime.utcnow()}, upsert=True
+                )
+            else:
+                await db[ARCHIVE_ROLLUP_COLLECTION].delete_one(key)
+
+
+item_archiver = ItemArchiver(ArchivalSettings.from_env())
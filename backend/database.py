@@ -0,0 +1,181 @@
+"""MongoDB connection settings, client construction and pool monitoring."""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from .admission import HEAVY, current_lane
+from .metrics import MONGO_POOL_CHECKOUT_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MongoSettings:
+    url: str
+    db_name: str
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: int = 300000
+    connect_timeout_ms: int = 10000
+    server_selection_timeout_ms: int = 10000
+    wait_queue_timeout_ms: int = 10000
+    compressors: str = ""
+    warmup_connections: int = 0
+    # Separate pool for heavy-lane requests; 0 shares the main pool
+    heavy_pool_size: int = 10
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        """Read settings from the environment; MONGO_URL and DB_NAME are required"""
+        missing = [name for name in ("MONGO_URL", "DB_NAME") if not os.environ.get(name)]
+        if missing:
+            raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+
+        min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+        return cls(
+            url=os.environ["MONGO_URL"],
+            db_name=os.environ["DB_NAME"],
+            max_pool_size=int(os.environ.get("MONGO_MAX_POOL_SIZE", 100)),
+            min_pool_size=min_pool_size,
+            max_idle_time_ms=int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 300000)),
+            connect_timeout_ms=int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 10000)),
+            server_selection_timeout_ms=int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)),
+            wait_queue_timeout_ms=int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+            compressors=os.environ.get("MONGO_COMPRESSORS", ""),
+            warmup_connections=int(os.environ.get("MONGO_WARMUP_CONNECTIONS", min_pool_size)),
+            heavy_pool_size=int(os.environ.get("MONGO_HEAVY_POOL_SIZE", 10)),
+        )
+
+    def heavy_pool(self) -> "MongoSettings":
+        """Settings for the reserved heavy-lane client"""
+        return replace(self, max_pool_size=self.heavy_pool_size, min_pool_size=0, warmup_connections=0)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by pymongo pool events
+
+    Events arrive on pymongo's threads, so counters are updated under a lock.
+    A checkout starts and finishes on the same thread, which is how checkout
+    wait times are measured.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self._lock = threading.Lock()
+        self._checkout = threading.local()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkout_failures": self.checkout_failures,
+                "saturation": self.checked_out / self.max_pool_size if self.max_pool_size else 0.0,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def _record_checkout_wait(self, outcome: str):
+        started = getattr(self._checkout, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe((outcome,), time.perf_counter() - started)
+            self._checkout.started = None
+
+    def connection_check_out_started(self, event):
+        self._checkout.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        self._record_checkout_wait("failed")
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self._record_checkout_wait("ok")
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+
+def create_client(settings: MongoSettings, listeners: Optional[list] = None) -> AsyncIOMotorClient:
+    """Build a Motor client with the configured pool settings"""
+    options = {
+        "maxPoolSize": settings.max_pool_size,
+        "minPoolSize": settings.min_pool_size,
+        "maxIdleTimeMS": settings.max_idle_time_ms,
+        "connectTimeoutMS": settings.connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.server_selection_timeout_ms,
+        "waitQueueTimeoutMS": settings.wait_queue_timeout_ms,
+    }
+    if settings.compressors:
+        options["compressors"] = settings.compressors
+    if listeners:
+        options["event_listeners"] = listeners
+    return AsyncIOMotorClient(settings.url, **options)
+
+
+async def warm_up(client: AsyncIOMotorClient, connections: int):
+    """Open pool connections ahead of traffic with concurrent pings"""
+    await asyncio.gather(*[client.admin.command("ping") for _ in range(max(1, connections))])
+
+
+class LaneRoutedDatabase:
+    """Database handle that sends heavy-lane requests to a reserved pool
+
+    Exports, bulk writes and batch tasks run on their own client, so they
+    cannot take every connection from the interactive routes. The lane is
+    read from the admission context of the request doing the work.
+    """
+
+    def __init__(self, interactive, heavy):
+        self.interactive = interactive
+        self.heavy = heavy
+
+    def _current(self):
+        return self.heavy if current_lane.get() == HEAVY else self.interactive
+
+    def __getattr__(self, name):
+        return getattr(self._current(), name)
+
+    def __getitem__(self, name):
+        return self._current()[name]
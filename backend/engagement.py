@@ -0,0 +1,152 @@
+"""Write-behind buffer for high-frequency engagement counters.
+
+Scrapers report views, likes, watchers and messages as deltas many times a
+minute. Instead of one item write per report, deltas are summed per item in
+memory and flushed periodically, or as soon as enough items are pending, as
+one $inc bulk write. Increments commute, so coalescing them loses nothing.
+A failed flush puts its deltas back for the next attempt, and the lifespan
+flushes whatever is left on shutdown. Deltas still in the buffer when a
+worker crashes are lost, which is the trade-off of write-behind.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .metrics import Counter, Gauge, Histogram, register_collector
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_FIELDS = ("views", "likes", "watchers", "messages")
+
+ENGAGEMENT_DELTAS = Counter("engagement_deltas_total", "Per-item engagement deltas accepted into the buffer")
+ENGAGEMENT_REJECTED = Counter("engagement_rejected_total", "Per-item engagement deltas rejected because the buffer was full")
+ENGAGEMENT_FLUSHES = Counter("engagement_flushes_total", "Engagement buffer flushes", ["outcome"])
+ENGAGEMENT_FLUSH_DURATION = Histogram("engagement_flush_duration_seconds", "Time to write one engagement flush")
+ENGAGEMENT_PENDING_ITEMS = Gauge("engagement_buffer_pending_items", "Items with unflushed engagement deltas")
+ENGAGEMENT_BUFFER_LAG = Gauge("engagement_buffer_lag_seconds", "Age of the oldest unflushed engagement delta")
+
+# (seller_id, item_id) -> {field: delta}
+PendingDeltas = Dict[Tuple[str, str], Dict[str, int]]
+
+
+@dataclass
+class EngagementSettings:
+    flush_interval_seconds: float
+    flush_max_items: int
+    buffer_max_items: int
+
+    @classmethod
+    def from_env(cls) -> "EngagementSettings":
+        return cls(
+            flush_interval_seconds=float(os.environ.get("ENGAGEMENT_FLUSH_INTERVAL_SECONDS", 1.0)),
+            # Flush early once this many items are pending
+            flush_max_items=int(os.environ.get("ENGAGEMENT_FLUSH_MAX_ITEMS", 1000)),
+            # Reject new items beyond this, e.g. while the database is down
+            buffer_max_items=int(os.environ.get("ENGAGEMENT_BUFFER_MAX_ITEMS", 50000)),
+        )
+
+
+class EngagementBuffer:
+    """Coalesces engagement deltas per item and flushes them through `writer`"""
+
+    def __init__(self, settings: EngagementSettings):
+        self.settings = settings
+        self._pending: PendingDeltas = {}
+        # Monotonic time the oldest pending delta arrived
+        self._oldest: Optional[float] = None
+        self._writer: Optional[Callable[[PendingDeltas], Awaitable]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, writer: Callable[[PendingDeltas], Awaitable]):
+        """Start flushing periodically through `writer`"""
+        self._writer = writer
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still pending"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"Dropping engagement deltas for {len(self._pending)} items that could not be flushed")
+
+    def pending_items(self) -> int:
+        return len(self._pending)
+
+    def lag_seconds(self) -> float:
+        return time.monotonic() - self._oldest if self._oldest is not None else 0.0
+
+    def add(self, seller_id: str, deltas: Dict[str, Dict[str, int]]) -> bool:
+        """Buffer {item_id: {field: delta}}; False when the buffer has no room for new items"""
+        new_items = sum(1 for item_id in deltas if (seller_id, item_id) not in self._pending)
+        if new_items and len(self._pending) + new_items > self.settings.buffer_max_items:
+            ENGAGEMENT_REJECTED.inc(amount=len(deltas))
+            return False
+        self._merge({(seller_id, item_id): fields for item_id, fields in deltas.items()})
+        ENGAGEMENT_DELTAS.inc(amount=len(deltas))
+        if self._wake is not None and len(self._pending) >= self.settings.flush_max_items:
+            self._wake.set()
+        return True
+
+    def _merge(self, pending: PendingDeltas):
+        for key, fields in pending.items():
+            totals = self._pending.setdefault(key, {})
+            for field, delta in fields.items():
+                totals[field] = totals.get(field, 0) + delta
+        if self._pending and self._oldest is None:
+            self._oldest = time.monotonic()
+
+    async def flush(self):
+        """Write the pending deltas; on failure they are merged back for the next flush"""
+        if self._writer is None:
+            return
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, oldest = self._pending, self._oldest
+            self._pending, self._oldest = {}, None
+            started = time.perf_counter()
+            try:
+                await self._writer(pending)
+                ENGAGEMENT_FLUSHES.inc(("success",))
+            except Exception as e:
+                logger.error(f"Error flushing engagement deltas: {str(e)}")
+                ENGAGEMENT_FLUSHES.inc(("failure",))
+                self._merge(pending)
+                # The retried deltas are as old as they were
+                self._oldest = min(oldest, self._oldest)
+            finally:
+                ENGAGEMENT_FLUSH_DURATION.observe((), time.perf_counter() - started)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.settings.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+
+engagement_buffer = EngagementBuffer(EngagementSettings.from_env())
+
+
+def _update_buffer_metrics():
+    ENGAGEMENT_PENDING_ITEMS.set((), engagement_buffer.pending_items())
+    ENGAGEMENT_BUFFER_LAG.set((), engagement_buffer.lag_seconds())
+
+
+register_collector(_update_buffer_metrics)
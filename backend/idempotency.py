@@ -0,0 +1,138 @@
+"""Idempotency keys for retried writes.
+
+A client that may retry a create sends an `Idempotency-Key` header. The first
+request with a key claims it in the `idempotency_keys` collection, runs, and
+stores its response there; replays of the key get the stored response without
+touching the items. A duplicate that arrives while the first request is still
+running waits for it to finish, so concurrent retries are serialized across
+workers. Keys expire through a TTL index on `created_at`, and are also
+treated as absent once past the TTL, because the TTL monitor only runs about
+once a minute.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_SECONDS", 86400))
+# A claim older than this is assumed to belong to a crashed request and may be taken over
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", 60))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Polling backoff while waiting for a concurrent duplicate
+_WAIT_INITIAL_SECONDS = 0.05
+_WAIT_MAX_SECONDS = 0.5
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+async def create_idempotency_indexes(collection):
+    await collection.create_index([("key", ASCENDING)], unique=True)
+    await collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+
+
+def request_fingerprint(payload) -> str:
+    """Hash of the request body, to detect a key reused for a different request
+
+    Only fields the client sent count; defaults such as generated ids and
+    timestamps differ between otherwise identical retries.
+    """
+    encoded = json.dumps(jsonable_encoder(payload, exclude_unset=True), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def derived_id(key: str, index: int = 0) -> str:
+    """Stable document id for the index-th record created under a key
+
+    A request that takes over a crashed claim recreates the same ids, so the
+    unique id index rejects whatever the crashed attempt already inserted.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"idempotency:{key}:{index}"))
+
+
+async def _claim(collection, key: str, fingerprint: str) -> Optional[dict]:
+    """Claim the key; returns the existing record when another request holds it"""
+    now = datetime.utcnow()
+    try:
+        await collection.insert_one({
+            "key": key, "fingerprint": fingerprint, "status": IN_PROGRESS,
+            "created_at": now, "locked_at": now,
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+
+    existing = await collection.find_one({"key": key}, {"_id": 0})
+    if existing is None:
+        # Expired and removed in between; claim again
+        return await _claim(collection, key, fingerprint)
+    expired = existing["created_at"] < now - timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    stale = (existing["status"] == IN_PROGRESS
+             and existing["locked_at"] < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT_SECONDS))
+    if expired or stale:
+        # Only one contender wins the conditional takeover
+        result = await collection.update_one(
+            {"key": key, "status": existing["status"], "locked_at": existing["locked_at"]},
+            {"$set": {"fingerprint": fingerprint, "status": IN_PROGRESS, "locked_at": now,
+                      **({"created_at": now} if expired else {})},
+             "$unset": {"response": ""}}
+        )
+        if result.modified_count:
+            return None
+        existing = await collection.find_one({"key": key}, {"_id": 0}) or existing
+    return existing
+
+
+async def run_idempotent(collection, scope: str, key: Optional[str], payload,
+                         handler: Callable[[Optional[str]], Awaitable]) -> Tuple[object, bool]:
+    """Run `handler` at most once per idempotency key
+
+    `handler` receives the scoped key (None without a header) and returns a
+    JSON-encodable response. Returns (response, replayed); a replayed response
+    is the stored JSON of the first run.
+    """
+    if key is None:
+        return await handler(None), False
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+
+    scoped_key = f"{scope}:{key}"
+    fingerprint = request_fingerprint(payload)
+    delay = _WAIT_INITIAL_SECONDS
+    waited = 0.0
+    while True:
+        existing = await _claim(collection, scoped_key, fingerprint)
+        if existing is None:
+            break
+        if existing["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if existing["status"] == COMPLETED:
+            return existing["response"], True
+        # A concurrent duplicate holds the key: wait for its response
+        if waited >= IDEMPOTENCY_LOCK_TIMEOUT_SECONDS:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                                headers={"Retry-After": "1"})
+        await asyncio.sleep(delay)
+        waited += delay
+        delay = min(delay * 2, _WAIT_MAX_SECONDS)
+
+    try:
+        response = await handler(scoped_key)
+    except Exception:
+        # Release the claim so the client's retry can run the request again
+        await collection.delete_one({"key": scoped_key, "status": IN_PROGRESS})
+        raise
+    await collection.update_one(
+        {"key": scoped_key},
+        {"$set": {"status": COMPLETED, "response": jsonable_encoder(response), "completed_at": datetime.utcnow()}}
+    )
+    return response, False
@@ -0,0 +1,137 @@
+"""Cross-worker cache invalidation over a capped collection.
+
+Write routes publish (cache, key) pairs to the `cache_invalidations` capped
+collection. Every worker tails it with a tailable await cursor and evicts the
+matching entries from its own in-process caches, so caches stay coherent when
+the API runs with several workers and no external broker is involved. The
+publishing worker evicts locally before writing the entry and skips its own
+entries while tailing.
+
+Whenever tailing has to be resumed the worker clears every registered cache,
+since it may have missed entries. The SQLite store has no tailable
+cursors and the bus is not started there, so publishing only evicts locally,
+which covers its single-process deployments.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_COLLECTION = "cache_invalidations"
+INVALIDATION_LOG_BYTES = int(os.environ.get("CACHE_INVALIDATION_LOG_BYTES", 4 * 1024 * 1024))
+INVALIDATION_LOG_MAX_ENTRIES = int(os.environ.get("CACHE_INVALIDATION_LOG_MAX_ENTRIES", 10000))
+# Back-off before re-opening the log or a dead or failed tailing cursor
+INVALIDATION_RETRY_SECONDS = 1.0
+
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "Cache entries evicted, by cache and where the write happened", ["cache", "source"]
+)
+
+# Evicts one key, or the whole cache when called with None
+Evictor = Callable[[Optional[str]], None]
+
+
+class InvalidationBus:
+    """Publishes cache invalidations and applies the ones other workers publish"""
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._evictors: Dict[str, Evictor] = {}
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, cache: str, evict: Evictor):
+        self._evictors[cache] = evict
+
+    def _evict(self, cache: str, key: Optional[str], source: str):
+        evict = self._evictors.get(cache)
+        if evict is not None:
+            evict(key)
+            CACHE_INVALIDATIONS.inc((cache, source))
+
+    def _evict_all(self):
+        for cache in self._evictors:
+            self._evict(cache, None, "resync")
+
+    async def start(self, db):
+        """Start tailing the capped log from its current end, in the background
+
+        Startup does not wait for the database: until the log can be opened,
+        publishing only evicts locally.
+        """
+        self._task = asyncio.create_task(self._run(db))
+
+    async def _open(self, db):
+        """Create the capped log if needed; returns the id of its newest entry"""
+        try:
+            await db.create_collection(
+                INVALIDATION_COLLECTION, capped=True, size=INVALIDATION_LOG_BYTES, max=INVALIDATION_LOG_MAX_ENTRIES
+            )
+            # A tailable cursor on an empty capped collection dies immediately
+            await db[INVALIDATION_COLLECTION].insert_one(self._entry("", None))
+        except CollectionInvalid:
+            pass
+        last = await db[INVALIDATION_COLLECTION].find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        self._collection = db[INVALIDATION_COLLECTION]
+        return last["_id"] if last else None
+
+    async def _run(self, db):
+        while True:
+            try:
+                last_id = await self._open(db)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation log unavailable: {str(e)}")
+                await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+        await self._tail(last_id)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._collection = None
+
+    def _entry(self, cache: str, key: Optional[str]) -> dict:
+        return {"cache": cache, "key": key, "origin": self.worker_id, "at": datetime.utcnow()}
+
+    async def publish(self, cache: str, key: Optional[str] = None):
+        """Evict `key` (or the whole cache) here and in every other worker"""
+        self._evict(cache, key, "local")
+        if self._collection is not None:
+            await self._collection.insert_one(self._entry(cache, key))
+
+    async def _tail(self, last_id):
+        while True:
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+                cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for entry in cursor:
+                        last_id = entry["_id"]
+                        if entry["origin"] != self.worker_id and entry["cache"]:
+                            self._evict(entry["cache"], entry["key"], "remote")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation tailing interrupted: {str(e)}")
+            # Entries may have been missed (and ObjectIds from other workers are not
+            # strictly ordered), so resume with empty caches
+            self._evict_all()
+            await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+
+invalidation_bus = InvalidationBus()
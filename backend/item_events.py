@@ -0,0 +1,208 @@
+"""Append-only item event log with hourly and daily rollups.
+
+Item writes overwrite views, likes, watchers, messages and listed_price in
+place, so the items themselves cannot tell how engagement developed or what
+a price drop did. Every item mutation therefore also appends an event to
+`item_events` (a time-series collection on MongoDB 5.0+, a plain collection
+elsewhere) holding the before/after values of the tracked fields. The same
+call folds the events into `item_rollups_hourly` and `item_rollups_daily`
+with $inc/$min/$max upserts, one document per seller, item and bucket, and
+analytics reads those compact rollups instead of scanning items or events.
+
+Recording is best effort: a failure is logged and counted but never fails the
+item write that caused it.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+ITEM_EVENTS_COLLECTION = "item_events"
+HOURLY = "hour"
+DAILY = "day"
+ROLLUP_COLLECTIONS = {HOURLY: "item_rollups_hourly", DAILY: "item_rollups_daily"}
+
+# Raw events and hourly rollups expire; daily rollups are kept
+ITEM_EVENT_RETENTION_DAYS = int(os.environ.get("ITEM_EVENT_RETENTION_DAYS", 180))
+HOURLY_ROLLUP_RETENTION_DAYS = int(os.environ.get("HOURLY_ROLLUP_RETENTION_DAYS", 90))
+
+EVENT_CREATED = "created"
+EVENT_UPDATED = "updated"
+EVENT_ARCHIVED = "archived"
+EVENT_RENEWED = "renewed"
+EVENT_DELETED = "deleted"
+EVENT_EXPENSE = "expense"
+EVENT_ENGAGEMENT = "engagement"
+
+# Counters whose changes are summed per bucket
+COUNTER_FIELDS = ("views", "likes", "watchers", "messages")
+# Fields whose before/after values are recorded on each event
+TRACKED_FIELDS = (*COUNTER_FIELDS, "listed_price", "sold_price", "status", "expenses_total")
+# Additive fields of a rollup bucket, summed when rollups are combined
+ROLLUP_SUM_FIELDS = ("events", *COUNTER_FIELDS, "expenses_total", "price_changes", "price_drops")
+
+ITEM_EVENTS_RECORDED = Counter("item_events_recorded_total", "Item events appended to the event log", ["type"])
+ITEM_EVENT_FAILURES = Counter("item_event_failures_total", "Item event batches that could not be recorded")
+
+
+async def create_item_event_collections(db):
+    """Create the time-series event collection and the rollup indexes"""
+    try:
+        await db.create_collection(
+            ITEM_EVENTS_COLLECTION,
+            timeseries={"timeField": "at", "metaField": "meta", "granularity": "minutes"},
+            expireAfterSeconds=ITEM_EVENT_RETENTION_DAYS * 86400,
+        )
+    except CollectionInvalid:
+        pass
+    except OperationFailure as e:
+        # Before MongoDB 5.0 the events go to a regular collection created on first insert
+        logger.warning(f"Time-series collections unavailable, storing item events in a regular collection: {str(e)}")
+    await db[ITEM_EVENTS_COLLECTION].create_index(
+        [("meta.seller_id", ASCENDING), ("meta.item_id", ASCENDING), ("at", ASCENDING)]
+    )
+    for collection in ROLLUP_COLLECTIONS.values():
+        await db[collection].create_index(
+            [("seller_id", ASCENDING), ("item_id", ASCENDING), ("bucket", ASCENDING)], unique=True
+        )
+        await db[collection].create_index([("seller_id", ASCENDING), ("bucket", ASCENDING)])
+    await db[ROLLUP_COLLECTIONS[HOURLY]].create_index(
+        [("bucket", ASCENDING)], expireAfterSeconds=HOURLY_ROLLUP_RETENTION_DAYS * 86400
+    )
+
+
+def item_event(seller_id: str, item_id: str, event_type: str, before: Optional[dict] = None,
+               after: Optional[dict] = None, deltas: Optional[Dict[str, float]] = None,
+               at: Optional[datetime] = None) -> dict:
+    """Build an event from an item's tracked fields before and after a write
+
+    Counter deltas are derived when the previous values are known (or the item
+    is new); writes that only know the new values record them without deltas.
+    """
+    known_before = before is not None or event_type == EVENT_CREATED
+    before = before or {}
+    changes = {}
+    for field in TRACKED_FIELDS:
+        if after is None or field not in after:
+            continue
+        old, new = before.get(field), after[field]
+        if old == new or (old is None and new is None):
+            continue
+        changes[field] = {"from": old, "to": new}
+
+    deltas = dict(deltas or {})
+    if known_before:
+        for field in COUNTER_FIELDS:
+            if field in changes:
+                delta = (changes[field]["to"] or 0) - (changes[field]["from"] or 0)
+                if delta:
+                    deltas[field] = delta
+    return {
+        "at": at or datetime.utcnow(),
+        "meta": {"seller_id": seller_id, "item_id": item_id},
+        "type": event_type,
+        "changes": changes,
+        "deltas": deltas,
+    }
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    if granularity == DAILY:
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def _fold(rollup: dict, event: dict):
+    """Add one event to a pending rollup update"""
+    inc, low, high, last = rollup["$inc"], rollup["$min"], rollup["$max"], rollup["$set"]
+    inc["events"] = inc.get("events", 0) + 1
+    inc[f"types.{event['type']}"] = inc.get(f"types.{event['type']}", 0) + 1
+    for field, delta in event["deltas"].items():
+        inc[field] = inc.get(field, 0) + delta
+
+    price = event["changes"].get("listed_price")
+    if price is not None and price["to"] is not None:
+        low["min_price"] = min(low.get("min_price", price["to"]), price["to"])
+        high["max_price"] = max(high.get("max_price", price["to"]), price["to"])
+        last["last_price"] = price["to"]
+        if price["from"] is not None:
+            inc["price_changes"] = inc.get("price_changes", 0) + 1
+            if price["to"] < price["from"]:
+                inc["price_drops"] = inc.get("price_drops", 0) + 1
+    status = event["changes"].get("status")
+    if status is not None:
+        last["last_status"] = status["to"]
+    last["updated_at"] = max(last.get("updated_at", event["at"]), event["at"])
+
+
+def rollup_operations(events: List[dict], granularity: str) -> List[UpdateOne]:
+    """Upserts applying the events to their buckets, coalesced to one per bucket"""
+    rollups: Dict[Tuple, dict] = {}
+    for event in events:
+        meta = event["meta"]
+        key = (meta["seller_id"], meta["item_id"], bucket_start(event["at"], granularity))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = {"$inc": {}, "$min": {}, "$max": {}, "$set": {}}
+        _fold(rollup, event)
+    return [
+        UpdateOne(
+            {"seller_id": seller_id, "item_id": item_id, "bucket": bucket},
+            {op: fields for op, fields in rollup.items() if fields},
+            upsert=True
+        )
+        for (seller_id, item_id, bucket), rollup in rollups.items()
+    ]
+
+
+async def record_item_events(db, events: List[dict]):
+    """Append events to the log and apply them to the hourly and daily rollups"""
+    if not events:
+        return
+    try:
+        await db[ITEM_EVENTS_COLLECTION].insert_many(events, ordered=False)
+        for granularity, collection in ROLLUP_COLLECTIONS.items():
+            await db[collection].bulk_write(rollup_operations(events, granularity), ordered=False)
+        for event in events:
+            ITEM_EVENTS_RECORDED.inc((event["type"],))
+    except Exception as e:
+        ITEM_EVENT_FAILURES.inc()
+        logger.error(f"Error recording item events: {str(e)}")
+
+
+def rollup_window(granularity: str, date_from: Optional[datetime], date_to: Optional[datetime],
+                  default_days: int) -> dict:
+    """Bucket filter for a window, defaulting to the last `default_days` days"""
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - timedelta(days=default_days)
+    return {"$gte": bucket_start(date_from, granularity), "$lte": date_to}
+
+
+async def item_history(db, seller_id: str, item_id: str, granularity: str, window: dict, limit: int) -> List[dict]:
+    """One item's rollup buckets in time order"""
+    return await db[ROLLUP_COLLECTIONS[granularity]].find(
+        {"seller_id": seller_id, "item_id": item_id, "bucket": window}, {"_id": 0, "seller_id": 0}
+    ).sort("bucket", ASCENDING).to_list(limit)
+
+
+async def seller_engagement(db, seller_id: str, granularity: str, window: dict, limit: int) -> List[dict]:
+    """A seller's rollups summed over items, one entry per bucket"""
+    pipeline = [
+        {"$match": {"seller_id": seller_id, "bucket": window}},
+        {"$group": {
+            "_id": "$bucket",
+            "items": {"$sum": 1},
+            **{field: {"$sum": f"${field}"} for field in ROLLUP_SUM_FIELDS},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit},
+    ]
+    buckets = await db[ROLLUP_COLLECTIONS[granularity]].aggregate(pipeline).to_list(limit)
+    return [{"bucket": bucket.pop("_id"), **bucket} for bucket in buckets]
@@ -0,0 +1,135 @@
+"""Item profit, ROI and days-to-sell metrics.
+
+Single source of truth for item metrics: `compute_item_metrics` works
+column-wise over a batch of raw item documents with numpy, and
+`item_metrics_stage` is the equivalent `$addFields` stage for pipelines that
+compute the same values inside MongoDB. `profit_range_expr` filters on the
+same profit expression.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .models import VintedItem
+
+# Costs subtracted from the sold price, in the order they are added up
+ITEM_COST_FIELDS = ["purchase_price", "shipping_cost", "vinted_fee", "buyer_protection_fee", "expenses_total"]
+
+# Defaults for fields that older documents may be missing, so raw documents
+# have the same shape as a serialized VintedItem
+ITEM_FIELD_DEFAULTS = {
+    name: field.get_default(call_default_factory=True)
+    for name, field in VintedItem.model_fields.items()
+    if name not in ("id", "created_at", "updated_at")
+}
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 24 * 60 * 60
+MS_PER_DAY = SECONDS_PER_DAY * 1000
+
+
+def fill_item_defaults(items: List[dict]) -> List[dict]:
+    """Fill in missing fields on raw item documents in place"""
+    for item in items:
+        for name, default in ITEM_FIELD_DEFAULTS.items():
+            if name not in item:
+                item[name] = default
+    return items
+
+
+def item_metric_columns(items: List[dict]) -> Dict[str, np.ndarray]:
+    """Compute metric columns for a batch of raw item documents
+
+    Returns float arrays aligned with `items`: sold_price, profit, roi and
+    days_to_sell, with NaN where a metric does not apply (unsold items, no
+    purchase price, missing dates).
+    """
+    count = len(items)
+    sold_price = np.fromiter(
+        (np.nan if item.get("sold_price") is None else item["sold_price"] for item in items),
+        dtype=float, count=count
+    )
+    costs = np.zeros(count)
+    for field in ITEM_COST_FIELDS:
+        costs += np.fromiter((item.get(field) or 0.0 for item in items), dtype=float, count=count)
+    purchase_price = np.fromiter((item.get("purchase_price") or 0.0 for item in items), dtype=float, count=count)
+
+    profit = sold_price - costs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(purchase_price > 0, profit / purchase_price * 100, np.nan)
+
+    # Seconds since the epoch; far cheaper to build than a datetime64 array
+    listed_at = np.fromiter(
+        (np.nan if not item.get("listed_at") else (item["listed_at"] - EPOCH).total_seconds() for item in items),
+        dtype=float, count=count
+    )
+    sold_at = np.fromiter(
+        (np.nan if not item.get("sold_at") else (item["sold_at"] - EPOCH).total_seconds() for item in items),
+        dtype=float, count=count
+    )
+    days_to_sell = np.floor((sold_at - listed_at) / SECONDS_PER_DAY)
+    days_to_sell[np.isnan(sold_price)] = np.nan
+
+    return {"sold_price": sold_price, "profit": profit, "roi": roi, "days_to_sell": days_to_sell}
+
+
+def compute_item_metrics(items: List[dict]) -> List[dict]:
+    """Set profit_margin, roi_percentage and days_to_sell on raw item documents in place
+
+    Only sold items get metrics; other items keep whatever values they have.
+    """
+    if not items:
+        return items
+    columns = item_metric_columns(items)
+    sold = ~np.isnan(columns["sold_price"])
+    for index in np.flatnonzero(sold).tolist():
+        item = items[index]
+        item["profit_margin"] = float(columns["profit"][index])
+        roi = columns["roi"][index]
+        if not np.isnan(roi):
+            item["roi_percentage"] = float(roi)
+        days = columns["days_to_sell"][index]
+        if not np.isnan(days):
+            item["days_to_sell"] = int(days)
+    return items
+
+
+def _is_sold_expr() -> dict:
+    return {"$ne": [{"$ifNull": ["$sold_price", None]}, None]}
+
+
+def _profit_expr() -> dict:
+    costs = {"$add": [{"$ifNull": [f"${field}", 0]} for field in ITEM_COST_FIELDS]}
+    return {"$subtract": ["$sold_price", costs]}
+
+
+def item_metrics_stage() -> dict:
+    """$addFields stage computing the same metrics as compute_item_metrics inside MongoDB"""
+    is_sold = _is_sold_expr()
+    profit = _profit_expr()
+    return {"$addFields": {
+        "profit_margin": {"$cond": [is_sold, profit, "$profit_margin"]},
+        "roi_percentage": {"$cond": [
+            {"$and": [is_sold, {"$gt": ["$purchase_price", 0]}]},
+            {"$multiply": [{"$divide": [profit, "$purchase_price"]}, 100]},
+            "$roi_percentage"
+        ]},
+        "days_to_sell": {"$cond": [
+            {"$and": [is_sold, {"$ne": [{"$ifNull": ["$listed_at", None]}, None]},
+                      {"$ne": [{"$ifNull": ["$sold_at", None]}, None]}]},
+            {"$floor": {"$divide": [{"$subtract": ["$sold_at", "$listed_at"]}, MS_PER_DAY]}},
+            "$days_to_sell"
+        ]}
+    }}
+
+
+def profit_range_expr(min_profit: Optional[float], max_profit: Optional[float]) -> dict:
+    """$expr matching sold items whose profit, as item_metric_columns computes it, is within the bounds"""
+    profit = _profit_expr()
+    conditions = [_is_sold_expr()]
+    if min_profit is not None:
+        conditions.append({"$gte": [profit, min_profit]})
+    if max_profit is not None:
+        conditions.append({"$lte": [profit, max_profit]})
+    return {"$and": conditions}
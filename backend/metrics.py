@@ -0,0 +1,266 @@
+"""In-process Prometheus metrics.
+
+Counters, gauges and histograms rendered in the Prometheus text exposition
+format by the /api/metrics route; no client library or external service is
+involved. Values are updated from both the event loop and pymongo's
+monitoring threads, so every metric guards its samples with a lock.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], None]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+        _metrics.append(self)
+
+    def value(self, labels: Tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        labels = tuple(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        labels = tuple(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple = (), value: float = 0):
+        with self._lock:
+            self._values[tuple(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, labels: Tuple = (), value: float = 0.0):
+        labels = tuple(labels)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, labels: Tuple = ()) -> int:
+        with self._lock:
+            series = self._series.get(tuple(labels))
+            return series[-1] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{label_text} {series[-1]}")
+        return lines
+
+
+def register_collector(collector: Callable[[], None]):
+    """Run `collector` before every scrape, to refresh gauges read from elsewhere"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    for collector in _collectors:
+        collector()
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP routes
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", ["method", "route"])
+
+# "METHOD /route/template" of the request being served, for attributing database work
+current_route: ContextVar[str] = ContextVar("current_route", default="")
+
+
+def route_template(scope) -> str:
+    """The path template of the route a request will be dispatched to"""
+    template = scope.get("route_template")
+    if template is None:
+        template = "unmatched"
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", scope["path"])
+                break
+        # Cached on the scope for the other middlewares
+        scope["route_template"] = template
+    return template
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests
+
+    Latency runs until the last body chunk is sent, so streamed responses like
+    the CSV export are measured in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], route_template(scope))
+        current_route.set(" ".join(labels))
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(labels)
+            HTTP_REQUEST_DURATION.observe(labels + (str(status[0]),), time.perf_counter() - started)
+
+
+# MongoDB commands and connection pool
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"]
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error", ["collection", "command"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ["outcome"]
+)
+MONGO_POOL_CONNECTIONS = Gauge("mongo_pool_connections", "Connection pool state", ["state"])
+MONGO_POOL_SATURATION = Gauge("mongo_pool_saturation", "Checked-out connections as a share of maxPoolSize")
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times MongoDB commands per collection and command name"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.request_id, event.connection_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def _collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.request_id, event.connection_id), "")
+
+    def succeeded(self, event):
+        labels = (self._collection(event), event.command_name)
+        MONGO_COMMAND_DURATION.observe(labels, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = (self._collection(event), event.command_name)
+        MONGO_COMMAND_DURATION.observe(labels, event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.inc(labels)
+
+
+# Caches
+
+CACHE_REQUESTS = Counter("cache_requests_total", "In-process cache lookups", ["cache", "result"])
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Share of cache lookups served from the cache", ["cache"])
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+
+def _update_cache_hit_ratios():
+    with CACHE_REQUESTS._lock:
+        caches = {labels[0] for labels in CACHE_REQUESTS._values}
+    for cache in caches:
+        hits = CACHE_REQUESTS.value((cache, "hit"))
+        total = hits + CACHE_REQUESTS.value((cache, "miss"))
+        CACHE_HIT_RATIO.set((cache,), hits / total if total else 0.0)
+
+
+register_collector(_update_cache_hit_ratios)
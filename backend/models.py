@@ -4,6 +4,9 @@ from datetime import datetime
 from enum import Enum
 import uuid
 
+# Seller that owns requests without an X-Seller-Id header and documents written before multi-seller support
+DEFAULT_SELLER_ID = "default"
+
 class ItemStatus(str, Enum):
     ACTIVE = "active"
     SOLD = "sold"
@@ -27,6 +30,7 @@ class NotificationType(str, Enum):
 
 class VintedItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID  # Partition key; set from the X-Seller-Id header
     title: str
     description: Optional[str] = None
     category: str
@@ -58,6 +62,10 @@ class VintedItem(BaseModel):
     listed_at: Optional[datetime] = None
     sold_at: Optional[datetime] = None
     last_renewed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    
+    # Optimistic concurrency: incremented on every write
+    version: int = 0
     
     # Status and Tags
     status: ItemStatus = ItemStatus.DRAFT
@@ -68,20 +76,32 @@ class VintedItem(BaseModel):
     roi_percentage: Optional[float] = None
     days_to_sell: Optional[int] = None
     
+    # Expenses (denormalized from item_expenses, maintained with $inc)
+    expenses_total: float = 0.0
+    expenses_by_category: Dict[str, float] = {}
+    
     # Notifications
     renewal_reminder_sent: bool = False
     low_roi_alert_sent: bool = False
 
 class ItemExpense(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID
     item_id: str
     category: ExpenseCategory
     amount: float
     description: Optional[str] = None
     date: datetime = Field(default_factory=datetime.utcnow)
 
+class ItemExpenseUpdate(BaseModel):
+    category: Optional[ExpenseCategory] = None
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    date: Optional[datetime] = None
+
 class SalesAnalytics(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID
     month: int
     year: int
     total_sales: float = 0.0
@@ -95,6 +115,7 @@ class SalesAnalytics(BaseModel):
 
 class MarketTrend(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID
     brand: str
     category: str
     trend_percentage: float  # +25% = 25.0, -15% = -15.0
@@ -105,6 +126,7 @@ class MarketTrend(BaseModel):
 
 class Notification(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID
     type: NotificationType
     title: str
     message: str
@@ -114,6 +136,7 @@ class Notification(BaseModel):
 
 class ROITarget(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seller_id: str = DEFAULT_SELLER_ID
     target_percentage: float
     current_percentage: float = 0.0
     is_active: bool = True
@@ -173,6 +196,37 @@ class VintedItemUpdate(BaseModel):
     sold_at: Optional[datetime] = None
     last_renewed_at: Optional[datetime] = None
 
+class BulkItemUpdate(BaseModel):
+    item_ids: Optional[List[str]] = None
+    filter: Optional[ItemFilter] = None
+    patch: VintedItemUpdate = Field(default_factory=VintedItemUpdate)
+    renew: bool = False  # Set last_renewed_at and reset the renewal reminder
+
+class BulkItemSelection(BaseModel):
+    item_ids: Optional[List[str]] = None
+    filter: Optional[ItemFilter] = None
+    dry_run: bool = False
+
+class EngagementDelta(BaseModel):
+    item_id: str
+    # Counters only grow; a negative delta would let a scraper drive them below zero
+    views: int = Field(0, ge=0)
+    likes: int = Field(0, ge=0)
+    watchers: int = Field(0, ge=0)
+    messages: int = Field(0, ge=0)
+
+class EngagementBatch(BaseModel):
+    deltas: List[EngagementDelta]
+
+class PriceSuggestion(BaseModel):
+    basis: Optional[str] = None  # Comparable level used, e.g. "brand_category_condition"; None without sales
+    comparables: int = 0
+    suggested_price: Optional[float] = None
+    suggested_price_range: Optional[Dict[str, float]] = None  # {"min": 20.0, "max": 35.0}
+    price_percentiles: Dict[str, float] = {}
+    expected_days_to_sell: Optional[float] = None
+    days_to_sell_range: Optional[Dict[str, float]] = None
+
 class DashboardStats(BaseModel):
     total_items: int = 0
     active_listings: int = 0
@@ -0,0 +1,241 @@
+"""Price suggestions from a seller's sold comparables.
+
+Each worker keeps an in-memory index of every seller's recent sales. The index
+holds sorted sold prices and days-to-sell per key, at four levels from
+(brand, category, condition, size) down to category alone. A suggestion
+reads percentiles off the finest level with enough comparables, so a lookup
+is a few dictionary hits and list indexings.
+
+A seller's index is loaded on their first lookup, from the hot items and the
+archive alike, since archived sales are still sales. After that it is
+refreshed incrementally: sales written by this worker are applied as they
+happen, and other workers' sales are picked up by a background query for sold
+items updated since the last refresh. Entries are keyed by item id, so seeing
+an item twice replaces its earlier sample. Deleting sold items leaves nothing
+for that query to find, so deletes evict the seller's index in every worker
+through the invalidation bus and the next lookup loads it again.
+"""
+import asyncio
+import bisect
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .archival import ARCHIVE_COLLECTION
+from .models import ItemStatus
+
+# (level, *normalized values)
+Key = Tuple[str, ...]
+
+# Most to least specific; a level applies when all its fields are known
+LEVELS = (
+    ("brand_category_condition_size", ("brand", "category", "condition", "size")),
+    ("brand_category_condition", ("brand", "category", "condition")),
+    ("brand_category", ("brand", "category")),
+    ("category", ("category",)),
+)
+
+PRICING_ITEM_PROJECTION = {
+    "_id": 0, "id": 1, "status": 1, "brand": 1, "category": 1, "condition": 1, "size": 1,
+    "sold_price": 1, "listed_at": 1, "sold_at": 1, "updated_at": 1,
+}
+
+# Re-read this far behind the watermark, for writes committed out of timestamp order
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass
+class PricingSettings:
+    min_comparables: int
+    refresh_seconds: float
+    lookback_days: int
+
+    @classmethod
+    def from_env(cls) -> "PricingSettings":
+        return cls(
+            # Fewer sales than this at a level falls back to the next coarser one
+            min_comparables=int(os.environ.get("PRICING_MIN_COMPARABLES", 5)),
+            refresh_seconds=float(os.environ.get("PRICING_REFRESH_SECONDS", 60)),
+            lookback_days=int(os.environ.get("PRICING_LOOKBACK_DAYS", 365)),
+        )
+
+
+def _normalize(value) -> Optional[str]:
+    value = str(value).strip().lower() if value is not None else ""
+    return value or None
+
+
+def comparable_keys(fields: dict) -> List[Key]:
+    """The index keys a sale (or a query) with these fields belongs to"""
+    values = {name: _normalize(fields.get(name)) for name in ("brand", "category", "condition", "size")}
+    return [
+        (level, *(values[name] for name in names))
+        for level, names in LEVELS
+        if all(values[name] is not None for name in names)
+    ]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated percentile of a sorted, non-empty list"""
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class _Samples:
+    """Sorted sold prices and days-to-sell of one key"""
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.days: List[int] = []
+
+    def add(self, price: float, days: Optional[int]):
+        bisect.insort(self.prices, price)
+        if days is not None:
+            bisect.insort(self.days, days)
+
+    def remove(self, price: float, days: Optional[int]):
+        self.prices.pop(bisect.bisect_left(self.prices, price))
+        if days is not None:
+            self.days.pop(bisect.bisect_left(self.days, days))
+
+
+class _SellerIndex:
+    def __init__(self):
+        # item id -> (keys, price, days to sell)
+        self.entries: Dict[str, Tuple[List[Key], float, Optional[int]]] = {}
+        self.samples: Dict[Key, _Samples] = {}
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    def _remove(self, item_id: str):
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        keys, price, days = entry
+        for key in keys:
+            samples = self.samples[key]
+            samples.remove(price, days)
+            if not samples.prices:
+                del self.samples[key]
+
+    def apply(self, item: dict, since: datetime):
+        """Add, replace or remove an item's sample according to its current state"""
+        self._remove(item["id"])
+        price = item.get("sold_price")
+        sold_at = item.get("sold_at")
+        if item.get("status") != ItemStatus.SOLD or not price or (sold_at is not None and sold_at < since):
+            return
+        listed_at = item.get("listed_at")
+        days = (sold_at - listed_at).days if sold_at and listed_at and sold_at >= listed_at else None
+        keys = comparable_keys(item)
+        self.entries[item["id"]] = (keys, float(price), days)
+        for key in keys:
+            self.samples.setdefault(key, _Samples()).add(float(price), days)
+
+
+class PricingIndex:
+    """Per-seller percentile indexes of sold comparables"""
+
+    def __init__(self, settings: PricingSettings):
+        self.settings = settings
+        self._sellers: Dict[str, _SellerIndex] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _since(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.settings.lookback_days)
+
+    async def _refresh(self, db, seller_id: str, index: _SellerIndex):
+        """Apply sold items updated since the watermark (all recent sales on the first load)"""
+        since = self._since()
+        query = {"seller_id": seller_id, "status": ItemStatus.SOLD}
+        if index.watermark is not None:
+            query["updated_at"] = {"$gte": index.watermark - REFRESH_OVERLAP}
+        else:
+            query["sold_at"] = {"$gte": since}
+        # Archived items no longer change, so only the first load reads the archive
+        collections = [db.vinted_items] if index.watermark is not None else [db.vinted_items, db[ARCHIVE_COLLECTION]]
+        index.refreshed_at = time.monotonic()
+        for collection in collections:
+            async for item in collection.find(query, PRICING_ITEM_PROJECTION):
+                index.apply(item, since)
+                if item.get("updated_at") and (index.watermark is None or item["updated_at"] > index.watermark):
+                    index.watermark = item["updated_at"]
+        if index.watermark is None:
+            index.watermark = datetime.utcnow()
+
+    async def _seller_index(self, db, seller_id: str) -> _SellerIndex:
+        index = self._sellers.get(seller_id)
+        if index is None:
+            async with self._locks.setdefault(seller_id, asyncio.Lock()):
+                index = self._sellers.get(seller_id)
+                if index is None:
+                    index = _SellerIndex()
+                    await self._refresh(db, seller_id, index)
+                    self._sellers[seller_id] = index
+        elif (time.monotonic() - index.refreshed_at > self.settings.refresh_seconds
+              and (index.refresh_task is None or index.refresh_task.done())):
+            # Serve from the current index while catching up in the background
+            index.refresh_task = asyncio.create_task(self._refresh(db, seller_id, index))
+        return index
+
+    def evict(self, seller_id: Optional[str]):
+        """Drop a seller's index (every seller's with None); the next lookup loads it again"""
+        if seller_id is None:
+            self._sellers.clear()
+        else:
+            self._sellers.pop(seller_id, None)
+
+    def observe(self, seller_id: str, items: Iterable[dict]):
+        """Apply items this worker just wrote to an already loaded index"""
+        index = self._sellers.get(seller_id)
+        if index is None:
+            return
+        since = self._since()
+        for item in items:
+            index.apply(item, since)
+
+    async def suggest(self, db, seller_id: str, brand: Optional[str], category: str,
+                      condition: Optional[str], size: Optional[str]) -> dict:
+        """Price range and expected days to sell from the most specific level with enough sales"""
+        index = await self._seller_index(db, seller_id)
+        best = None
+        for key in comparable_keys({"brand": brand, "category": category, "condition": condition, "size": size}):
+            samples = index.samples.get(key)
+            if samples is None:
+                continue
+            if len(samples.prices) >= self.settings.min_comparables:
+                best = (key, samples)
+                break
+            if best is None or len(samples.prices) > len(best[1].prices):
+                # Too few sales here; keep the best-supported level in case no level has enough
+                best = (key, samples)
+        if best is None:
+            return {"basis": None, "comparables": 0}
+
+        key, samples = best
+        prices, days = samples.prices, samples.days
+        suggestion = {
+            "basis": key[0],
+            "comparables": len(prices),
+            "suggested_price": round(percentile(prices, 0.5), 2),
+            "suggested_price_range": {
+                "min": round(percentile(prices, 0.25), 2), "max": round(percentile(prices, 0.75), 2)
+            },
+            "price_percentiles": {
+                f"p{int(q * 100)}": round(percentile(prices, q), 2) for q in (0.1, 0.25, 0.5, 0.75, 0.9)
+            },
+        }
+        if days:
+            suggestion["expected_days_to_sell"] = round(percentile(days, 0.5), 1)
+            suggestion["days_to_sell_range"] = {
+                "min": round(percentile(days, 0.25), 1), "max": round(percentile(days, 0.75), 1)
+            }
+        return suggestion
+
+
+pricing_index = PricingIndex(PricingSettings.from_env())
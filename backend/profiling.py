@@ -0,0 +1,152 @@
+"""On-demand profiling of single requests.
+
+An admin sends `X-Profile: 1` (or `?profile=1`) together with a valid
+X-Admin-Token; that one request then runs under a stack sampler that snapshots
+the event loop thread every few milliseconds. Samples are stored as collapsed
+stacks (the flamegraph.pl / speedscope "folded" format) in a bounded ring
+buffer and served by the admin profile routes. Requests without the flag only
+pay for one header lookup.
+
+The event loop serves other requests concurrently, so samples taken while the
+profiled request is awaiting the database can include their frames too.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from .admin import admin_token_valid
+from .metrics import route_template
+
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", 20))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5.0))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[dict]:
+        """Newest first, without the stacks"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{k: v for k, v in p.items() if k != "stacks"} for p in reversed(profiles)]
+
+
+def collapsed_stacks(profile: dict) -> str:
+    """Profile samples in the folded format flamegraph.pl and speedscope read"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].most_common())
+
+
+profile_store = ProfileStore(PROFILE_BUFFER_SIZE)
+
+
+def _profile_requested(scope) -> bool:
+    if b"profile=" in scope.get("query_string", b""):
+        query = scope["query_string"].decode("latin-1")
+        if any(part in ("profile=1", "profile=true") for part in query.split("&")):
+            return True
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value in (b"1", b"true")
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-flagged requests
+
+    The profile id is returned in the X-Profile-Id response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        token = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"x-admin-token"), None)
+        if not admin_token_valid(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = [500]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            profile_store.add({
+                "id": profile_id,
+                "method": scope["method"],
+                "route": route_template(scope),
+                "path": scope["path"],
+                "status": status[0],
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": sum(sampler.stacks.values()),
+                "stacks": sampler.stacks,
+            })
@@ -1,55 +1,531 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from contextlib import asynccontextmanager
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pydantic import ValidationError
+import asyncio
+import numpy as np
 import logging
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import base64
+import hashlib
+import codecs
 import csv
 import io
 import json
 from .models import (
-    VintedItem, VintedItemCreate, VintedItemUpdate, ItemExpense, SalesAnalytics,
-    MarketTrend, Notification, ROITarget, BulkUpload, ItemFilter, DashboardStats,
-    ItemStatus, ExpenseCategory, NotificationType
+    VintedItem, VintedItemCreate, VintedItemUpdate, ItemExpense, ItemExpenseUpdate, SalesAnalytics,
+    MarketTrend, Notification, ROITarget, BulkUpload, BulkItemUpdate, BulkItemSelection, ItemFilter, DashboardStats,
+    ItemStatus, ExpenseCategory, NotificationType, EngagementBatch, PriceSuggestion, DEFAULT_SELLER_ID
+)
+from .admin import admin_token_configured, admin_token_valid
+from .admission import AdmissionMiddleware, default_lanes
+from .archival import (
+    ARCHIVE_COLLECTION, ARCHIVE_ITEM_PROJECTION, archived_totals, create_archive_indexes, item_archiver
+)
+from .database import LaneRoutedDatabase, MongoSettings, PoolStats, create_client, warm_up
+from .engagement import ENGAGEMENT_FIELDS, engagement_buffer
+from .idempotency import create_idempotency_indexes, derived_id, run_idempotent
+from .invalidation import invalidation_bus
+from .item_events import (
+    DAILY, EVENT_ARCHIVED, EVENT_CREATED, EVENT_DELETED, EVENT_ENGAGEMENT, EVENT_EXPENSE, EVENT_RENEWED, EVENT_UPDATED,
+    HOURLY,
+    create_item_event_collections, item_event, item_history, record_item_events, rollup_window, seller_engagement
+)
+from .pricing import pricing_index
+from .profiling import ProfilingMiddleware, collapsed_stacks, profile_store
+from .slow_queries import SlowQueryListener, SlowQueryLog, SlowQuerySettings
+from .sqlite_store import SQLiteDatabase
+from .storage import StorageSettings
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, MONGO_POOL_CONNECTIONS, MONGO_POOL_SATURATION, CommandMetrics,
+    RouteMetricsMiddleware, record_cache_lookup, register_collector, render_metrics
+)
+from .item_metrics import (
+    ITEM_COST_FIELDS, MS_PER_DAY, compute_item_metrics, fill_item_defaults, item_metric_columns, profit_range_expr
 )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Database handle, opened by the application lifespan so importing this
+# module does not need a database; client is only set for the Mongo backend
+client: Optional[AsyncIOMotorClient] = None
+heavy_client: Optional[AsyncIOMotorClient] = None
+db = None
+pool_stats: Optional[PoolStats] = None
+heavy_pool_stats: Optional[PoolStats] = None
+slow_query_log: Optional[SlowQueryLog] = None
+
+# Admission lanes: exports, bulk writes and batch tasks are "heavy" and get a
+# small concurrency limit plus their own Mongo pool; everything else is
+# "interactive". Probes and metrics are never queued or rejected.
+admission_lanes = default_lanes()
+HEAVY_ROUTES = {
+    ("GET", "/api/items/export/csv"),
+    ("POST", "/api/items/bulk-upload"),
+    ("POST", "/api/items/bulk-delete"),
+    ("POST", "/api/items/bulk-archive"),
+    ("POST", "/api/items/bulk-update"),
+    ("POST", "/api/items/queues/renewal/renew"),
+    ("POST", "/api/expenses/bulk"),
+    ("POST", "/api/tasks/check-renewals"),
+    ("POST", "/api/tasks/check-roi-alerts"),
+    ("POST", "/api/tasks/reconcile-expenses"),
+    ("POST", "/api/tasks/archive-items"),
+}
+ADMISSION_EXEMPT_ROUTES = {
+    ("GET", "/api/health/live"),
+    ("GET", "/api/health/ready"),
+    ("GET", "/api/metrics"),
+}
+
+# Readiness probe ping timeout
+HEALTH_PING_TIMEOUT_SECONDS = 2.0
+
+# Expense ingestion and pagination settings
+EXPENSE_INSERT_BATCH_SIZE = 1000
+EXPENSE_PAGE_MAX_LIMIT = 500
+
+# Expense reconciliation pages through items in batches and retries items written to meanwhile
+RECONCILE_BATCH_SIZE = 500
+RECONCILE_MAX_ATTEMPTS = 3
+
+# Projections for read paths: never ship the ObjectId, and leave the base64
+# photo gallery out of list views that only need the thumbnail
+ITEM_PROJECTION = {"_id": 0}
+ITEM_LEAN_PROJECTION = {"_id": 0, "photos": 0}
+
+# Item list order, shared by the hot and archive collections so include_archived
+# pages continue the same sequence; id breaks ties between equal timestamps
+ITEM_PAGE_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
+# Just enough of an item to evaluate conditional GET validators
+ITEM_VALIDATOR_PROJECTION = {"_id": 0, "id": 1, "version": 1, "updated_at": 1}
+
+# Fields needed to compute item metrics, for aggregate scans that skip the rest
+ITEM_METRICS_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "sold_price": 1, "listed_at": 1, "sold_at": 1,
+    **{field: 1 for field in ITEM_COST_FIELDS}
+}
+
+# Documents per batch when computing metrics over a scan
+ITEM_METRICS_BATCH_SIZE = 1000
+
+# Full-text search: relative field weights of the items text index
+ITEM_TEXT_INDEX_WEIGHTS = {"title": 10, "brand": 5, "tags": 3, "description": 1}
+SEARCH_PAGE_MAX_LIMIT = 100
+
+# Event rollup reads: default window per granularity and a cap on returned buckets
+HISTORY_DEFAULT_DAYS = {HOURLY: 7, DAILY: 90}
+HISTORY_MAX_BUCKETS = 2000
+
+# Work queues: active items are due for renewal this long after listing or their
+# last renewal, and count as low performing when listed this long with few views
+RENEWAL_AFTER_DAYS = 30
+LOW_PERFORMING_AFTER_DAYS = 60
+LOW_PERFORMING_MAX_VIEWS = 10
+QUEUE_PAGE_MAX_LIMIT = 100
+# Engagement per day listed ranks the low-performer queue, weakest first
+ENGAGEMENT_SCORE_WEIGHTS = {"views": 1, "likes": 2, "watchers": 3, "messages": 3}
+
+# Maximum number of items a single bulk item operation may touch
+BULK_UPDATE_MAX_ITEMS = 1000
+
+# Maximum number of deltas in one engagement report
+ENGAGEMENT_BATCH_MAX_DELTAS = 5000
+
+# Batching for filter-based deletes/archives so large purges don't monopolize the primary
+BULK_DELETE_BATCH_SIZE = 500
+BULK_BATCH_PAUSE_SECONDS = 0.05
+
+# ROI target used when none has been configured yet
+DEFAULT_ROI_TARGET_PERCENTAGE = 30.0
+
+# Low-ROI alert threshold while a seller has no ROI target stored; alerts never create the default target
+ROI_ALERT_FALLBACK_PERCENTAGE = 20.0
+
+# Process-local cache of each seller's active ROI target; writes invalidate it in
+# every worker through the invalidation bus
+roi_target_cache: Dict[str, ROITarget] = {}
+roi_target_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+def evict_roi_target(seller_id: Optional[str]):
+    if seller_id is None:
+        roi_target_cache.clear()
+    else:
+        roi_target_cache.pop(seller_id, None)
+
+invalidation_bus.register("roi_target", evict_roi_target)
+# Deleted sales cannot be found by the pricing index's incremental refresh
+invalidation_bus.register("pricing_index", pricing_index.evict)
+
+# Every document in these collections belongs to one seller; their indexes lead
+# with seller_id so each seller's queries stay within their own key range, and
+# {seller_id: 1, id: 1} is ready to serve as a shard key
+SELLER_SCOPED_COLLECTIONS = ("vinted_items", "item_expenses", "notifications", "roi_targets", "sales_analytics")
+SELLER_ID_BACKFILL_MIGRATION = "seller_id_backfill"
+SELLER_ID_MAX_LENGTH = 64
+
+# Global indexes replaced by seller-led ones; dropped on startup
+LEGACY_INDEXES = {
+    "vinted_items": ["id_1", "status_1", "items_text_search"],
+    "item_expenses": ["item_id_1", "date_-1_id_-1", "category_1_date_-1"],
+    "notifications": ["data.item_id_1"],
+    "roi_targets": ["is_active_1"],
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the configured storage backend on startup and close it on shutdown"""
+    global client, heavy_client, db, pool_stats, heavy_pool_stats, slow_query_log
+    storage = StorageSettings.from_env()
+    if storage.backend == "sqlite":
+        db = SQLiteDatabase(storage.sqlite_path)
+    else:
+        settings = MongoSettings.from_env()
+        pool_stats = PoolStats(settings.max_pool_size)
+        listeners = [pool_stats, CommandMetrics()]
+        slow_query_settings = SlowQuerySettings.from_env()
+        if slow_query_settings.enabled:
+            slow_query_log = SlowQueryLog(slow_query_settings)
+            listeners.append(SlowQueryListener(slow_query_log))
+        client = create_client(settings, listeners)
+        db = client[settings.db_name]
+        if settings.heavy_pool_size > 0:
+            heavy_settings = settings.heavy_pool()
+            heavy_pool_stats = PoolStats(heavy_settings.max_pool_size)
+            heavy_listeners = [heavy_pool_stats] + listeners[1:]
+            heavy_client = create_client(heavy_settings, heavy_listeners)
+            db = LaneRoutedDatabase(db, heavy_client[settings.db_name])
+        if slow_query_log is not None:
+            slow_query_log.attach(client, asyncio.get_running_loop())
+        try:
+            await warm_up(client, settings.warmup_connections)
+        except Exception as e:
+            # Keep starting; the readiness probe reports the database as unavailable
+            logging.error(f"Error warming up MongoDB connections: {str(e)}")
+    await create_indexes()
+    if client is not None:
+        await invalidation_bus.start(db)
+    engagement_buffer.start(write_engagement)
+    item_archiver.start(db)
+    
+    yield
+    
+    await item_archiver.stop()
+    await engagement_buffer.stop()
+    await invalidation_bus.stop()
+    if client is not None:
+        client.close()
+        if heavy_client is not None:
+            heavy_client.close()
+    else:
+        db.close()
 
 # Create the main app without a prefix
-app = FastAPI(title="Vinted Tracker API", version="2.0.0")
+app = FastAPI(title="Vinted Tracker API", version="2.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Utility Functions
-async def calculate_item_metrics(item: VintedItem) -> VintedItem:
+def calculate_item_metrics(item: VintedItem) -> VintedItem:
     """Calculate profit margin, ROI, and other metrics for an item"""
-    if item.sold_price is not None:
-        total_costs = item.purchase_price + item.shipping_cost + item.vinted_fee + item.buyer_protection_fee
-        profit = item.sold_price - total_costs
-        item.profit_margin = profit
-        
-        if item.purchase_price > 0:
-            item.roi_percentage = (profit / item.purchase_price) * 100
-        
-        if item.listed_at and item.sold_at:
-            item.days_to_sell = (item.sold_at - item.listed_at).days
-    
+    metrics = compute_item_metrics([item.dict(include={"sold_price", "listed_at", "sold_at", *ITEM_COST_FIELDS})])[0]
+    for field in ("profit_margin", "roi_percentage", "days_to_sell"):
+        if field in metrics:
+            setattr(item, field, metrics[field])
     return item
 
-async def create_notification(notification_type: NotificationType, title: str, message: str, data: dict = None):
-    """Create a new notification"""
+async def search_items_page(
+    seller_id: str,
+    q: str,
+    status: Optional[ItemStatus] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> dict:
+    """Run a ranked text search over items and return one page sorted by relevance"""
+    query = {"seller_id": seller_id, "$text": {"$search": q}}
+    if status:
+        query["status"] = status
+    if min_price is not None or max_price is not None:
+        query["listed_price"] = {}
+        if min_price is not None:
+            query["listed_price"]["$gte"] = min_price
+        if max_price is not None:
+            query["listed_price"]["$lte"] = max_price
+    
+    score = {"score": {"$meta": "textScore"}}
+    items = await db.vinted_items.find(
+        query, {**ITEM_LEAN_PROJECTION, **score}
+    ).sort([("score", {"$meta": "textScore"})]).skip(skip).limit(limit + 1).to_list(limit + 1)
+    
+    has_more = len(items) > limit
+    items = compute_item_metrics(fill_item_defaults(items[:limit]))
+    return {"items": items, "skip": skip, "limit": limit, "has_more": has_more}
+
+async def iter_batches(cursor, size: int = ITEM_METRICS_BATCH_SIZE):
+    """Yield lists of documents from a cursor so metrics can be computed batch-wise"""
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def status_transition_fields(status: Optional[ItemStatus]) -> dict:
+    """Timestamps to set when an item moves into the given status"""
+    if status == ItemStatus.ACTIVE:
+        return {"listed_at": datetime.utcnow()}
+    if status == ItemStatus.SOLD:
+        return {"sold_at": datetime.utcnow()}
+    return {}
+
+def build_item_query(seller_id: str, item_filter: ItemFilter) -> dict:
+    """Translate an ItemFilter into a vinted_items query over one seller's items"""
+    query = {"seller_id": seller_id}
+    if item_filter.status:
+        query["status"] = item_filter.status
+    if item_filter.category:
+        query["category"] = {"$regex": item_filter.category, "$options": "i"}
+    if item_filter.brand:
+        query["brand"] = {"$regex": item_filter.brand, "$options": "i"}
+    if item_filter.min_price is not None or item_filter.max_price is not None:
+        query["listed_price"] = {}
+        if item_filter.min_price is not None:
+            query["listed_price"]["$gte"] = item_filter.min_price
+        if item_filter.max_price is not None:
+            query["listed_price"]["$lte"] = item_filter.max_price
+    if item_filter.date_from or item_filter.date_to:
+        query["created_at"] = {}
+        if item_filter.date_from:
+            query["created_at"]["$gte"] = item_filter.date_from
+        if item_filter.date_to:
+            query["created_at"]["$lte"] = item_filter.date_to
+    if item_filter.min_profit is not None or item_filter.max_profit is not None:
+        query["$expr"] = profit_range_expr(item_filter.min_profit, item_filter.max_profit)
+    return query
+
+def renewal_due_query(seller_id: str, now: datetime) -> dict:
+    """Active items last listed or renewed more than RENEWAL_AFTER_DAYS ago"""
+    cutoff = now - timedelta(days=RENEWAL_AFTER_DAYS)
+    return {
+        "seller_id": seller_id,
+        "status": ItemStatus.ACTIVE,
+        "$or": [
+            {"last_renewed_at": {"$lt": cutoff}},
+            # Matches a null as well as a missing last_renewed_at
+            {"last_renewed_at": None, "listed_at": {"$lt": cutoff}}
+        ]
+    }
+
+def low_performing_query(seller_id: str, now: datetime) -> dict:
+    """Active items listed more than LOW_PERFORMING_AFTER_DAYS ago with few views"""
+    return {
+        "seller_id": seller_id,
+        "status": ItemStatus.ACTIVE,
+        "views": {"$lt": LOW_PERFORMING_MAX_VIEWS},
+        "listed_at": {"$lt": now - timedelta(days=LOW_PERFORMING_AFTER_DAYS)}
+    }
+
+async def item_queue_page(query: dict, rank_stages: List[dict], sort: dict, skip: int, limit: int) -> dict:
+    """One page of a ranked work queue, with the lean projection and item metrics"""
+    items = await db.vinted_items.aggregate([
+        {"$match": query},
+        *rank_stages,
+        {"$sort": {**sort, "id": 1}},
+        {"$skip": skip},
+        {"$limit": limit + 1},
+        {"$project": ITEM_LEAN_PROJECTION},
+    ]).to_list(limit + 1)
+    total = await db.vinted_items.count_documents(query)
+    has_more = len(items) > limit
+    items = compute_item_metrics(fill_item_defaults(items[:limit]))
+    return {"items": items, "total": total, "skip": skip, "limit": limit, "has_more": has_more}
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Gate admin routes behind the ADMIN_TOKEN shared secret"""
+    if not admin_token_configured():
+        raise HTTPException(status_code=403, detail="Admin routes are disabled; set ADMIN_TOKEN to enable them")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def get_seller_id(x_seller_id: Optional[str] = Header(None)) -> str:
+    """The seller a request acts for, from the X-Seller-Id header set by the gateway"""
+    if x_seller_id is None:
+        return DEFAULT_SELLER_ID
+    seller_id = x_seller_id.strip()
+    if not seller_id or len(seller_id) > SELLER_ID_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"X-Seller-Id must be 1-{SELLER_ID_MAX_LENGTH} characters")
+    return seller_id
+
+def item_etag(version: int) -> str:
+    """Strong ETag for an item version"""
+    return f'"{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """True when If-Modified-Since is at or after last_modified (HTTP dates have second precision)"""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified.replace(microsecond=0) <= since
+
+def cache_validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """ETag/Last-Modified headers, with no-cache so clients revalidate instead of reusing blindly"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate conditional GET headers; If-None-Match takes precedence over If-Modified-Since"""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return not_modified_since(if_modified_since, last_modified)
+
+def item_list_etag(params: dict, items: List[dict]) -> Tuple[str, Optional[datetime]]:
+    """Weak ETag and Last-Modified for a page of items
+    
+    Derived from the filters, the newest updated_at on the page and each item's
+    id and version, so edits, inserts and deletions that reshuffle the page all
+    change it.
+    """
+    last_modified = max((item["updated_at"] for item in items if item.get("updated_at")), default=None)
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(str(last_modified).encode())
+    for item in items:
+        digest.update(f"{item['id']}:{item.get('version', 0)};".encode())
+    return f'W/"{digest.hexdigest()[:24]}"', last_modified
+
+async def find_items_page(query: dict, projection: dict, skip: int, limit: int,
+                          include_archived: bool = False) -> List[dict]:
+    """One page of items; with include_archived the archive continues where the hot items end"""
+    items = await db.vinted_items.find(query, projection).sort(ITEM_PAGE_SORT).skip(skip).limit(limit).to_list(None)
+    if include_archived and len(items) < limit:
+        archive_skip = max(0, skip - await db.vinted_items.count_documents(query)) if not items else 0
+        archive_projection = ARCHIVE_ITEM_PROJECTION if projection == ITEM_PROJECTION else projection
+        items += await db[ARCHIVE_COLLECTION].find(query, archive_projection).sort(ITEM_PAGE_SORT).skip(
+            archive_skip
+        ).limit(limit - len(items)).to_list(None)
+    return items
+
+def item_write(update: dict, now: Optional[datetime] = None) -> dict:
+    """Add the updated_at and version bump every write to an item carries"""
+    update = dict(update)
+    update["$set"] = {**update.get("$set", {}), "updated_at": now or datetime.utcnow()}
+    update["$inc"] = {**update.get("$inc", {}), "version": 1}
+    return update
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Parse an If-Match header into the expected item version (None means no precondition)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+def version_filter(version: int) -> dict:
+    """Filter matching an item version; documents written before versioning count as version 0"""
+    return {"version": {"$in": [0, None]}} if version == 0 else {"version": version}
+
+async def delete_item_dependents(seller_id: str, item_ids: List[str]) -> dict:
+    """Delete the expenses and notifications that belong to the given items"""
+    expenses = await db.item_expenses.delete_many({"seller_id": seller_id, "item_id": {"$in": item_ids}})
+    notifications = await db.notifications.delete_many({"seller_id": seller_id, "data.item_id": {"$in": item_ids}})
+    return {"expenses": expenses.deleted_count, "notifications": notifications.deleted_count}
+
+def bson_now() -> datetime:
+    """The current time at millisecond precision, so it compares equal after a round trip through BSON"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+async def items_written_at(seller_id: str, item_ids: List[str], now: datetime, modified_count: int) -> List[str]:
+    """The ids among item_ids that an update_many stamping updated_at=now actually modified"""
+    if modified_count == len(item_ids):
+        return item_ids
+    return [item["id"] async for item in db.vinted_items.find(
+        {"seller_id": seller_id, "id": {"$in": item_ids}, "updated_at": now}, {"_id": 0, "id": 1}
+    )]
+
+def and_query(query: dict, extra_query: Optional[dict]) -> dict:
+    """Match both queries; merging the dicts would let extra_query replace conditions on the same fields"""
+    return {"$and": [query, extra_query]} if extra_query else query
+
+async def iter_selected_item_batches(seller_id: str, selection: BulkItemSelection, extra_query: dict = None):
+    """Yield batches of item ids for a bulk selection (explicit ids or an ItemFilter)
+    
+    Filter-based batches are re-queried each time, so callers must change the
+    matched items (delete, or exclude them via extra_query) before the next batch.
+    """
+    if selection.item_ids is None and selection.filter is None:
+        raise HTTPException(status_code=400, detail="Provide item_ids or filter")
+    
+    if selection.item_ids is not None:
+        for start in range(0, len(selection.item_ids), BULK_DELETE_BATCH_SIZE):
+            query = and_query(
+                {"seller_id": seller_id, "id": {"$in": selection.item_ids[start:start + BULK_DELETE_BATCH_SIZE]}},
+                extra_query
+            )
+            batch = [item["id"] async for item in db.vinted_items.find(query, {"_id": 0, "id": 1})]
+            if batch:
+                yield batch
+        return
+    
+    query = and_query(build_item_query(seller_id, selection.filter), extra_query)
+    if selection.dry_run:
+        # Nothing is modified in a dry run, so page through with skip
+        skip = 0
+        while True:
+            batch = [item["id"] async for item in db.vinted_items.find(
+                query, {"_id": 0, "id": 1}
+            ).sort("id", ASCENDING).skip(skip).limit(BULK_DELETE_BATCH_SIZE)]
+            if not batch:
+                return
+            yield batch
+            skip += len(batch)
+    else:
+        while True:
+            batch = [item["id"] async for item in db.vinted_items.find(
+                query, {"_id": 0, "id": 1}
+            ).limit(BULK_DELETE_BATCH_SIZE)]
+            if not batch:
+                return
+            yield batch
+
+async def create_notification(seller_id: str, notification_type: NotificationType, title: str, message: str,
+                              data: dict = None):
+    """Create a new notification for a seller"""
     notification = Notification(
+        seller_id=seller_id,
         type=notification_type,
         title=title,
         message=message,
@@ -58,66 +534,240 @@ async def create_notification(notification_type: NotificationType, title: str, m
     await db.notifications.insert_one(notification.dict())
     return notification
 
+def expense_totals_inc(category: ExpenseCategory, amount: float) -> dict:
+    """Build the $inc document that applies an expense amount to an item's denormalized totals"""
+    return {
+        "expenses_total": amount,
+        f"expenses_by_category.{ExpenseCategory(category).value}": amount
+    }
+
+async def apply_expense_totals_inc(seller_id: str, item_id: str, inc: dict):
+    """Atomically apply an expense totals $inc to an item and record the change as an expense event"""
+    await db.vinted_items.update_one({"seller_id": seller_id, "id": item_id}, item_write({"$inc": inc}))
+    await record_item_events(db, [
+        item_event(seller_id, item_id, EVENT_EXPENSE, deltas={"expenses_total": inc["expenses_total"]})
+    ])
+
+async def apply_expense_to_item(seller_id: str, item_id: str, category: ExpenseCategory, amount: float):
+    """Atomically add (or with a negative amount, remove) an expense from an item's totals"""
+    await apply_expense_totals_inc(seller_id, item_id, expense_totals_inc(category, amount))
+
+def expense_from_input(values: dict, seller_id: str) -> ItemExpense:
+    """Build an expense from client input; the seller comes from the request and the id is always generated"""
+    return ItemExpense(**{**{k: v for k, v in values.items() if k != "id"}, "seller_id": seller_id})
+
+async def iter_csv_records(stream):
+    """Yield lists of complete CSV records from a byte stream as they arrive
+    
+    A record ends at a newline outside quotes, so quoted fields may span lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record = ""
+    in_quotes = False
+    
+    def complete(lines: List[str]) -> List[str]:
+        nonlocal record, in_quotes
+        records = []
+        for line in lines:
+            record += line + "\n"
+            # Escaped quotes come in pairs, so an odd count toggles the quoted state
+            in_quotes ^= line.count('"') % 2 == 1
+            if not in_quotes:
+                records.append(record)
+                record = ""
+        return records
+    
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        yield complete(lines)
+    pending += decoder.decode(b"", final=True)
+    records = complete([pending]) if pending else []
+    if record:
+        # Unterminated quote at the end of the body; let the csv module report it as it sees fit
+        records.append(record)
+    yield records
+
+async def insert_expense_batch(expenses: List[ItemExpense]) -> int:
+    """Insert a batch of expenses and apply them to item totals with one bulk write"""
+    if not expenses:
+        return 0
+    await db.item_expenses.insert_many([expense.dict() for expense in expenses], ordered=False)
+    
+    # Coalesce the increments so each item is updated once per batch
+    increments = {}
+    for expense in expenses:
+        inc = increments.setdefault((expense.seller_id, expense.item_id), {})
+        for field, amount in expense_totals_inc(expense.category, expense.amount).items():
+            inc[field] = inc.get(field, 0) + amount
+    await db.vinted_items.bulk_write(
+        [UpdateOne({"seller_id": seller_id, "id": item_id}, item_write({"$inc": inc}))
+         for (seller_id, item_id), inc in increments.items()],
+        ordered=False
+    )
+    await record_item_events(db, [
+        item_event(expense.seller_id, expense.item_id, EVENT_EXPENSE, deltas={"expenses_total": expense.amount})
+        for expense in expenses
+    ])
+    return len(expenses)
+
+async def write_engagement(pending: Dict[Tuple[str, str], Dict[str, int]]):
+    """Apply buffered engagement deltas to their items with one $inc bulk write
+    
+    Deltas for item ids that do not exist (or belong to another seller) are dropped
+    rather than recorded as events.
+    """
+    item_ids_by_seller: Dict[str, List[str]] = defaultdict(list)
+    for seller_id, item_id in pending:
+        item_ids_by_seller[seller_id].append(item_id)
+    existing = set()
+    for seller_id, item_ids in item_ids_by_seller.items():
+        async for item in db.vinted_items.find({"seller_id": seller_id, "id": {"$in": item_ids}}, {"_id": 0, "id": 1}):
+            existing.add((seller_id, item["id"]))
+    matched = {key: fields for key, fields in pending.items() if key in existing}
+    if not matched:
+        return
+    
+    await db.vinted_items.bulk_write(
+        [UpdateOne({"seller_id": seller_id, "id": item_id}, item_write({"$inc": fields}))
+         for (seller_id, item_id), fields in matched.items()],
+        ordered=False
+    )
+    await record_item_events(db, [
+        item_event(seller_id, item_id, EVENT_ENGAGEMENT, deltas=fields)
+        for (seller_id, item_id), fields in matched.items()
+    ])
+
+async def find_active_roi_target(seller_id: str) -> Optional[ROITarget]:
+    """Get a seller's active ROI target from the cache or the database, without creating one"""
+    cached = roi_target_cache.get(seller_id)
+    if cached is not None:
+        record_cache_lookup("roi_target", hit=True)
+        return cached
+    
+    async with roi_target_locks[seller_id]:
+        cached = roi_target_cache.get(seller_id)
+        if cached is not None:
+            record_cache_lookup("roi_target", hit=True)
+            return cached
+        record_cache_lookup("roi_target", hit=False)
+        
+        target = await db.roi_targets.find_one({"seller_id": seller_id, "is_active": True})
+        if target is None:
+            return None
+        active = ROITarget(**target)
+        roi_target_cache[seller_id] = active
+        return active
+
+async def get_active_roi_target(seller_id: str) -> ROITarget:
+    """Get a seller's active ROI target from the cache, creating the default one atomically if needed"""
+    cached = roi_target_cache.get(seller_id)
+    if cached is not None:
+        record_cache_lookup("roi_target", hit=True)
+        return cached
+    
+    async with roi_target_locks[seller_id]:
+        cached = roi_target_cache.get(seller_id)
+        if cached is not None:
+            record_cache_lookup("roi_target", hit=True)
+            return cached
+        record_cache_lookup("roi_target", hit=False)
+        
+        default_target = ROITarget(seller_id=seller_id, target_percentage=DEFAULT_ROI_TARGET_PERCENTAGE)
+        defaults = default_target.dict(exclude={"seller_id", "is_active"})
+        try:
+            target = await db.roi_targets.find_one_and_update(
+                {"seller_id": seller_id, "is_active": True},
+                {"$setOnInsert": defaults},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker inserted the default first; the unique index kept it single
+            target = await db.roi_targets.find_one({"seller_id": seller_id, "is_active": True})
+        
+        active = ROITarget(**target)
+        roi_target_cache[seller_id] = active
+        return active
+
+def encode_expense_cursor(expense: dict) -> str:
+    """Encode the sort position of an expense as an opaque pagination cursor"""
+    position = {"date": expense["date"].isoformat(), "id": expense["id"]}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_expense_cursor(cursor: str) -> dict:
+    """Decode a pagination cursor into a query that resumes after that position"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date = datetime.fromisoformat(position["date"])
+        expense_id = position["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"date": {"$lt": date}},
+        {"date": date, "id": {"$lt": expense_id}}
+    ]}
+
 # Dashboard & Analytics Routes
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats():
-    """Get dashboard statistics"""
+async def get_dashboard_stats(seller_id: str = Depends(get_seller_id)):
+    """Get dashboard statistics for the seller's own items"""
     try:
         # Get current month for monthly stats
         now = datetime.utcnow()
         month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         
         # Total items
-        total_items = await db.vinted_items.count_documents({})
-        active_listings = await db.vinted_items.count_documents({"status": ItemStatus.ACTIVE})
-        sold_items = await db.vinted_items.count_documents({"status": ItemStatus.SOLD})
+        total_items = await db.vinted_items.count_documents({"seller_id": seller_id})
+        active_listings = await db.vinted_items.count_documents({"seller_id": seller_id, "status": ItemStatus.ACTIVE})
+        sold_items = await db.vinted_items.count_documents({"seller_id": seller_id, "status": ItemStatus.SOLD})
         
         # Revenue and profit calculations
-        sold_items_cursor = db.vinted_items.find({"status": ItemStatus.SOLD, "sold_price": {"$exists": True}})
+        sold_items_cursor = db.vinted_items.find(
+            {"seller_id": seller_id, "status": ItemStatus.SOLD, "sold_price": {"$exists": True}},
+            ITEM_METRICS_PROJECTION
+        )
         total_revenue = 0.0
         total_profit = 0.0
         monthly_profit = 0.0
         monthly_sales_count = 0
-        roi_values = []
+        roi_sum = 0.0
+        roi_count = 0
         
-        async for item in sold_items_cursor:
-            revenue = item.get("sold_price", 0)
-            costs = (item.get("purchase_price", 0) + item.get("shipping_cost", 0) + 
-                    item.get("vinted_fee", 0) + item.get("buyer_protection_fee", 0))
-            profit = revenue - costs
-            
-            total_revenue += revenue
-            total_profit += profit
+        async for batch in iter_batches(sold_items_cursor):
+            columns = item_metric_columns(batch)
+            sold = ~np.isnan(columns["sold_price"])
+            total_revenue += float(columns["sold_price"][sold].sum())
+            total_profit += float(columns["profit"][sold].sum())
             
             # Monthly stats
-            if item.get("sold_at") and item["sold_at"] >= month_start:
-                monthly_profit += profit
-                monthly_sales_count += 1
+            recent = np.array([bool(item.get("sold_at")) and item["sold_at"] >= month_start for item in batch])
+            monthly_profit += float(columns["profit"][sold & recent].sum())
+            monthly_sales_count += int((sold & recent).sum())
             
             # ROI calculation
-            if item.get("purchase_price", 0) > 0:
-                roi = (profit / item["purchase_price"]) * 100
-                roi_values.append(roi)
-        
-        average_roi = sum(roi_values) / len(roi_values) if roi_values else 0.0
-        
-        # Items needing renewal (active for more than 30 days)
-        thirty_days_ago = now - timedelta(days=30)
-        items_needing_renewal = await db.vinted_items.count_documents({
-            "status": ItemStatus.ACTIVE,
-            "$or": [
-                {"last_renewed_at": {"$lt": thirty_days_ago}},
-                {"last_renewed_at": {"$exists": False}, "listed_at": {"$lt": thirty_days_ago}}
-            ]
-        })
+            roi = columns["roi"][sold & ~np.isnan(columns["roi"])]
+            roi_sum += float(roi.sum())
+            roi_count += len(roi)
         
-        # Low performing items (active for more than 60 days with low engagement)
-        sixty_days_ago = now - timedelta(days=60)
-        low_performing_items = await db.vinted_items.count_documents({
-            "status": ItemStatus.ACTIVE,
-            "listed_at": {"$lt": sixty_days_ago},
-            "views": {"$lt": 10}
-        })
+        # Items moved to the archive count through their rollups
+        archived = await archived_totals(db, seller_id, month_start)
+        total_items += archived["items"]
+        sold_items += archived["sold_items"]
+        total_revenue += archived["revenue"]
+        total_profit += archived["profit"]
+        roi_sum += archived["roi_sum"]
+        roi_count += archived["roi_count"]
+        monthly_profit += archived["current_month"]["profit"]
+        monthly_sales_count += archived["current_month"]["sold_items"]
+        
+        average_roi = roi_sum / roi_count if roi_count else 0.0
+        
+        # Sizes of the renewal and low-performer queues
+        items_needing_renewal = await db.vinted_items.count_documents(renewal_due_query(seller_id, now))
+        low_performing_items = await db.vinted_items.count_documents(low_performing_query(seller_id, now))
         
         return DashboardStats(
             total_items=total_items,
@@ -136,15 +786,47 @@ async def get_dashboard_stats():
         raise HTTPException(status_code=500, detail="Failed to get dashboard statistics")
 
 # Item Management Routes
-@api_router.post("/items", response_model=VintedItem)
-async def create_item(item: VintedItemCreate):
-    """Create a new Vinted item"""
+def idempotent_replay(response) -> JSONResponse:
+    """The stored response of an earlier request with the same Idempotency-Key"""
+    return JSONResponse(content=response, headers={"Idempotent-Replayed": "true"})
+
+async def insert_item_once(item: VintedItem) -> VintedItem:
+    """Insert an item; an item already stored under the same id is returned instead"""
     try:
-        new_item = VintedItem(**item.dict())
+        await db.vinted_items.insert_one(item.dict())
+        return item
+    except DuplicateKeyError:
+        # Left by an earlier attempt under the same idempotency key
+        existing = await db.vinted_items.find_one({"seller_id": item.seller_id, "id": item.id}, ITEM_PROJECTION)
+        if existing is None:
+            raise
+        return VintedItem(**existing)
+
+@api_router.post("/items", response_model=VintedItem)
+async def create_item(item: VintedItemCreate, idempotency_key: Optional[str] = Header(None),
+                      seller_id: str = Depends(get_seller_id)):
+    """Create a new Vinted item; retries with the same Idempotency-Key create it only once"""
+    async def create(key: Optional[str]) -> VintedItem:
+        new_item = VintedItem(**item.dict(), seller_id=seller_id)
         new_item.listed_at = datetime.utcnow() if new_item.status == ItemStatus.ACTIVE else None
-        
-        result = await db.vinted_items.insert_one(new_item.dict())
-        return new_item
+        if key is None:
+            await db.vinted_items.insert_one(new_item.dict())
+            stored = new_item
+        else:
+            new_item.id = derived_id(key)
+            stored = await insert_item_once(new_item)
+        if stored is new_item:
+            await record_item_events(db, [item_event(seller_id, new_item.id, EVENT_CREATED, after=new_item.dict())])
+            pricing_index.observe(seller_id, [new_item.dict()])
+        return stored
+
+    try:
+        response, replayed = await run_idempotent(
+            db.idempotency_keys, f"{seller_id}:create_item", idempotency_key, item, create
+        )
+        return idempotent_replay(response) if replayed else response
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error creating item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create item")
@@ -155,11 +837,25 @@ async def get_items(
     category: Optional[str] = None,
     brand: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    seller_id: str = Depends(get_seller_id)
 ):
-    """Get items with optional filtering"""
+    """Get items with optional filtering
+    
+    Returns raw projected documents through ORJSONResponse; FastAPI does not
+    re-validate a returned Response, so each item is processed exactly once.
+    Pages carry a weak ETag and Last-Modified; a conditional request for an
+    unchanged page is answered with 304 after reading only ids and versions.
+    Items come in creation order; with include_archived=true, archived items
+    follow the hot ones in the same order.
+    """
     try:
-        query = {}
+        params = {"seller_id": seller_id, "status": status, "category": category, "brand": brand, "skip": skip,
+                  "limit": limit, "include_archived": include_archived}
+        query = {"seller_id": seller_id}
         if status:
             query["status"] = status
         if category:
@@ -167,29 +863,170 @@ async def get_items(
         if brand:
             query["brand"] = {"$regex": brand, "$options": "i"}
         
-        items_cursor = db.vinted_items.find(query).skip(skip).limit(limit)
-        items = []
-        async for item in items_cursor:
-            item_obj = VintedItem(**item)
-            item_obj = await calculate_item_metrics(item_obj)
-            items.append(item_obj)
+        if if_none_match or if_modified_since:
+            validators = await find_items_page(query, ITEM_VALIDATOR_PROJECTION, skip, limit, include_archived)
+            etag, last_modified = item_list_etag(params, validators)
+            if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+                return Response(status_code=304, headers=cache_validator_headers(etag, last_modified))
         
-        return items
+        items = await find_items_page(query, ITEM_PROJECTION, skip, limit, include_archived)
+        etag, last_modified = item_list_etag(params, items)
+        items = compute_item_metrics(fill_item_defaults(items))
+        
+        return ORJSONResponse(items, headers=cache_validator_headers(etag, last_modified))
     except Exception as e:
         logging.error(f"Error getting items: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get items")
 
+@api_router.get("/items/search")
+async def search_items(
+    q: str = Query(..., min_length=1),
+    status: Optional[ItemStatus] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX_LIMIT),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Full-text search over title, brand, tags and description, best matches first
+    
+    Results use the lean projection (no photo gallery) and carry their relevance score.
+    """
+    try:
+        page = await search_items_page(seller_id, q, status, min_price, max_price, skip, limit)
+        return ORJSONResponse(page)
+    except Exception as e:
+        logging.error(f"Error searching items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search items")
+
+@api_router.get("/items/queues/renewal")
+async def get_renewal_queue(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=QUEUE_PAGE_MAX_LIMIT),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Active items due for renewal, longest since listing or last renewal first"""
+    try:
+        now = datetime.utcnow()
+        rank = [{"$addFields": {"renewal_due_since": {"$ifNull": ["$last_renewed_at", "$listed_at"]}}}]
+        page = await item_queue_page(renewal_due_query(seller_id, now), rank, {"renewal_due_since": 1}, skip, limit)
+        for item in page["items"]:
+            item["days_since_renewal"] = (now - item.pop("renewal_due_since")).days
+        return ORJSONResponse(page)
+    except Exception as e:
+        logging.error(f"Error getting renewal queue: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get renewal queue")
+
+@api_router.get("/items/queues/low-performing")
+async def get_low_performing_queue(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=QUEUE_PAGE_MAX_LIMIT),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Long-listed items with few views, lowest engagement per day listed first"""
+    try:
+        now = datetime.utcnow()
+        rank = [
+            {"$addFields": {"days_listed": {"$divide": [{"$subtract": [now, "$listed_at"]}, MS_PER_DAY]}}},
+            {"$addFields": {"engagement_score": {"$divide": [
+                {"$add": [
+                    {"$multiply": [{"$ifNull": [f"${field}", 0]}, weight]}
+                    for field, weight in ENGAGEMENT_SCORE_WEIGHTS.items()
+                ]},
+                "$days_listed"
+            ]}}},
+        ]
+        sort = {"engagement_score": 1, "listed_at": 1}
+        page = await item_queue_page(low_performing_query(seller_id, now), rank, sort, skip, limit)
+        for item in page["items"]:
+            item["days_listed"] = int(item["days_listed"])
+            item["engagement_score"] = round(item["engagement_score"], 3)
+        return ORJSONResponse(page)
+    except Exception as e:
+        logging.error(f"Error getting low-performing queue: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get low-performing queue")
+
+@api_router.post("/items/queues/renewal/renew")
+async def renew_items(selection: Optional[BulkItemSelection] = None, seller_id: str = Depends(get_seller_id)):
+    """Renew items in one call: the given item_ids, the due items matching a filter, or the whole queue
+    
+    Sets last_renewed_at and resets the renewal reminder, in bounded batches.
+    """
+    try:
+        # Millisecond precision so the renewed items can be found by their updated_at
+        now = bson_now()
+        selection = selection or BulkItemSelection()
+        if selection.item_ids is None and selection.filter is None:
+            selection.filter = ItemFilter()
+        if selection.item_ids is not None:
+            extra_query = {"status": ItemStatus.ACTIVE}
+        else:
+            # Renewed items leave the due query, which moves the filter-based batches along
+            extra_query = renewal_due_query(seller_id, now)
+        
+        renewed = 0
+        batches = 0
+        async for batch in iter_selected_item_batches(seller_id, selection, extra_query=extra_query):
+            batches += 1
+            if selection.dry_run:
+                renewed += len(batch)
+                continue
+            
+            result = await db.vinted_items.update_many(
+                and_query({"seller_id": seller_id, "id": {"$in": batch}}, extra_query),
+                item_write({"$set": {"last_renewed_at": now, "renewal_reminder_sent": False}}, now)
+            )
+            renewed += result.modified_count
+            modified = await items_written_at(seller_id, batch, now, result.modified_count)
+            await record_item_events(db, [item_event(seller_id, item_id, EVENT_RENEWED, at=now) for item_id in modified])
+            await asyncio.sleep(BULK_BATCH_PAUSE_SECONDS)
+        
+        verb = "Would renew" if selection.dry_run else "Renewed"
+        return {
+            "message": f"{verb} {renewed} items",
+            "dry_run": selection.dry_run,
+            "batches": batches,
+            "items": renewed
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error renewing items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to renew items")
+
 @api_router.get("/items/{item_id}", response_model=VintedItem)
-async def get_item(item_id: str):
-    """Get a specific item by ID"""
+async def get_item(
+    item_id: str,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Get a specific item by ID, from the archive too with include_archived=true
+    
+    Carries a strong ETag (the item version) and Last-Modified; a conditional
+    request for an unchanged item is answered with 304 without reading photos.
+    """
     try:
-        item = await db.vinted_items.find_one({"id": item_id})
+        item_filter = {"seller_id": seller_id, "id": item_id}
+        if if_none_match or if_modified_since:
+            current = await db.vinted_items.find_one(item_filter, ITEM_VALIDATOR_PROJECTION)
+            if not current and include_archived:
+                current = await db[ARCHIVE_COLLECTION].find_one(item_filter, ITEM_VALIDATOR_PROJECTION)
+            if not current:
+                raise HTTPException(status_code=404, detail="Item not found")
+            etag, last_modified = item_etag(current.get("version", 0)), current.get("updated_at")
+            if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+                return Response(status_code=304, headers=cache_validator_headers(etag, last_modified))
+        
+        item = await db.vinted_items.find_one(item_filter, ITEM_PROJECTION)
+        if not item and include_archived:
+            item = await db[ARCHIVE_COLLECTION].find_one(item_filter, ARCHIVE_ITEM_PROJECTION)
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
         
-        item_obj = VintedItem(**item)
-        item_obj = await calculate_item_metrics(item_obj)
-        return item_obj
+        headers = cache_validator_headers(item_etag(item.get("version", 0)), item.get("updated_at"))
+        return ORJSONResponse(compute_item_metrics(fill_item_defaults([item]))[0], headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -197,34 +1034,88 @@ async def get_item(item_id: str):
         raise HTTPException(status_code=500, detail="Failed to get item")
 
 @api_router.put("/items/{item_id}", response_model=VintedItem)
-async def update_item(item_id: str, item_update: VintedItemUpdate):
-    """Update an existing item"""
+async def update_item(
+    item_id: str,
+    item_update: VintedItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Update an existing item
+    
+    Runs as a single find_one_and_update. Send the item's ETag in If-Match to
+    get a 409 instead of silently overwriting a concurrent edit.
+    """
     try:
-        # Get existing item
-        existing_item = await db.vinted_items.find_one({"id": item_id})
-        if not existing_item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        
         # Prepare update data
         update_data = {k: v for k, v in item_update.dict().items() if v is not None}
+        update_data["updated_at"] = datetime.utcnow()
         
-        # Handle status changes
-        if item_update.status == ItemStatus.ACTIVE and existing_item.get("status") != ItemStatus.ACTIVE:
-            update_data["listed_at"] = datetime.utcnow()
-        elif item_update.status == ItemStatus.SOLD and existing_item.get("status") != ItemStatus.SOLD:
-            update_data["sold_at"] = datetime.utcnow()
+        item_filter = {"seller_id": seller_id, "id": item_id}
+        expected_version = parse_if_match(if_match)
+        if expected_version is not None:
+            item_filter.update(version_filter(expected_version))
         
-        # Update the item
-        await db.vinted_items.update_one({"id": item_id}, {"$set": update_data})
+        # Status transitions are decided by the filter rather than a prior read:
+        # try the common "status unchanged" case first, then the transition.
+        # The previous document is returned so the event log gets before and
+        # after values; the updated item is rebuilt from it and the $set.
+        transition = status_transition_fields(item_update.status)
+        previous = None
+        applied = update_data
+        for attempt in range(3):
+            if transition:
+                applied = update_data
+                previous = await db.vinted_items.find_one_and_update(
+                    {**item_filter, "status": item_update.status},
+                    {"$set": applied, "$inc": {"version": 1}},
+                    projection={"_id": 0},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if previous is None:
+                    applied = {**update_data, **transition}
+                    previous = await db.vinted_items.find_one_and_update(
+                        {**item_filter, "status": {"$ne": item_update.status}},
+                        {"$set": applied, "$inc": {"version": 1}},
+                        projection={"_id": 0},
+                        return_document=ReturnDocument.BEFORE
+                    )
+            else:
+                previous = await db.vinted_items.find_one_and_update(
+                    item_filter,
+                    {"$set": applied, "$inc": {"version": 1}},
+                    projection={"_id": 0},
+                    return_document=ReturnDocument.BEFORE
+                )
+            if previous is not None:
+                break
+            
+            # Nothing matched: work out why (only on the failure path)
+            current = await db.vinted_items.find_one({"seller_id": seller_id, "id": item_id}, {"_id": 0, "version": 1})
+            if current is None:
+                raise HTTPException(status_code=404, detail="Item not found")
+            if expected_version is not None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Item was modified by another request",
+                    headers={"ETag": item_etag(current.get("version", 0))}
+                )
+            # The status changed between the two conditional attempts; retry
         
-        # Get updated item
-        updated_item = await db.vinted_items.find_one({"id": item_id})
+        if previous is None:
+            raise HTTPException(status_code=409, detail="Item is being modified concurrently")
+        
+        updated_item = {**previous, **applied, "version": (previous.get("version") or 0) + 1}
+        await record_item_events(db, [item_event(seller_id, item_id, EVENT_UPDATED, previous, updated_item)])
+        pricing_index.observe(seller_id, [updated_item])
         item_obj = VintedItem(**updated_item)
-        item_obj = await calculate_item_metrics(item_obj)
+        response.headers["ETag"] = item_etag(item_obj.version)
+        item_obj = calculate_item_metrics(item_obj)
         
         # Check for profit alerts
         if item_obj.roi_percentage is not None and item_obj.roi_percentage < 20:  # Example threshold
             await create_notification(
+                seller_id,
                 NotificationType.PROFIT_ALERT,
                 "Low ROI Alert",
                 f"Item '{item_obj.title}' has ROI of {item_obj.roi_percentage:.1f}%",
@@ -239,12 +1130,18 @@ async def update_item(item_id: str, item_update: VintedItemUpdate):
         raise HTTPException(status_code=500, detail="Failed to update item")
 
 @api_router.delete("/items/{item_id}")
-async def delete_item(item_id: str):
-    """Delete an item"""
+async def delete_item(item_id: str, seller_id: str = Depends(get_seller_id)):
+    """Delete an item along with its expenses and notifications"""
     try:
-        result = await db.vinted_items.delete_one({"id": item_id})
-        if result.deleted_count == 0:
+        deleted = await db.vinted_items.find_one_and_delete(
+            {"seller_id": seller_id, "id": item_id}, projection={"_id": 0, "status": 1}
+        )
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Item not found")
+        await delete_item_dependents(seller_id, [item_id])
+        await record_item_events(db, [item_event(seller_id, item_id, EVENT_DELETED)])
+        if deleted.get("status") == ItemStatus.SOLD:
+            await invalidation_bus.publish("pricing_index", seller_id)
         return {"message": "Item deleted successfully"}
     except HTTPException:
         raise
@@ -253,26 +1150,276 @@ async def delete_item(item_id: str):
         raise HTTPException(status_code=500, detail="Failed to delete item")
 
 # Bulk Operations Routes
-@api_router.post("/items/bulk-upload")
-async def bulk_upload_items(bulk_data: BulkUpload):
-    """Bulk upload items"""
+@api_router.post("/items/bulk-delete")
+async def bulk_delete_items(selection: BulkItemSelection, seller_id: str = Depends(get_seller_id)):
+    """Delete items by id list or filter in bounded batches, cascading to expenses and notifications"""
+    try:
+        counts = {"items": 0, "expenses": 0, "notifications": 0}
+        batches = 0
+        async for batch in iter_selected_item_batches(seller_id, selection):
+            batches += 1
+            if selection.dry_run:
+                counts["items"] += len(batch)
+                counts["expenses"] += await db.item_expenses.count_documents(
+                    {"seller_id": seller_id, "item_id": {"$in": batch}}
+                )
+                counts["notifications"] += await db.notifications.count_documents(
+                    {"seller_id": seller_id, "data.item_id": {"$in": batch}}
+                )
+                continue
+            
+            result = await db.vinted_items.delete_many({"seller_id": seller_id, "id": {"$in": batch}})
+            counts["items"] += result.deleted_count
+            dependents = await delete_item_dependents(seller_id, batch)
+            counts["expenses"] += dependents["expenses"]
+            counts["notifications"] += dependents["notifications"]
+            await record_item_events(db, [item_event(seller_id, item_id, EVENT_DELETED) for item_id in batch])
+            await asyncio.sleep(BULK_BATCH_PAUSE_SECONDS)
+        
+        if counts["items"] and not selection.dry_run:
+            # Some of them may have been sales; one reload is cheaper than checking each batch
+            await invalidation_bus.publish("pricing_index", seller_id)
+        
+        verb = "Would delete" if selection.dry_run else "Deleted"
+        return {
+            "message": f"{verb} {counts['items']} items",
+            "dry_run": selection.dry_run,
+            "batches": batches,
+            **counts
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error bulk deleting items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to delete items")
+
+@api_router.post("/items/bulk-archive")
+async def bulk_archive_items(selection: BulkItemSelection, seller_id: str = Depends(get_seller_id)):
+    """Archive items by id list or filter in bounded batches"""
+    try:
+        archived = 0
+        batches = 0
+        not_archived = {"status": {"$ne": ItemStatus.ARCHIVED}}
+        async for batch in iter_selected_item_batches(seller_id, selection, extra_query=not_archived):
+            batches += 1
+            if selection.dry_run:
+                archived += len(batch)
+                continue
+            
+            now = bson_now()
+            result = await db.vinted_items.update_many(
+                {"seller_id": seller_id, "id": {"$in": batch}, **not_archived},
+                item_write({"$set": {"status": ItemStatus.ARCHIVED}}, now)
+            )
+            archived += result.modified_count
+            modified = await items_written_at(seller_id, batch, now, result.modified_count)
+            await record_item_events(db, [
+                item_event(seller_id, item_id, EVENT_ARCHIVED, after={"status": ItemStatus.ARCHIVED}, at=now)
+                for item_id in modified
+            ])
+            await asyncio.sleep(BULK_BATCH_PAUSE_SECONDS)
+        
+        verb = "Would archive" if selection.dry_run else "Archived"
+        return {
+            "message": f"{verb} {archived} items",
+            "dry_run": selection.dry_run,
+            "batches": batches,
+            "items": archived
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error bulk archiving items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to archive items")
+
+@api_router.post("/items/bulk-update")
+async def bulk_update_items(bulk_update: BulkItemUpdate, seller_id: str = Depends(get_seller_id)):
+    """Apply one patch to many items (by id list or filter) in a single bulk write
+    
+    Status changes follow the same listed_at/sold_at rules as update_item;
+    renew=true sets last_renewed_at and resets the renewal reminder.
+    """
     try:
+        if bulk_update.item_ids is None and bulk_update.filter is None:
+            raise HTTPException(status_code=400, detail="Provide item_ids or filter")
+        
+        query = build_item_query(seller_id, bulk_update.filter or ItemFilter())
+        if bulk_update.item_ids is not None:
+            if len(bulk_update.item_ids) > BULK_UPDATE_MAX_ITEMS:
+                raise HTTPException(status_code=400, detail=f"At most {BULK_UPDATE_MAX_ITEMS} items per request")
+            query["id"] = {"$in": bulk_update.item_ids}
+        
+        # One read for the targets, without the heavy photo payloads
+        targets = await db.vinted_items.find(
+            query, {"_id": 0, "photos": 0, "main_photo": 0}
+        ).to_list(BULK_UPDATE_MAX_ITEMS + 1)
+        if len(targets) > BULK_UPDATE_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Filter matches more than {BULK_UPDATE_MAX_ITEMS} items; narrow it down"
+            )
+        
+        # Millisecond precision so the timestamp round-trips through BSON for the race check below
+        now = bson_now()
+        update_data = {k: v for k, v in bulk_update.patch.dict().items() if v is not None}
+        update_data["updated_at"] = now
+        if bulk_update.renew:
+            update_data["last_renewed_at"] = now
+            update_data["renewal_reminder_sent"] = False
+        
+        status = bulk_update.patch.status
+        transition = status_transition_fields(status)
+        operations = []
+        for target in targets:
+            if transition and target.get("status") != status:
+                # Same conditional-filter rule as update_item
+                operations.append(UpdateOne(
+                    {"seller_id": seller_id, "id": target["id"], "status": {"$ne": status}},
+                    {"$set": {**update_data, **transition}, "$inc": {"version": 1}}
+                ))
+            elif transition:
+                operations.append(UpdateOne(
+                    {"seller_id": seller_id, "id": target["id"], "status": status},
+                    {"$set": update_data, "$inc": {"version": 1}}
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"seller_id": seller_id, "id": target["id"]},
+                    {"$set": update_data, "$inc": {"version": 1}}
+                ))
+        
+        modified_count = 0
+        if operations:
+            result = await db.vinted_items.bulk_write(operations, ordered=False)
+            modified_count = result.modified_count
+        
+        # Anything not carrying our timestamp lost a race with a concurrent write
+        updated_ids = {target["id"] for target in targets}
+        if modified_count < len(operations):
+            updated_ids = {
+                item["id"] async for item in db.vinted_items.find(
+                    {"seller_id": seller_id, "id": {"$in": list(updated_ids)}, "updated_at": now}, {"_id": 0, "id": 1}
+                )
+            }
+        
+        requested_ids = bulk_update.item_ids if bulk_update.item_ids is not None else [t["id"] for t in targets]
+        found_ids = {target["id"] for target in targets}
+        results = []
+        for item_id in requested_ids:
+            if item_id in updated_ids:
+                outcome = "updated"
+            elif item_id in found_ids:
+                outcome = "conflict"
+            else:
+                outcome = "not_found"
+            results.append({"id": item_id, "outcome": outcome})
+        
+        # Events and low ROI alerts for the updated items, each written in one batch
+        events = []
+        updated_items = []
+        notifications = []
+        for target in targets:
+            if target["id"] not in updated_ids:
+                continue
+            changes = {**update_data, **(transition if target.get("status") != status else {})}
+            updated_items.append({**target, **changes})
+            events.append(item_event(seller_id, target["id"], EVENT_UPDATED, target, updated_items[-1], at=now))
+            item_obj = calculate_item_metrics(VintedItem(**updated_items[-1]))
+            if item_obj.roi_percentage is not None and item_obj.roi_percentage < 20:
+                notifications.append(Notification(
+                    seller_id=seller_id,
+                    type=NotificationType.PROFIT_ALERT,
+                    title="Low ROI Alert",
+                    message=f"Item '{item_obj.title}' has ROI of {item_obj.roi_percentage:.1f}%",
+                    data={"item_id": item_obj.id, "roi": item_obj.roi_percentage}
+                ).dict())
+        if notifications:
+            await db.notifications.insert_many(notifications)
+        await record_item_events(db, events)
+        pricing_index.observe(seller_id, updated_items)
+        
+        return {
+            "message": f"Updated {len(updated_ids)} items",
+            "matched": len(targets),
+            "updated": len(updated_ids),
+            "results": results
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error bulk updating items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update items")
+
+@api_router.post("/items/bulk-upload")
+async def bulk_upload_items(bulk_data: BulkUpload, idempotency_key: Optional[str] = Header(None),
+                            seller_id: str = Depends(get_seller_id)):
+    """Bulk upload items; retries with the same Idempotency-Key upload them only once"""
+    async def upload(key: Optional[str]) -> dict:
         created_items = []
-        for item_data in bulk_data.items:
-            item = VintedItem(**item_data.dict())
-            result = await db.vinted_items.insert_one(item.dict())
-            created_items.append(item)
+        events = []
+        for index, item_data in enumerate(bulk_data.items):
+            item = VintedItem(**{**item_data.dict(), "seller_id": seller_id})
+            if key is None:
+                await db.vinted_items.insert_one(item.dict())
+                stored = item
+            else:
+                if "id" not in item_data.model_fields_set:
+                    item.id = derived_id(key, index)
+                stored = await insert_item_once(item)
+            created_items.append(stored)
+            if stored is item:
+                events.append(item_event(seller_id, item.id, EVENT_CREATED, after=item.dict()))
+        await record_item_events(db, events)
+        pricing_index.observe(seller_id, [item.dict() for item in created_items])
         
         return {"message": f"Successfully uploaded {len(created_items)} items", "items": created_items}
+
+    try:
+        response, replayed = await run_idempotent(
+            db.idempotency_keys, f"{seller_id}:bulk_upload", idempotency_key, bulk_data, upload
+        )
+        return idempotent_replay(response) if replayed else response
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error bulk uploading items: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to upload items")
 
+@api_router.post("/items/engagement", status_code=202)
+async def record_engagement(batch: EngagementBatch, seller_id: str = Depends(get_seller_id)):
+    """Accept view/like/watcher/message deltas; they are buffered and applied within a flush interval"""
+    try:
+        if len(batch.deltas) > ENGAGEMENT_BATCH_MAX_DELTAS:
+            raise HTTPException(status_code=400, detail=f"At most {ENGAGEMENT_BATCH_MAX_DELTAS} deltas per request")
+        
+        deltas: Dict[str, Dict[str, int]] = {}
+        for delta in batch.deltas:
+            fields = deltas.setdefault(delta.item_id, {})
+            for field in ENGAGEMENT_FIELDS:
+                amount = getattr(delta, field)
+                if amount:
+                    fields[field] = fields.get(field, 0) + amount
+        deltas = {item_id: fields for item_id, fields in deltas.items() if fields}
+        
+        if not engagement_buffer.add(seller_id, deltas):
+            raise HTTPException(
+                status_code=429,
+                detail="Engagement buffer is full; retry later",
+                headers={"Retry-After": str(max(1, round(engagement_buffer.settings.flush_interval_seconds)))}
+            )
+        return {"accepted": len(batch.deltas), "items": len(deltas), "pending_items": engagement_buffer.pending_items()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error recording engagement: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to record engagement")
+
 @api_router.get("/items/export/csv")
-async def export_items_csv():
-    """Export items to CSV"""
+async def export_items_csv(include_archived: bool = False, seller_id: str = Depends(get_seller_id)):
+    """Export the seller's items to CSV, followed by the archived ones with include_archived=true"""
     try:
-        items_cursor = db.vinted_items.find({})
+        projection = {"_id": 0, "photos": 0, "main_photo": 0, "description": 0}
+        collections = [db.vinted_items] + ([db[ARCHIVE_COLLECTION]] if include_archived else [])
         
         # Create CSV content
         output = io.StringIO()
@@ -282,28 +1429,34 @@ async def export_items_csv():
         writer.writerow([
             'ID', 'Title', 'Brand', 'Category', 'Size', 'Condition', 
             'Purchase Price', 'Listed Price', 'Sold Price', 'Status',
-            'Views', 'Likes', 'Created At', 'Listed At', 'Sold At'
+            'Views', 'Likes', 'Created At', 'Listed At', 'Sold At',
+            'Expenses', 'Profit', 'ROI %'
         ])
         
-        # Write data
-        async for item in items_cursor:
-            writer.writerow([
-                item.get('id', ''),
-                item.get('title', ''),
-                item.get('brand', ''),
-                item.get('category', ''),
-                item.get('size', ''),
-                item.get('condition', ''),
-                item.get('purchase_price', 0),
-                item.get('listed_price', 0),
-                item.get('sold_price', ''),
-                item.get('status', ''),
-                item.get('views', 0),
-                item.get('likes', 0),
-                item.get('created_at', ''),
-                item.get('listed_at', ''),
-                item.get('sold_at', '')
-            ])
+        # Write data, computing metrics a batch at a time
+        for collection in collections:
+            async for batch in iter_batches(collection.find({"seller_id": seller_id}, projection)):
+                for item in compute_item_metrics(batch):
+                    writer.writerow([
+                        item.get('id', ''),
+                        item.get('title', ''),
+                        item.get('brand', ''),
+                        item.get('category', ''),
+                        item.get('size', ''),
+                        item.get('condition', ''),
+                        item.get('purchase_price', 0),
+                        item.get('listed_price', 0),
+                        item.get('sold_price', ''),
+                        item.get('status', ''),
+                        item.get('views', 0),
+                        item.get('likes', 0),
+                        item.get('created_at', ''),
+                        item.get('listed_at', ''),
+                        item.get('sold_at', ''),
+                        item.get('expenses_total', 0),
+                        item.get('profit_margin') if item.get('sold_price') is not None else '',
+                        item.get('roi_percentage') if item.get('sold_price') is not None else ''
+                    ])
         
         # Create response
         output.seek(0)
@@ -318,10 +1471,10 @@ async def export_items_csv():
 
 # Analytics Routes
 @api_router.get("/analytics/monthly", response_model=List[SalesAnalytics])
-async def get_monthly_analytics():
+async def get_monthly_analytics(seller_id: str = Depends(get_seller_id)):
     """Get monthly sales analytics"""
     try:
-        analytics = await db.sales_analytics.find({}).to_list(1000)
+        analytics = await db.sales_analytics.find({"seller_id": seller_id}).to_list(1000)
         return [SalesAnalytics(**analytic) for analytic in analytics]
     except Exception as e:
         logging.error(f"Error getting monthly analytics: {str(e)}")
@@ -350,11 +1503,26 @@ async def get_market_trends():
         logging.error(f"Error getting market trends: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get trends")
 
+@api_router.get("/pricing/suggest", response_model=PriceSuggestion)
+async def suggest_price(
+    category: str = Query(..., min_length=1),
+    brand: Optional[str] = None,
+    condition: Optional[str] = None,
+    size: Optional[str] = None,
+    seller_id: str = Depends(get_seller_id)
+):
+    """Suggest a listing price range and expected days to sell from comparable sales"""
+    try:
+        return PriceSuggestion(**await pricing_index.suggest(db, seller_id, brand, category, condition, size))
+    except Exception as e:
+        logging.error(f"Error suggesting price: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to suggest price")
+
 @api_router.get("/analytics/performance/{item_id}")
-async def get_item_performance(item_id: str):
+async def get_item_performance(item_id: str, seller_id: str = Depends(get_seller_id)):
     """Get detailed performance metrics for an item"""
     try:
-        item = await db.vinted_items.find_one({"id": item_id})
+        item = await db.vinted_items.find_one({"seller_id": seller_id, "id": item_id})
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
         
@@ -382,12 +1550,45 @@ async def get_item_performance(item_id: str):
         logging.error(f"Error getting item performance: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get performance")
 
+@api_router.get("/analytics/items/{item_id}/history")
+async def get_item_history(
+    item_id: str,
+    granularity: str = Query(DAILY, pattern=f"^({HOURLY}|{DAILY})$"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    seller_id: str = Depends(get_seller_id)
+):
+    """Engagement and price history of an item from its hourly or daily rollups"""
+    try:
+        window = rollup_window(granularity, date_from, date_to, HISTORY_DEFAULT_DAYS[granularity])
+        buckets = await item_history(db, seller_id, item_id, granularity, window, HISTORY_MAX_BUCKETS)
+        return {"item_id": item_id, "granularity": granularity, "buckets": buckets}
+    except Exception as e:
+        logging.error(f"Error getting item history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get item history")
+
+@api_router.get("/analytics/engagement")
+async def get_engagement_history(
+    granularity: str = Query(DAILY, pattern=f"^({HOURLY}|{DAILY})$"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    seller_id: str = Depends(get_seller_id)
+):
+    """Engagement across all of a seller's items per hour or day, from the rollups"""
+    try:
+        window = rollup_window(granularity, date_from, date_to, HISTORY_DEFAULT_DAYS[granularity])
+        buckets = await seller_engagement(db, seller_id, granularity, window, HISTORY_MAX_BUCKETS)
+        return {"granularity": granularity, "buckets": buckets}
+    except Exception as e:
+        logging.error(f"Error getting engagement history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get engagement history")
+
 # Notification Routes
 @api_router.get("/notifications", response_model=List[Notification])
-async def get_notifications(unread_only: bool = False):
+async def get_notifications(unread_only: bool = False, seller_id: str = Depends(get_seller_id)):
     """Get notifications"""
     try:
-        query = {"read": False} if unread_only else {}
+        query = {"seller_id": seller_id, "read": False} if unread_only else {"seller_id": seller_id}
         notifications = await db.notifications.find(query).sort("created_at", -1).to_list(1000)
         return [Notification(**notification) for notification in notifications]
     except Exception as e:
@@ -395,11 +1596,11 @@ async def get_notifications(unread_only: bool = False):
         raise HTTPException(status_code=500, detail="Failed to get notifications")
 
 @api_router.put("/notifications/{notification_id}/read")
-async def mark_notification_read(notification_id: str):
+async def mark_notification_read(notification_id: str, seller_id: str = Depends(get_seller_id)):
     """Mark notification as read"""
     try:
         result = await db.notifications.update_one(
-            {"id": notification_id},
+            {"seller_id": seller_id, "id": notification_id},
             {"$set": {"read": True}}
         )
         if result.matched_count == 0:
@@ -413,20 +1614,192 @@ async def mark_notification_read(notification_id: str):
 
 # Expense Tracking Routes
 @api_router.post("/expenses", response_model=ItemExpense)
-async def create_expense(expense: ItemExpense):
+async def create_expense(expense: ItemExpense, seller_id: str = Depends(get_seller_id)):
     """Create a new expense"""
     try:
+        expense.seller_id = seller_id
         result = await db.item_expenses.insert_one(expense.dict())
+        await apply_expense_to_item(seller_id, expense.item_id, expense.category, expense.amount)
         return expense
     except Exception as e:
         logging.error(f"Error creating expense: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create expense")
 
+@api_router.put("/expenses/{expense_id}", response_model=ItemExpense)
+async def update_expense(expense_id: str, expense_update: ItemExpenseUpdate, seller_id: str = Depends(get_seller_id)):
+    """Update an expense and adjust the item's expense totals by the difference"""
+    try:
+        update_data = {k: v for k, v in expense_update.dict().items() if v is not None}
+        if not update_data:
+            expense = await db.item_expenses.find_one({"seller_id": seller_id, "id": expense_id})
+            if not expense:
+                raise HTTPException(status_code=404, detail="Expense not found")
+            return ItemExpense(**expense)
+        
+        previous = await db.item_expenses.find_one_and_update(
+            {"seller_id": seller_id, "id": expense_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not previous:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        
+        updated = ItemExpense(**{**previous, **update_data})
+        old_category = ExpenseCategory(previous["category"])
+        if old_category == updated.category:
+            delta = updated.amount - previous["amount"]
+            if delta:
+                await apply_expense_to_item(seller_id, updated.item_id, updated.category, delta)
+        else:
+            inc = expense_totals_inc(old_category, -previous["amount"])
+            inc.update(expense_totals_inc(updated.category, updated.amount))
+            inc["expenses_total"] = updated.amount - previous["amount"]
+            await apply_expense_totals_inc(seller_id, updated.item_id, inc)
+        
+        return updated
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error updating expense: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update expense")
+
+@api_router.delete("/expenses/{expense_id}")
+async def delete_expense(expense_id: str, seller_id: str = Depends(get_seller_id)):
+    """Delete an expense and remove it from the item's expense totals"""
+    try:
+        expense = await db.item_expenses.find_one_and_delete({"seller_id": seller_id, "id": expense_id})
+        if not expense:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        await apply_expense_to_item(seller_id, expense["item_id"], expense["category"], -expense["amount"])
+        return {"message": "Expense deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error deleting expense: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to delete expense")
+
+@api_router.post("/expenses/bulk")
+async def bulk_create_expenses(request: Request, seller_id: str = Depends(get_seller_id)):
+    """Bulk create expenses from a JSON array or a streamed CSV body
+    
+    CSV bodies (Content-Type: text/csv) need a header row with item_id, category
+    and amount columns; description and date are optional.
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        created = 0
+        
+        if content_type.startswith("text/csv"):
+            batch = []
+            header = None
+            row_number = 0
+            
+            async def flush_rows(records: List[str]):
+                nonlocal header, row_number, created, batch
+                for row in csv.reader(records):
+                    if not row:
+                        continue
+                    if header is None:
+                        header = [column.strip() for column in row]
+                        continue
+                    row_number += 1
+                    values = {k: v for k, v in zip(header, row) if v != ""}
+                    try:
+                        batch.append(expense_from_input(values, seller_id))
+                    except ValidationError as e:
+                        raise HTTPException(
+                            status_code=422,
+                            detail=f"Invalid expense on CSV row {row_number} ({created} expenses already imported): {e.errors()}"
+                        )
+                    if len(batch) >= EXPENSE_INSERT_BATCH_SIZE:
+                        created += await insert_expense_batch(batch)
+                        batch = []
+            
+            # Parse complete records as they arrive instead of buffering the whole upload
+            async for records in iter_csv_records(request.stream()):
+                await flush_rows(records)
+            created += await insert_expense_batch(batch)
+        else:
+            payload = await request.json()
+            if isinstance(payload, dict):
+                payload = payload.get("expenses", [])
+            if not isinstance(payload, list):
+                raise HTTPException(status_code=422, detail="Expected a JSON array of expenses")
+            try:
+                expenses = [expense_from_input(expense, seller_id) for expense in payload]
+            except (ValidationError, TypeError, AttributeError) as e:
+                raise HTTPException(status_code=422, detail=f"Invalid expense: {str(e)}")
+            for start in range(0, len(expenses), EXPENSE_INSERT_BATCH_SIZE):
+                created += await insert_expense_batch(expenses[start:start + EXPENSE_INSERT_BATCH_SIZE])
+        
+        return {"message": f"Successfully imported {created} expenses", "created": created}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error bulk creating expenses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to import expenses")
+
+@api_router.get("/expenses")
+async def get_expenses(
+    item_id: Optional[str] = None,
+    category: Optional[ExpenseCategory] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=EXPENSE_PAGE_MAX_LIMIT),
+    seller_id: str = Depends(get_seller_id)
+):
+    """Get expenses with filters, cursor pagination and a totals summary"""
+    try:
+        query = {"seller_id": seller_id}
+        if item_id:
+            query["item_id"] = item_id
+        if category:
+            query["category"] = category
+        if date_from or date_to:
+            query["date"] = {}
+            if date_from:
+                query["date"]["$gte"] = date_from
+            if date_to:
+                query["date"]["$lte"] = date_to
+        
+        page_query = {"$and": [query, decode_expense_cursor(cursor)]} if cursor else query
+        expenses = await db.item_expenses.find(page_query, {"_id": 0}).sort(
+            [("date", DESCENDING), ("id", DESCENDING)]
+        ).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(expenses) > limit:
+            expenses = expenses[:limit]
+            next_cursor = encode_expense_cursor(expenses[-1])
+        
+        # Summary covers the whole filtered set, not just this page
+        summary = {"total_amount": 0.0, "count": 0, "by_category": {}}
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": "$category", "amount": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+        ]
+        async for row in db.item_expenses.aggregate(pipeline):
+            summary["total_amount"] += row["amount"]
+            summary["count"] += row["count"]
+            summary["by_category"][row["_id"]] = row["amount"]
+        
+        return {
+            "expenses": [ItemExpense(**expense) for expense in expenses],
+            "next_cursor": next_cursor,
+            "summary": summary
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting expenses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get expenses")
+
 @api_router.get("/expenses/item/{item_id}", response_model=List[ItemExpense])
-async def get_item_expenses(item_id: str):
+async def get_item_expenses(item_id: str, seller_id: str = Depends(get_seller_id)):
     """Get expenses for a specific item"""
     try:
-        expenses = await db.item_expenses.find({"item_id": item_id}).to_list(1000)
+        expenses = await db.item_expenses.find({"seller_id": seller_id, "item_id": item_id}).to_list(1000)
         return [ItemExpense(**expense) for expense in expenses]
     except Exception as e:
         logging.error(f"Error getting item expenses: {str(e)}")
@@ -434,51 +1807,64 @@ async def get_item_expenses(item_id: str):
 
 # ROI Target Routes
 @api_router.post("/roi-targets", response_model=ROITarget)
-async def create_roi_target(target: ROITarget):
+async def create_roi_target(target: ROITarget, seller_id: str = Depends(get_seller_id)):
     """Create or update ROI target"""
     try:
-        result = await db.roi_targets.insert_one(target.dict())
+        target.seller_id = seller_id
+        async with roi_target_locks[seller_id]:
+            roi_target_cache.pop(seller_id, None)
+            if not target.is_active:
+                await db.roi_targets.insert_one(target.dict())
+                await invalidation_bus.publish("roi_target", seller_id)
+                return target
+            
+            for attempt in range(3):
+                # Deactivate the previous target so only one stays active
+                await db.roi_targets.update_many(
+                    {"seller_id": seller_id, "is_active": True, "id": {"$ne": target.id}},
+                    {"$set": {"is_active": False}}
+                )
+                try:
+                    await db.roi_targets.insert_one(target.dict())
+                    break
+                except DuplicateKeyError:
+                    # A concurrent writer activated another target in between; retry
+                    if attempt == 2:
+                        raise
+            
+            # Other workers drop their copy once the new target is stored
+            await invalidation_bus.publish("roi_target", seller_id)
+            roi_target_cache[seller_id] = target
         return target
     except Exception as e:
         logging.error(f"Error creating ROI target: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create ROI target")
 
 @api_router.get("/roi-targets/current", response_model=ROITarget)
-async def get_current_roi_target():
+async def get_current_roi_target(seller_id: str = Depends(get_seller_id)):
     """Get current active ROI target"""
     try:
-        target = await db.roi_targets.find_one({"is_active": True})
-        if not target:
-            # Create default target
-            default_target = ROITarget(target_percentage=30.0)
-            await db.roi_targets.insert_one(default_target.dict())
-            return default_target
-        return ROITarget(**target)
+        return await get_active_roi_target(seller_id)
     except Exception as e:
         logging.error(f"Error getting ROI target: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get ROI target")
 
 # Automated Tasks Routes
 @api_router.post("/tasks/check-renewals")
-async def check_renewal_reminders():
-    """Check for items that need renewal reminders"""
+async def check_renewal_reminders(seller_id: str = Depends(get_seller_id)):
+    """Check the seller's items for ones that need renewal reminders"""
     try:
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
         # Find items that need renewal
         items_cursor = db.vinted_items.find({
-            "status": ItemStatus.ACTIVE,
-            "renewal_reminder_sent": False,
-            "$or": [
-                {"last_renewed_at": {"$lt": thirty_days_ago}},
-                {"last_renewed_at": {"$exists": False}, "listed_at": {"$lt": thirty_days_ago}}
-            ]
+            **renewal_due_query(seller_id, datetime.utcnow()),
+            "renewal_reminder_sent": False
         })
         
         renewal_count = 0
         async for item in items_cursor:
             # Create renewal reminder notification
             await create_notification(
+                seller_id,
                 NotificationType.LISTING_RENEWAL,
                 "Listing Renewal Reminder",
                 f"Consider renewing '{item['title']}' - it's been active for 30+ days",
@@ -487,8 +1873,8 @@ async def check_renewal_reminders():
             
             # Mark reminder as sent
             await db.vinted_items.update_one(
-                {"id": item["id"]},
-                {"$set": {"renewal_reminder_sent": True}}
+                {"seller_id": seller_id, "id": item["id"]},
+                item_write({"$set": {"renewal_reminder_sent": True}})
             )
             renewal_count += 1
         
@@ -498,50 +1884,224 @@ async def check_renewal_reminders():
         raise HTTPException(status_code=500, detail="Failed to check renewals")
 
 @api_router.post("/tasks/check-roi-alerts")
-async def check_roi_alerts():
-    """Check for low ROI items and send alerts"""
+async def check_roi_alerts(seller_id: str = Depends(get_seller_id)):
+    """Check the seller's sold items for low ROI and send alerts"""
     try:
         # Get current ROI target
-        target = await db.roi_targets.find_one({"is_active": True})
-        target_percentage = target["target_percentage"] if target else 20.0
+        target = await find_active_roi_target(seller_id)
+        target_percentage = target.target_percentage if target else ROI_ALERT_FALLBACK_PERCENTAGE
         
         # Find items with low ROI that haven't been alerted
         items_cursor = db.vinted_items.find({
+            "seller_id": seller_id,
             "status": ItemStatus.SOLD,
             "low_roi_alert_sent": False,
             "sold_price": {"$exists": True}
-        })
+        }, ITEM_METRICS_PROJECTION)
         
         alert_count = 0
-        async for item in items_cursor:
-            # Calculate ROI
-            costs = (item.get("purchase_price", 0) + item.get("shipping_cost", 0) + 
-                    item.get("vinted_fee", 0) + item.get("buyer_protection_fee", 0))
-            if item.get("purchase_price", 0) > 0:
-                profit = item.get("sold_price", 0) - costs
-                roi = (profit / item["purchase_price"]) * 100
-                
-                if roi < target_percentage:
-                    # Send low ROI alert
-                    await create_notification(
-                        NotificationType.PROFIT_ALERT,
-                        "Low ROI Alert",
-                        f"'{item['title']}' sold with {roi:.1f}% ROI (target: {target_percentage}%)",
-                        {"item_id": item["id"], "roi": roi, "target": target_percentage}
-                    )
-                    
-                    # Mark alert as sent
-                    await db.vinted_items.update_one(
-                        {"id": item["id"]},
-                        {"$set": {"low_roi_alert_sent": True}}
-                    )
-                    alert_count += 1
+        async for batch in iter_batches(items_cursor):
+            # Calculate ROI for the whole batch; NaN (no purchase price) never alerts
+            roi_column = item_metric_columns(batch)["roi"]
+            with np.errstate(invalid="ignore"):
+                low_roi = np.flatnonzero(roi_column < target_percentage).tolist()
+            if not low_roi:
+                continue
+            
+            # Send low ROI alerts
+            notifications = []
+            for index in low_roi:
+                item, roi = batch[index], float(roi_column[index])
+                notifications.append(Notification(
+                    seller_id=seller_id,
+                    type=NotificationType.PROFIT_ALERT,
+                    title="Low ROI Alert",
+                    message=f"'{item['title']}' sold with {roi:.1f}% ROI (target: {target_percentage}%)",
+                    data={"item_id": item["id"], "roi": roi, "target": target_percentage}
+                ).dict())
+            await db.notifications.insert_many(notifications)
+            
+            # Mark alerts as sent
+            await db.vinted_items.update_many(
+                {"seller_id": seller_id, "id": {"$in": [batch[index]["id"] for index in low_roi]}},
+                item_write({"$set": {"low_roi_alert_sent": True}})
+            )
+            alert_count += len(low_roi)
         
         return {"message": f"Sent {alert_count} ROI alerts"}
     except Exception as e:
         logging.error(f"Error checking ROI alerts: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to check ROI alerts")
 
+async def reconcile_expense_batch(seller_id: str, item_ids: List[str]) -> Tuple[int, List[str]]:
+    """Fix drifted expense totals of some items; returns the number corrected and the ids that changed meanwhile
+    
+    Items are read before their expenses are summed, and each correction is
+    conditional on the version read, so an expense applied in between wins.
+    """
+    items = await db.vinted_items.find(
+        {"seller_id": seller_id, "id": {"$in": item_ids}},
+        {"_id": 0, "id": 1, "version": 1, "expenses_total": 1, "expenses_by_category": 1}
+    ).to_list(None)
+    
+    # Sum expenses per item and category in the database
+    pipeline = [
+        {"$match": {"seller_id": seller_id, "item_id": {"$in": item_ids}}},
+        {"$group": {
+            "_id": {"item_id": "$item_id", "category": "$category"},
+            "amount": {"$sum": "$amount"}
+        }}
+    ]
+    actual = {}
+    async for row in db.item_expenses.aggregate(pipeline):
+        totals = actual.setdefault(row["_id"]["item_id"], {"expenses_total": 0.0, "expenses_by_category": {}})
+        totals["expenses_total"] += row["amount"]
+        totals["expenses_by_category"][row["_id"]["category"]] = row["amount"]
+    
+    drifted = []
+    for item in items:
+        expected = actual.get(item["id"], {"expenses_total": 0.0, "expenses_by_category": {}})
+        stored_by_category = {k: v for k, v in (item.get("expenses_by_category") or {}).items() if v}
+        if (abs((item.get("expenses_total") or 0) - expected["expenses_total"]) > 1e-6 or
+                stored_by_category.keys() != expected["expenses_by_category"].keys() or
+                any(abs(stored_by_category[k] - v) > 1e-6 for k, v in expected["expenses_by_category"].items())):
+            drifted.append((item, expected))
+    
+    # Drift is rare, so each correction is its own write and tells whether the version still matched
+    changed = []
+    for item, expected in drifted:
+        result = await db.vinted_items.update_one(
+            {"seller_id": seller_id, "id": item["id"], **version_filter(item.get("version") or 0)},
+            item_write({"$set": expected})
+        )
+        if not result.matched_count:
+            changed.append(item["id"])
+    return len(drifted) - len(changed), changed
+
+@api_router.post("/tasks/reconcile-expenses")
+async def reconcile_expense_totals(seller_id: str = Depends(get_seller_id)):
+    """Recompute the seller's denormalized expense totals from item_expenses and fix any drift
+    
+    Pages through the seller's items in id order, RECONCILE_BATCH_SIZE at a time.
+    """
+    try:
+        corrected = 0
+        conflicts = 0
+        last_id = None
+        while True:
+            query = {"seller_id": seller_id}
+            if last_id is not None:
+                query["id"] = {"$gt": last_id}
+            item_ids = [item["id"] async for item in db.vinted_items.find(
+                query, {"_id": 0, "id": 1}
+            ).sort("id", ASCENDING).limit(RECONCILE_BATCH_SIZE)]
+            if not item_ids:
+                break
+            last_id = item_ids[-1]
+            
+            pending = item_ids
+            for _ in range(RECONCILE_MAX_ATTEMPTS):
+                fixed, pending = await reconcile_expense_batch(seller_id, pending)
+                corrected += fixed
+                if not pending:
+                    break
+            conflicts += len(pending)
+        
+        return {
+            "message": f"Reconciled expense totals for {corrected} items",
+            "corrected": corrected,
+            # Still being written to after every attempt; the next run picks them up
+            "conflicts": conflicts
+        }
+    except Exception as e:
+        logging.error(f"Error reconciling expenses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to reconcile expenses")
+
+@api_router.post("/tasks/archive-items")
+async def archive_items(seller_id: str = Depends(get_seller_id)):
+    """Move the seller's old sold and archived items to the archive now instead of on the next run"""
+    try:
+        archived = await item_archiver.archive(db, [seller_id])
+        return {"message": f"Archived {archived} items", "archived": archived}
+    except Exception as e:
+        logging.error(f"Error archiving items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to archive items")
+
+# Admin Routes
+@api_router.get("/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def get_slow_queries(
+    collection: Optional[str] = None,
+    route: Optional[str] = None,
+    flag: Optional[str] = Query(None, description="COLLSCAN or HIGH_EXAMINED_RATIO"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Slow Mongo commands with their query shape, calling route and sampled explain summary"""
+    if slow_query_log is None:
+        return {"enabled": False, "entries": [], "summary": []}
+    return {
+        "enabled": True,
+        "threshold_ms": slow_query_log.settings.threshold_ms,
+        "entries": slow_query_log.query(collection, route, flag, limit),
+        "summary": slow_query_log.summary(),
+    }
+
+@api_router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent request profiles captured with the X-Profile header or ?profile=1"""
+    return {"profiles": profile_store.list()}
+
+@api_router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """Download a request profile as collapsed stacks for flamegraph.pl or speedscope"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        collapsed_stacks(profile),
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.folded"}
+    )
+
+# Health Routes
+@api_router.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def health_ready():
+    """Readiness probe: the database answers a ping; includes Mongo connection pool saturation"""
+    pool = pool_stats.snapshot() if pool_stats else None
+    heavy_pool = heavy_pool_stats.snapshot() if heavy_pool_stats else None
+    if db is None:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "reason": "database not connected", "pool": pool})
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=HEALTH_PING_TIMEOUT_SECONDS)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "reason": str(e), "pool": pool})
+    return {
+        "status": "ready",
+        "pool": pool,
+        "heavy_pool": heavy_pool,
+        "saturated": bool(pool and pool["checked_out"] >= pool["max_pool_size"] and pool["waiting"] > 0),
+        "admission": {name: lane.snapshot() for name, lane in admission_lanes.items()}
+    }
+
+def collect_pool_metrics():
+    """Refresh the Mongo pool gauges from the pool listener before a scrape"""
+    if pool_stats is None:
+        return
+    pool = pool_stats.snapshot()
+    for state in ("open_connections", "checked_out", "waiting"):
+        MONGO_POOL_CONNECTIONS.set((state,), pool[state])
+    MONGO_POOL_SATURATION.set((), pool["saturation"])
+
+register_collector(collect_pool_metrics)
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: route latency, Mongo command timings, pool and cache stats"""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Legacy routes for backward compatibility
 @api_router.get("/")
 async def root():
@@ -550,6 +2110,15 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(
+    AdmissionMiddleware,
+    lanes=admission_lanes,
+    heavy_routes=HEAVY_ROUTES,
+    exempt_routes=ADMISSION_EXEMPT_ROUTES,
+)
+app.add_middleware(RouteMetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -565,6 +2134,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def backfill_seller_ids():
+    """Assign documents written before multi-seller support to the default seller
+
+    Each backfill scans whole collections, so it runs once per database and is
+    then recorded in `migrations`. New documents always carry a seller_id.
+    """
+    if await db.migrations.find_one({"name": SELLER_ID_BACKFILL_MIGRATION}):
+        return
+    for name in SELLER_SCOPED_COLLECTIONS:
+        await db[name].update_many({"seller_id": {"$exists": False}}, {"$set": {"seller_id": DEFAULT_SELLER_ID}})
+    # Workers starting together may both run it; the backfill is idempotent and the record an upsert
+    await db.migrations.update_one(
+        {"name": SELLER_ID_BACKFILL_MIGRATION},
+        {"$set": {"name": SELLER_ID_BACKFILL_MIGRATION, "completed_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def drop_legacy_indexes():
+    """Drop the global indexes that the seller-led ones replace"""
+    for name, index_names in LEGACY_INDEXES.items():
+        existing = await db[name].index_information()
+        for index_name in index_names:
+            if index_name in existing:
+                await db[name].drop_index(index_name)
+
+async def create_indexes():
+    """Create the indexes the query routes rely on
+    
+    Every index leads with seller_id, so a seller's queries only touch their
+    own key range and each collection can be sharded on seller_id.
+    """
+    try:
+        await backfill_seller_ids()
+        await db.vinted_items.create_index([("seller_id", ASCENDING), ("id", ASCENDING)], unique=True)
+        await db.vinted_items.create_index([("seller_id", ASCENDING), ("status", ASCENDING)])
+        await db.vinted_items.create_index([("seller_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)])
+        # Work queues: partial indexes over just the candidates of each queue
+        await db.vinted_items.create_index(
+            [("seller_id", ASCENDING), ("last_renewed_at", ASCENDING), ("listed_at", ASCENDING)],
+            partialFilterExpression={"status": ItemStatus.ACTIVE.value},
+            name="renewal_queue"
+        )
+        await db.vinted_items.create_index(
+            [("seller_id", ASCENDING), ("listed_at", ASCENDING)],
+            partialFilterExpression={"status": ItemStatus.ACTIVE.value, "views": {"$lt": LOW_PERFORMING_MAX_VIEWS}},
+            name="low_performing_queue"
+        )
+        # Incremental refresh of the pricing index: sold items updated since a watermark
+        await db.vinted_items.create_index(
+            [("seller_id", ASCENDING), ("status", ASCENDING), ("updated_at", ASCENDING)]
+        )
+        await db.item_expenses.create_index([("seller_id", ASCENDING), ("item_id", ASCENDING)])
+        await db.item_expenses.create_index([("seller_id", ASCENDING), ("id", ASCENDING)])
+        await db.item_expenses.create_index([("seller_id", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)])
+        await db.item_expenses.create_index(
+            [("seller_id", ASCENDING), ("category", ASCENDING), ("date", DESCENDING)]
+        )
+        await db.notifications.create_index([("seller_id", ASCENDING), ("data.item_id", ASCENDING)])
+        await db.notifications.create_index([("seller_id", ASCENDING), ("created_at", DESCENDING)])
+        await db.sales_analytics.create_index([("seller_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)])
+        await create_idempotency_indexes(db.idempotency_keys)
+        
+        # Keep only the newest active ROI target per seller before enforcing uniqueness
+        active_targets = await db.roi_targets.find(
+            {"is_active": True}, {"_id": 0, "id": 1, "seller_id": 1}
+        ).sort("created_at", DESCENDING).to_list(None)
+        newest = {}
+        stale = [t["id"] for t in active_targets if newest.setdefault(t["seller_id"], t["id"]) != t["id"]]
+        if stale:
+            await db.roi_targets.update_many(
+                {"id": {"$in": stale}},
+                {"$set": {"is_active": False}}
+            )
+        await db.roi_targets.create_index(
+            [("seller_id", ASCENDING), ("is_active", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"is_active": True}
+        )
+        
+        # Only one text index is allowed per collection, so the old one goes first
+        await drop_legacy_indexes()
+        await db.vinted_items.create_index(
+            [("seller_id", ASCENDING), *[(field, "text") for field in ITEM_TEXT_INDEX_WEIGHTS]],
+            weights=ITEM_TEXT_INDEX_WEIGHTS,
+            name="items_text_search_by_seller",
+            default_language="english"
+        )
+        await create_item_event_collections(db)
+        await create_archive_indexes(db)
+    except Exception as e:
+        logger.error(f"Error creating indexes: {str(e)}")
@@ -0,0 +1,280 @@
+"""Opt-in slow query log with sampled explain capture.
+
+A pymongo CommandListener records commands slower than a threshold together
+with their redacted filter shape and the route that issued them. A sample of
+those commands is re-run as explain("executionStats") in the background to
+flag collection scans and queries that examine far more documents than they
+return. Entries are kept in a bounded in-memory buffer served by an admin
+route.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from .metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+# Commands that can be explained
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+
+@dataclass
+class SlowQuerySettings:
+    enabled: bool = False
+    threshold_ms: float = 100.0
+    explain_sample_rate: float = 0.2
+    examined_ratio_threshold: float = 10.0
+    buffer_size: int = 500
+
+    @classmethod
+    def from_env(cls) -> "SlowQuerySettings":
+        """Read settings from SLOW_QUERY_* environment variables; disabled unless SLOW_QUERY_LOG=1"""
+        return cls(
+            enabled=os.environ.get("SLOW_QUERY_LOG", "0").lower() in ("1", "true", "yes"),
+            threshold_ms=float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100.0)),
+            explain_sample_rate=float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.2)),
+            examined_ratio_threshold=float(os.environ.get("SLOW_QUERY_EXAMINED_RATIO", 10.0)),
+            buffer_size=int(os.environ.get("SLOW_QUERY_BUFFER_SIZE", 500)),
+        )
+
+
+def redact(value):
+    """Replace literal values with "?" while keeping field names, operators and field paths"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = redact(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> dict:
+    """The redacted parts of a command that determine which index it can use"""
+    if command_name == "find":
+        return {key: redact(command[key]) if key == "filter" else command[key]
+                for key in ("filter", "sort") if key in command}
+    if command_name == "aggregate":
+        return {"pipeline": redact(command.get("pipeline", []))}
+    if command_name in ("count", "distinct"):
+        shape = {"query": redact(command.get("query", {}))}
+        if "key" in command:
+            shape["key"] = command["key"]
+        return shape
+    if command_name == "findAndModify":
+        return {key: redact(command[key]) if key == "query" else command[key]
+                for key in ("query", "sort") if key in command}
+    if command_name == "update":
+        return {"q": redact([statement.get("q", {}) for statement in command.get("updates", [])])}
+    if command_name == "delete":
+        return {"q": redact([statement.get("q", {}) for statement in command.get("deletes", [])])}
+    return {}
+
+
+def _find_stages(plan, stages: set):
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.add(plan["stage"])
+        for value in plan.values():
+            _find_stages(value, stages)
+    elif isinstance(plan, list):
+        for value in plan:
+            _find_stages(value, stages)
+
+
+def _find_execution_stats(explain) -> Optional[dict]:
+    if isinstance(explain, dict):
+        if "executionStats" in explain:
+            return explain["executionStats"]
+        values = explain.values()
+    elif isinstance(explain, list):
+        values = explain
+    else:
+        return None
+    for value in values:
+        stats = _find_execution_stats(value)
+        if stats is not None:
+            return stats
+    return None
+
+
+def summarize_explain(explain: dict, ratio_threshold: float) -> dict:
+    """Plan stages, examined/returned counts and flags from explain("executionStats") output"""
+    stages = set()
+    _find_stages(explain.get("queryPlanner", explain), stages)
+    stats = _find_execution_stats(explain) or {}
+    examined = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+    ratio = examined / max(returned, 1)
+    flags = []
+    if "COLLSCAN" in stages:
+        flags.append("COLLSCAN")
+    if examined and ratio >= ratio_threshold:
+        flags.append("HIGH_EXAMINED_RATIO")
+    return {
+        "stages": sorted(stages),
+        "docs_examined": examined,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "n_returned": returned,
+        "examined_ratio": round(ratio, 2),
+        "execution_ms": stats.get("executionTimeMillis"),
+        "flags": flags,
+    }
+
+
+class SlowQueryLog:
+    """Bounded buffer of slow commands plus explain summaries cached per query shape"""
+
+    def __init__(self, settings: SlowQuerySettings):
+        self.settings = settings
+        self.entries = deque(maxlen=settings.buffer_size)
+        self.explains: Dict[Tuple, dict] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        """Give the log a client and event loop to run sampled explains on"""
+        self._client = client
+        self._loop = loop
+
+    def record(self, entry: dict, command: dict):
+        key = (entry["database"], entry["collection"], entry["command"], repr(entry["shape"]))
+        with self._lock:
+            entry["explain"] = self.explains.get(key)
+            self.entries.append(entry)
+            should_explain = (
+                entry["explain"] is None
+                and key not in self._pending
+                and entry["command"] in EXPLAINABLE_COMMANDS
+                and self._loop is not None
+                and random.random() < self.settings.explain_sample_rate
+            )
+            if should_explain:
+                self._pending.add(key)
+        if should_explain:
+            # Listeners run on pymongo's threads and must not block; explain on the loop
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._explain(key, entry["database"], command))
+            )
+
+    async def _explain(self, key: Tuple, database: str, command: dict):
+        explainable = {k: v for k, v in command.items()
+                       if k not in ("lsid", "$db", "$clusterTime", "$readPreference", "txnNumber")}
+        # explain takes a single update or delete statement
+        for statements in ("updates", "deletes"):
+            if statements in explainable:
+                explainable[statements] = explainable[statements][:1]
+        try:
+            explain = await self._client[database].command({"explain": explainable, "verbosity": "executionStats"})
+            summary = summarize_explain(explain, self.settings.examined_ratio_threshold)
+        except Exception as e:
+            logger.warning(f"Error explaining slow {key[2]} on {key[1]}: {str(e)}")
+            summary = {"error": str(e), "flags": []}
+        with self._lock:
+            self._pending.discard(key)
+            self.explains[key] = summary
+            for entry in self.entries:
+                if entry["explain"] is None and (entry["database"], entry["collection"], entry["command"], repr(entry["shape"])) == key:
+                    entry["explain"] = summary
+
+    def query(self, collection: Optional[str] = None, route: Optional[str] = None,
+              flag: Optional[str] = None, limit: int = 100) -> List[dict]:
+        """Newest matching entries first"""
+        with self._lock:
+            entries = list(self.entries)
+        results = []
+        for entry in reversed(entries):
+            if collection and entry["collection"] != collection:
+                continue
+            if route and entry["route"] != route:
+                continue
+            if flag and flag not in ((entry["explain"] or {}).get("flags") or []):
+                continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+    def summary(self) -> List[dict]:
+        """Slow commands grouped by route and query shape, slowest total time first"""
+        with self._lock:
+            entries = list(self.entries)
+        groups: Dict[Tuple, dict] = {}
+        for entry in entries:
+            key = (entry["route"], entry["collection"], entry["command"], repr(entry["shape"]))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "route": entry["route"], "collection": entry["collection"], "command": entry["command"],
+                    "shape": entry["shape"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "explain": None,
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            group["explain"] = entry["explain"] or group["explain"]
+        for group in groups.values():
+            group["mean_ms"] = round(group["total_ms"] / group["count"], 2)
+            group["total_ms"] = round(group["total_ms"], 2)
+        return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Feeds commands slower than the threshold into a SlowQueryLog"""
+
+    def __init__(self, log: SlowQueryLog):
+        self.log = log
+        self._started: Dict[Tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE_COMMANDS and event.command_name != "getMore":
+            return
+        # Motor runs commands with the caller's context, so the route is visible here
+        with self._lock:
+            self._started[(event.request_id, event.connection_id)] = (
+                event.command, event.database_name, current_route.get()
+            )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            started = self._started.pop((event.request_id, event.connection_id), None)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.log.settings.threshold_ms:
+            return
+        command, database, route = started
+        name = event.command_name
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        self.log.record({
+            "timestamp": datetime.utcnow(),
+            "route": route,
+            "database": database,
+            "collection": collection if isinstance(collection, str) else "",
+            "command": name,
+            "duration_ms": round(duration_ms, 2),
+            "shape": command_shape(name, command),
+            "failed": isinstance(event, monitoring.CommandFailedEvent),
+        }, command)
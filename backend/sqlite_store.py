@@ -0,0 +1,1301 @@
+"""Embedded SQLite document store.
+
+Implements the subset of Motor's database/collection API that the routes use,
+so the API can run without a MongoDB server (single-seller deployments, CI and
+benchmarks). Each collection is a table of JSON documents; `create_index`
+builds SQLite expression indexes over `json_extract()` and text indexes become
+FTS5 tables. Filters on indexed fields are pushed down to SQL, and every
+candidate row is then checked against the full Mongo filter in Python, so
+results match MongoDB for the supported operators.
+"""
+import asyncio
+import copy
+import functools
+import json
+import math
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+_SCALAR_TYPES = (str, int, float, bool, datetime)
+
+
+# Encoding: documents are stored as JSON, with a sidecar listing the paths
+# that held datetimes or ObjectIds so they can be restored on read
+
+def _normalize(value):
+    """Convert a value to what a round-trip through the store returns"""
+    if isinstance(value, Enum):
+        return _normalize(value.value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        # BSON dates have millisecond precision
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _encode(doc: dict) -> Tuple[str, str]:
+    types = {"d": [], "o": []}
+
+    def walk(value, path):
+        if isinstance(value, datetime):
+            types["d"].append(path)
+            return value.isoformat(timespec="microseconds")
+        if isinstance(value, ObjectId):
+            types["o"].append(path)
+            return str(value)
+        if isinstance(value, dict):
+            return {k: walk(v, path + [k]) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(v, path + [i]) for i, v in enumerate(value)]
+        return value
+
+    encoded = walk(doc, [])
+    return json.dumps(encoded, separators=(",", ":")), json.dumps(types) if types["d"] or types["o"] else ""
+
+
+def _decode(text: str, types: str) -> dict:
+    doc = json.loads(text)
+    if types:
+        spec = json.loads(types)
+        for kind, convert in (("d", datetime.fromisoformat), ("o", ObjectId)):
+            for path in spec.get(kind, []):
+                container = doc
+                for part in path[:-1]:
+                    container = container[part]
+                container[path[-1]] = convert(container[path[-1]])
+    return doc
+
+
+def _sql_value(value):
+    """Encode a scalar query operand the way _encode stores it"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    return value
+
+
+def _json_path(field: str) -> str:
+    return "$" + "".join(f'."{part}"' for part in field.split("."))
+
+
+def _field_sql(field: str) -> str:
+    return f"json_extract(doc, '{_json_path(field)}')"
+
+
+# Paths, comparison and sorting
+
+def _resolve(value, parts: List[str]) -> list:
+    """All values at a dotted path, fanning out across arrays like MongoDB"""
+    if not parts:
+        return [value]
+    part, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        if part not in value:
+            return []
+        return _resolve(value[part], rest)
+    if isinstance(value, list):
+        if part.isdigit() and int(part) < len(value):
+            return _resolve(value[int(part)], rest)
+        results = []
+        for element in value:
+            if isinstance(element, (dict, list)):
+                results.extend(_resolve(element, parts))
+        return results
+    return []
+
+
+def _get(doc: dict, path: str, default=None):
+    values = _resolve(doc, path.split("."))
+    return values[0] if values else default
+
+
+def _set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    container = doc
+    for part in parts[:-1]:
+        if isinstance(container, list):
+            container = container[int(part)]
+            continue
+        if not isinstance(container.get(part), (dict, list)):
+            container[part] = {}
+        container = container[part]
+    if isinstance(container, list):
+        container[int(parts[-1])] = value
+    else:
+        container[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    container = doc
+    for part in parts[:-1]:
+        container = container.get(part) if isinstance(container, dict) else None
+        if container is None:
+            return
+    if isinstance(container, dict):
+        container.pop(parts[-1], None)
+
+
+def _type_rank(value) -> int:
+    # MongoDB BSON comparison order
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5):
+        return (rank, json.dumps(value, default=str, sort_keys=True))
+    if rank == 7:
+        return (rank, str(value))
+    return (rank, value)
+
+
+def _compare(a, b) -> Optional[int]:
+    """Compare two values of the same BSON type class; None when not comparable"""
+    if _type_rank(a) != _type_rank(b) or _type_rank(a) in (1, 4, 5, 10):
+        return None
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return None
+
+
+def _equal(a, b) -> bool:
+    if (a is None or a is _MISSING) and (b is None or b is _MISSING):
+        return True
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+
+def _sort_documents(documents: List[dict], sort: List[Tuple[str, Any]], scores: Dict[int, float] = None):
+    for field, direction in reversed(sort):
+        if isinstance(direction, dict) and direction.get("$meta") == "textScore":
+            documents.sort(key=lambda d: scores.get(id(d), 0.0) if scores else 0.0, reverse=True)
+        else:
+            documents.sort(key=lambda d: _sort_key(_get(d, field, None)), reverse=direction in (-1, "desc", "descending"))
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[Tuple[str, Any]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [tuple(item) for item in key_or_list]
+
+
+# Query matching
+
+def _candidates(values: list) -> list:
+    if not values:
+        return [_MISSING]
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _match_operators(values: list, operators: dict) -> bool:
+    candidates = _candidates(values)
+    for op, operand in operators.items():
+        if op == "$eq":
+            ok = any(_equal(c, operand) for c in candidates)
+        elif op == "$ne":
+            ok = not any(_equal(c, operand) for c in candidates)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            def check(c):
+                result = _compare(c, operand)
+                if result is None:
+                    return False
+                return {"$gt": result > 0, "$gte": result >= 0, "$lt": result < 0, "$lte": result <= 0}[op]
+            ok = any(check(c) for c in candidates)
+        elif op == "$in":
+            ok = any(_equal(c, item) for c in candidates for item in operand)
+        elif op == "$nin":
+            ok = not any(_equal(c, item) for c in candidates for item in operand)
+        elif op == "$exists":
+            ok = bool(values) == bool(operand)
+        elif op == "$regex":
+            flags = 0
+            for letter in operators.get("$options", ""):
+                flags |= {"i": re.I, "m": re.M, "s": re.S, "x": re.X}.get(letter, 0)
+            pattern = operand if isinstance(operand, re.Pattern) else re.compile(operand, flags)
+            ok = any(isinstance(c, str) and pattern.search(c) for c in candidates)
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            ok = not _match_operators(values, operand)
+        elif op == "$size":
+            ok = any(isinstance(v, list) and len(v) == operand for v in values)
+        elif op == "$all":
+            ok = all(any(_equal(c, item) for c in candidates) for item in operand)
+        elif op == "$elemMatch":
+            ok = any(
+                isinstance(element, dict) and _matches(element, operand)
+                for value in values if isinstance(value, list) for element in value
+            )
+        else:
+            raise OperationFailure(f"Unsupported query operator for the SQLite store: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _is_operator_dict(value) -> bool:
+    return isinstance(value, dict) and bool(value) and all(str(k).startswith("$") for k in value)
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$expr":
+            if not _truthy(_evaluate(doc, condition)):
+                return False
+        elif key in ("$text", "$comment"):
+            continue  # $text is resolved through the FTS table
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator for the SQLite store: {key}")
+        else:
+            values = _resolve(doc, key.split("."))
+            if isinstance(condition, re.Pattern):
+                condition = {"$regex": condition}
+            if _is_operator_dict(condition):
+                if not _match_operators(values, condition):
+                    return False
+            elif not any(_equal(c, condition) for c in _candidates(values)):
+                return False
+    return True
+
+
+# Aggregation expressions
+
+def _truthy(value) -> bool:
+    return value not in (None, False, 0, _MISSING) and not (isinstance(value, float) and math.isnan(value))
+
+
+def _numeric(values):
+    return [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def _evaluate(doc, expression, variables=None):
+    if isinstance(expression, str):
+        if expression.startswith("$$"):
+            name, _, rest = expression[2:].partition(".")
+            base = doc if name in ("ROOT", "CURRENT") else (variables or {}).get(name)
+            return _get(base, rest) if rest else base
+        if expression.startswith("$"):
+            values = _resolve(doc, expression[1:].split("."))
+            if not values:
+                return None
+            return values[0] if len(values) == 1 else values
+        return expression
+    if isinstance(expression, list):
+        return [_evaluate(doc, item, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) == 1:
+        op, args = next(iter(expression.items()))
+        if op.startswith("$"):
+            return _evaluate_operator(doc, op, args, variables)
+    return {key: _evaluate(doc, value, variables) for key, value in expression.items()}
+
+
+def _evaluate_operator(doc, op, args, variables):
+    if op == "$literal":
+        return args
+
+    def arg_list():
+        evaluated = _evaluate(doc, args, variables)
+        return evaluated if isinstance(args, list) else [evaluated]
+
+    if op == "$cond":
+        if isinstance(args, dict):
+            condition, then, otherwise = args["if"], args["then"], args["else"]
+        else:
+            condition, then, otherwise = args
+        return _evaluate(doc, then if _truthy(_evaluate(doc, condition, variables)) else otherwise, variables)
+    if op == "$ifNull":
+        values = args if isinstance(args, list) else [args]
+        for value in values[:-1]:
+            result = _evaluate(doc, value, variables)
+            if result is not None:
+                return result
+        return _evaluate(doc, values[-1], variables)
+    if op == "$and":
+        return all(_truthy(_evaluate(doc, a, variables)) for a in args)
+    if op == "$or":
+        return any(_truthy(_evaluate(doc, a, variables)) for a in args)
+
+    values = arg_list()
+    if op == "$not":
+        return not _truthy(values[0])
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        a, b = values
+        if op == "$eq":
+            return _equal(a, b)
+        if op == "$ne":
+            return not _equal(a, b)
+        ka, kb = _sort_key(a), _sort_key(b)
+        return {"$gt": ka > kb, "$gte": ka >= kb, "$lt": ka < kb, "$lte": ka <= kb}[op]
+    if op == "$in":
+        return any(_equal(values[0], item) for item in (values[1] or []))
+    if op in ("$add", "$subtract", "$multiply", "$divide", "$mod"):
+        if any(v is None for v in values):
+            return None
+        if op == "$add":
+            dates = [v for v in values if isinstance(v, datetime)]
+            total = sum(_numeric(values))
+            return dates[0] + timedelta(milliseconds=total) if dates else total
+        a, b = values
+        if op == "$subtract":
+            if isinstance(a, datetime) and isinstance(b, datetime):
+                return int((a - b) / timedelta(milliseconds=1))
+            if isinstance(a, datetime):
+                return a - timedelta(milliseconds=b)
+            return a - b
+        if op == "$multiply":
+            result = 1
+            for v in values:
+                result *= v
+            return result
+        if op == "$divide":
+            return a / b
+        return math.fmod(a, b)
+    if op in ("$floor", "$ceil", "$abs", "$sqrt", "$ln", "$log10"):
+        value = values[0]
+        if value is None:
+            return None
+        function = {"$floor": math.floor, "$ceil": math.ceil, "$abs": abs, "$sqrt": math.sqrt,
+                    "$ln": math.log, "$log10": math.log10}[op]
+        return function(value)
+    if op == "$round":
+        value, places = (values + [0])[:2]
+        return None if value is None else round(value, places)
+    if op in ("$max", "$min", "$sum", "$avg"):
+        items = values[0] if len(values) == 1 and isinstance(values[0], list) else values
+        present = [v for v in items if v is not None]
+        if op == "$sum":
+            return sum(_numeric(present))
+        if op == "$avg":
+            numbers = _numeric(present)
+            return sum(numbers) / len(numbers) if numbers else None
+        if not present:
+            return None
+        return (max if op == "$max" else min)(present, key=_sort_key)
+    if op == "$size":
+        return len(values[0] or [])
+    if op == "$concat":
+        return None if any(v is None for v in values) else "".join(values)
+    if op == "$toLower":
+        return (values[0] or "").lower()
+    if op == "$toUpper":
+        return (values[0] or "").upper()
+    if op == "$toString":
+        return None if values[0] is None else str(values[0])
+    if op in ("$year", "$month", "$dayOfMonth", "$hour", "$minute", "$dayOfWeek", "$dayOfYear"):
+        date = values[0]
+        if date is None:
+            return None
+        return {
+            "$year": date.year, "$month": date.month, "$dayOfMonth": date.day, "$hour": date.hour,
+            "$minute": date.minute, "$dayOfWeek": date.isoweekday() % 7 + 1,
+            "$dayOfYear": date.timetuple().tm_yday,
+        }[op]
+    if op == "$dateTrunc":
+        spec = {k: _evaluate(doc, v, variables) for k, v in args.items()}
+        date, unit = spec["date"], spec["unit"]
+        if date is None:
+            return None
+        if unit == "year":
+            return date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        if unit == "month":
+            return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        if unit == "week":
+            start = date - timedelta(days=date.isoweekday() % 7)
+            return start.replace(hour=0, minute=0, second=0, microsecond=0)
+        if unit == "day":
+            return date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if unit == "hour":
+            return date.replace(minute=0, second=0, microsecond=0)
+        if unit == "minute":
+            return date.replace(second=0, microsecond=0)
+        raise OperationFailure(f"Unsupported $dateTrunc unit for the SQLite store: {unit}")
+    if op == "$arrayElemAt":
+        array, index = values
+        try:
+            return array[index]
+        except (IndexError, TypeError):
+            return None
+    raise OperationFailure(f"Unsupported expression operator for the SQLite store: {op}")
+
+
+# Updates
+
+def _apply_update(doc: dict, update: dict, is_insert: bool = False) -> dict:
+    if not any(str(k).startswith("$") for k in update):
+        replacement = _normalize(update)
+        if "_id" in doc:
+            replacement["_id"] = doc["_id"]
+        return replacement
+
+    for op, fields in update.items():
+        fields = {k: _normalize(v) for k, v in fields.items()}
+        if op == "$set":
+            for path, value in fields.items():
+                _set_path(doc, path, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            if is_insert:
+                for path, value in fields.items():
+                    _set_path(doc, path, copy.deepcopy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get(doc, path, None)
+                _set_path(doc, path, (current or 0) + amount)
+        elif op in ("$min", "$max"):
+            for path, value in fields.items():
+                current = _get(doc, path, _MISSING)
+                if current is _MISSING or (_sort_key(value) < _sort_key(current)) == (op == "$min") and value != current:
+                    _set_path(doc, path, value)
+        elif op in ("$push", "$addToSet"):
+            for path, value in fields.items():
+                current = _get(doc, path, None)
+                items = list(current) if isinstance(current, list) else []
+                new_items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in new_items:
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                if isinstance(value, dict) and "$slice" in value:
+                    limit = value["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                _set_path(doc, path, items)
+        elif op == "$currentDate":
+            for path in fields:
+                _set_path(doc, path, _normalize(datetime.utcnow()))
+        else:
+            raise OperationFailure(f"Unsupported update operator for the SQLite store: {op}")
+    return doc
+
+
+def _upsert_seed(query: dict) -> dict:
+    """Document fields implied by the equality conditions of an upsert filter"""
+    seed = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for sub in condition:
+                seed.update(_upsert_seed(sub))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(condition):
+            if "$eq" in condition:
+                _set_path(seed, key, _normalize(condition["$eq"]))
+        else:
+            _set_path(seed, key, _normalize(condition))
+    return seed
+
+
+# Projection
+
+def _project(doc: dict, projection, score: Optional[float] = None) -> dict:
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    meta = {k: v for k, v in projection.items() if isinstance(v, dict) and "$meta" in v}
+    fields = {k: v for k, v in projection.items() if k not in meta}
+    inclusive = any(_truthy(v) for k, v in fields.items() if k != "_id")
+
+    if inclusive:
+        result = {}
+        if fields.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for path, include in fields.items():
+            if path == "_id" or not _truthy(include):
+                continue
+            values = _resolve(doc, path.split("."))
+            if values:
+                _set_path(result, path, values[0])
+    else:
+        result = doc
+        for path, include in fields.items():
+            if not _truthy(include):
+                _unset_path(result, path)
+    for field in meta:
+        result[field] = score if score is not None else 0.0
+    return result
+
+
+# SQL push-down of filters on indexed fields
+
+def _compile_filter(query: dict, indexed: set) -> Tuple[List[str], list, bool]:
+    """SQL conditions for the scalar parts of a filter
+
+    Indexed fields are assumed to hold scalars, so their conditions can use the
+    expression indexes. Unindexed top-level fields are filtered too, but let
+    arrays through for the Python matcher since MongoDB matches their elements.
+    Returns (clauses, params, complete); complete means the SQL conditions alone
+    are equivalent to the filter, so sorting and paging can happen in SQL too.
+    """
+    clauses, params, complete = [], [], True
+    for key, condition in query.items():
+        if key == "$and":
+            for sub in condition:
+                sub_clauses, sub_params, sub_complete = _compile_filter(sub, indexed)
+                clauses.extend(sub_clauses)
+                params.extend(sub_params)
+                complete = complete and sub_complete
+            continue
+        if key.startswith("$") or (key not in indexed and "." in key):
+            complete = False
+            continue
+        column = _field_sql(key)
+        field_clauses = []
+        if isinstance(condition, _SCALAR_TYPES) and not isinstance(condition, bool):
+            field_clauses.append(f"{column} = ?")
+            params.append(_sql_value(_normalize(condition)))
+        elif not _is_operator_dict(condition):
+            complete = False
+        else:
+            for op, operand in condition.items():
+                operand = _normalize(operand)
+                if op in ("$gt", "$gte", "$lt", "$lte") and isinstance(operand, _SCALAR_TYPES) and not isinstance(operand, bool):
+                    sql_op = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                    field_clauses.append(f"{column} {sql_op} ?")
+                    params.append(_sql_value(operand))
+                    # SQLite orders numbers before text, unlike BSON type brackets
+                    complete = False
+                elif op == "$eq" and isinstance(operand, _SCALAR_TYPES) and not isinstance(operand, bool):
+                    field_clauses.append(f"{column} = ?")
+                    params.append(_sql_value(operand))
+                elif (op == "$in" and operand
+                      and all(isinstance(v, _SCALAR_TYPES) and not isinstance(v, bool) for v in operand)):
+                    field_clauses.append(f"{column} IN ({', '.join('?' for _ in operand)})")
+                    params.extend(_sql_value(v) for v in operand)
+                else:
+                    complete = False
+        if key in indexed:
+            clauses.extend(field_clauses)
+        elif field_clauses:
+            array_check = f"json_type(doc, '{_json_path(key)}') = 'array'"
+            clauses.extend(f"({array_check} OR {clause})" for clause in field_clauses)
+            complete = False
+    return clauses, params, complete
+
+
+def _fts_query(search: str) -> Optional[str]:
+    """Translate a MongoDB $text search string into an FTS5 query"""
+    phrases = re.findall(r'"([^"]+)"', search)
+    remainder = re.sub(r'"[^"]*"', " ", search)
+    terms, negated = [], []
+    for token in re.findall(r"-?[\w']+", remainder):
+        (negated if token.startswith("-") else terms).append(token.lstrip("-"))
+
+    def quote(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    positive = " OR ".join(quote(t) for t in terms)
+    parts = [quote(p) for p in phrases]
+    if positive:
+        parts.append(f"({positive})")
+    if not parts:
+        return None
+    fts = " AND ".join(parts)
+    if negated:
+        fts = f"({fts}) NOT ({' OR '.join(quote(t) for t in negated)})"
+    return fts
+
+
+class _Result(SimpleNamespace):
+    acknowledged = True
+
+
+class SQLiteCursor:
+    """Lazy find() cursor supporting sort/skip/limit, async iteration and to_list"""
+
+    def __init__(self, collection, query, projection, sort=None, skip=0, limit=0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort)
+        self._skip = skip
+        self._limit = limit
+        self._results = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int):
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int):
+        return self
+
+    async def _load(self):
+        if self._results is None:
+            self._results = await self._collection._run(
+                self._collection._find, self._query, self._projection, self._sort, self._skip, self._limit
+            )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._load()
+        if self._position >= len(self._results):
+            raise StopAsyncIteration
+        self._position += 1
+        return self._results[self._position - 1]
+
+    async def to_list(self, length: Optional[int] = None):
+        await self._load()
+        remaining = self._results[self._position:]
+        if length:
+            remaining = remaining[:length]
+        self._position += len(remaining)
+        return remaining
+
+
+class SQLiteAggregationCursor(SQLiteCursor):
+    def __init__(self, collection, pipeline):
+        super().__init__(collection, {}, None)
+        self._pipeline = pipeline
+
+    async def _load(self):
+        if self._results is None:
+            self._results = await self._collection._run(self._collection._aggregate, self._pipeline)
+
+
+class SQLiteCollection:
+    """A MongoDB-like collection stored in one SQLite table"""
+
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._table = f'"{name}"'
+        self._indexed = set()
+        self._text_fields: List[str] = []
+        self._text_weights: List[float] = []
+        self._text_index_name: Optional[str] = None
+        # Constructed on the store's worker thread, see SQLiteDatabase.get_collection
+        database._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} (rowid INTEGER PRIMARY KEY, doc TEXT NOT NULL, types TEXT)"
+        )
+        self._load_existing_indexes()
+
+    @property
+    def _fts(self) -> str:
+        return f'"{self.name}__fts"'
+
+    def _load_existing_indexes(self):
+        connection = self.database._connection
+        self._indexed = set()
+        self._text_fields, self._text_weights, self._text_index_name = [], [], None
+        for (sql,) in connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (self.name,)
+        ):
+            self._indexed.update(path.replace('"', "").replace("$.", "", 1)
+                                 for path in re.findall(r"json_extract\(doc, '([^']+)'\)", sql))
+        row = connection.execute(
+            "SELECT value FROM _store_meta WHERE key = ?", (f"text:{self.name}",)
+        ).fetchone()
+        if row:
+            spec = json.loads(row[0])
+            self._text_fields, self._text_weights = spec["fields"], spec["weights"]
+            self._text_index_name = spec.get("name", "text")
+
+    async def _run(self, function, *args, **kwargs):
+        return await self.database._run(functools.partial(function, *args, **kwargs))
+
+    # Reads
+
+    def _rows(self, query: dict, order_limit: Tuple[List[Tuple[str, Any]], int, int] = None):
+        """Candidate (rowid, document, text score) rows for a filter"""
+        clauses, params, complete = _compile_filter({k: v for k, v in query.items() if k != "$text"}, self._indexed)
+        select = f"SELECT t.rowid, t.doc, t.types, NULL FROM {self._table} t"
+        if "$text" in query:
+            if not self._text_fields:
+                raise OperationFailure("text index required for $text query")
+            fts_query = _fts_query(query["$text"].get("$search", ""))
+            if fts_query is None:
+                return [], False
+            weights = ", ".join(str(w) for w in self._text_weights)
+            select = (f"SELECT t.rowid, t.doc, t.types, -bm25({self._fts}, {weights}) FROM {self._table} t "
+                      f"JOIN {self._fts} ON {self._fts}.rowid = t.rowid")
+            clauses.insert(0, f"{self._fts} MATCH ?")
+            params.insert(0, fts_query)
+        sql = select + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+
+        pushed = False
+        if complete and order_limit is not None:
+            sort, skip, limit = order_limit
+            by_score = bool(sort) and all(direction == {"$meta": "textScore"} for _, direction in sort)
+            if by_score and "$text" in query:
+                sql += " ORDER BY 4 DESC, t.rowid LIMIT ? OFFSET ?"
+                params.extend([limit if limit else -1, skip or 0])
+                pushed = True
+            elif all(field in self._indexed and direction in (1, -1) for field, direction in sort):
+                if sort:
+                    sql += " ORDER BY " + ", ".join(
+                        f"{_field_sql(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in sort
+                    ) + ", t.rowid"
+                else:
+                    sql += " ORDER BY t.rowid"
+                sql += " LIMIT ? OFFSET ?"
+                params.extend([limit if limit else -1, skip or 0])
+                pushed = True
+
+        rows = []
+        for rowid, text, types, score in self.database._connection.execute(sql, params):
+            doc = _decode(text, types)
+            if complete or _matches(doc, query):
+                rows.append((rowid, doc, score))
+        return rows, pushed
+
+    def _find(self, query, projection=None, sort=None, skip=0, limit=0):
+        query = _normalize(query or {})
+        sort = _normalize_sort(sort)
+        rows, pushed = self._rows(query, (sort, skip, limit))
+        documents = [doc for _, doc, _ in rows]
+        scores = {id(doc): score for _, doc, score in rows if score is not None}
+        if not pushed:
+            if sort:
+                _sort_documents(documents, sort, scores)
+            if skip:
+                documents = documents[skip:]
+            if limit:
+                documents = documents[:limit]
+        return [_project(doc, projection, scores.get(id(doc))) for doc in documents]
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0, **kwargs):
+        return SQLiteCursor(self, filter, projection, sort, skip, limit)
+
+    async def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        results = await self._run(self._find, filter, projection, sort, 0, 1)
+        return results[0] if results else None
+
+    def _count(self, query, skip=0, limit=0):
+        query = _normalize(query or {})
+        clauses, params, complete = _compile_filter(query, self._indexed)
+        if complete and not skip and not limit:
+            sql = f"SELECT COUNT(*) FROM {self._table}" + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+            return self.database._connection.execute(sql, params).fetchone()[0]
+        count = len(self._rows(query)[0]) - (skip or 0)
+        count = max(0, count)
+        return min(count, limit) if limit else count
+
+    async def count_documents(self, filter, skip=0, limit=0, **kwargs):
+        return await self._run(self._count, filter, skip, limit)
+
+    async def estimated_document_count(self, **kwargs):
+        return await self._run(self._count, {})
+
+    async def distinct(self, key, filter=None, **kwargs):
+        documents = await self._run(self._find, filter, None)
+        values = []
+        for doc in documents:
+            for value in _candidates(_resolve(doc, key.split("."))):
+                if value is not _MISSING and not isinstance(value, list) and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        return SQLiteAggregationCursor(self, pipeline)
+
+    def _aggregate(self, pipeline):
+        stages = list(pipeline)
+        if stages and "$match" in stages[0]:
+            documents = self._find(stages.pop(0)["$match"])
+        else:
+            documents = self._find({})
+        for stage in stages:
+            (name, spec), = stage.items()
+            documents = _run_stage(documents, name, spec)
+        return documents
+
+    # Writes
+
+    def _write_row(self, rowid: Optional[int], doc: dict) -> int:
+        text, types = _encode(doc)
+        connection = self.database._connection
+        try:
+            if rowid is None:
+                rowid = connection.execute(
+                    f"INSERT INTO {self._table} (doc, types) VALUES (?, ?)", (text, types)
+                ).lastrowid
+            else:
+                connection.execute(f"UPDATE {self._table} SET doc = ?, types = ? WHERE rowid = ?", (text, types, rowid))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} ({e})", 11000)
+        if self._text_fields:
+            connection.execute(f"DELETE FROM {self._fts} WHERE rowid = ?", (rowid,))
+            connection.execute(
+                f"INSERT INTO {self._fts} (rowid, {', '.join(self._fts_columns())}) "
+                f"VALUES (?, {', '.join('?' for _ in self._text_fields)})",
+                (rowid, *self._text_values(doc))
+            )
+        return rowid
+
+    def _delete_rows(self, rowids: List[int]):
+        connection = self.database._connection
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            connection.execute(f"DELETE FROM {self._table} WHERE rowid IN ({marks})", chunk)
+            if self._text_fields:
+                connection.execute(f"DELETE FROM {self._fts} WHERE rowid IN ({marks})", chunk)
+
+    def _insert(self, documents: List[dict]) -> List[Any]:
+        ids = []
+        with self.database._connection:
+            for document in documents:
+                if "_id" not in document:
+                    document["_id"] = ObjectId()
+                self._write_row(None, _normalize(document))
+                ids.append(document["_id"])
+        return ids
+
+    async def insert_one(self, document, **kwargs):
+        ids = await self._run(self._insert, [document])
+        return _Result(inserted_id=ids[0])
+
+    async def insert_many(self, documents, ordered=True, **kwargs):
+        ids = await self._run(self._insert, list(documents))
+        return _Result(inserted_ids=ids)
+
+    def _update(self, query, update, upsert=False, many=False, sort=None, projection=None,
+                return_document=None) -> _Result:
+        query = _normalize(query or {})
+        matched = modified = 0
+        upserted_id = None
+        before = after = None
+        with self.database._connection:
+            rows = self._rows(query)[0]
+            if sort:
+                documents = [doc for _, doc, _ in rows]
+                _sort_documents(documents, _normalize_sort(sort))
+                order = {id(doc): index for index, doc in enumerate(documents)}
+                rows.sort(key=lambda row: order[id(row[1])])
+            if not many:
+                rows = rows[:1]
+            for rowid, doc, _ in rows:
+                matched += 1
+                original = copy.deepcopy(doc)
+                updated = _apply_update(doc, update)
+                if updated != original:
+                    self._write_row(rowid, updated)
+                    modified += 1
+                before, after = original, updated
+            if not rows and upsert:
+                document = _apply_update(_upsert_seed(query), update, is_insert=True)
+                document.setdefault("_id", ObjectId())
+                self._write_row(None, document)
+                upserted_id = document["_id"]
+                after = document
+        if return_document is not None:
+            document = after if return_document == ReturnDocument.AFTER else before
+            return copy.deepcopy(_project(document, projection)) if document is not None else None
+        return _Result(matched_count=matched, modified_count=modified, upserted_id=upserted_id)
+
+    async def update_one(self, filter, update, upsert=False, **kwargs):
+        return await self._run(self._update, filter, update, upsert)
+
+    async def update_many(self, filter, update, upsert=False, **kwargs):
+        return await self._run(self._update, filter, update, upsert, True)
+
+    async def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        return await self._run(self._update, filter, replacement, upsert)
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        return await self._run(self._update, filter, update, upsert, False, sort, projection, return_document)
+
+    async def find_one_and_replace(self, filter, replacement, projection=None, sort=None, upsert=False,
+                                   return_document=ReturnDocument.BEFORE, **kwargs):
+        return await self._run(self._update, filter, replacement, upsert, False, sort, projection, return_document)
+
+    def _delete(self, query, many=False, sort=None, projection=None, return_document=False):
+        query = _normalize(query or {})
+        with self.database._connection:
+            rows = self._rows(query)[0]
+            if sort:
+                documents = [doc for _, doc, _ in rows]
+                _sort_documents(documents, _normalize_sort(sort))
+                order = {id(doc): index for index, doc in enumerate(documents)}
+                rows.sort(key=lambda row: order[id(row[1])])
+            if not many:
+                rows = rows[:1]
+            self._delete_rows([rowid for rowid, _, _ in rows])
+        if return_document:
+            return _project(rows[0][1], projection) if rows else None
+        return _Result(deleted_count=len(rows))
+
+    async def delete_one(self, filter, **kwargs):
+        return await self._run(self._delete, filter)
+
+    async def delete_many(self, filter, **kwargs):
+        return await self._run(self._delete, filter, True)
+
+    async def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        return await self._run(self._delete, filter, False, sort, projection, True)
+
+    def _bulk_write(self, operations, ordered=True):
+        totals = {"inserted_count": 0, "matched_count": 0, "modified_count": 0,
+                  "deleted_count": 0, "upserted_count": 0, "upserted_ids": {}}
+        with self.database._connection:
+            for index, operation in enumerate(operations):
+                try:
+                    if isinstance(operation, InsertOne):
+                        self._insert([operation._doc])
+                        totals["inserted_count"] += 1
+                    elif isinstance(operation, (UpdateOne, UpdateMany, ReplaceOne)):
+                        result = self._update(operation._filter, operation._doc, operation._upsert,
+                                              isinstance(operation, UpdateMany))
+                        totals["matched_count"] += result.matched_count
+                        totals["modified_count"] += result.modified_count
+                        if result.upserted_id is not None:
+                            totals["upserted_count"] += 1
+                            totals["upserted_ids"][index] = result.upserted_id
+                    elif isinstance(operation, (DeleteOne, DeleteMany)):
+                        totals["deleted_count"] += self._delete(operation._filter, isinstance(operation, DeleteMany)).deleted_count
+                    else:
+                        raise OperationFailure(f"Unsupported bulk operation: {type(operation).__name__}")
+                except DuplicateKeyError:
+                    if ordered:
+                        raise
+        return _Result(**totals)
+
+    async def bulk_write(self, operations, ordered=True, **kwargs):
+        return await self._run(self._bulk_write, list(operations), ordered)
+
+    # Indexes
+
+    def _fts_columns(self) -> List[str]:
+        return [f'"{field.replace(".", "_")}"' for field in self._text_fields]
+
+    def _text_values(self, doc: dict) -> List[str]:
+        values = []
+        for field in self._text_fields:
+            value = _get(doc, field, "")
+            values.append(" ".join(map(str, value)) if isinstance(value, list) else str(value or ""))
+        return values
+
+    def _create_index(self, keys, unique=False, sparse=False, partialFilterExpression=None, name=None,
+                      weights=None, **kwargs) -> str:
+        keys = _normalize_sort(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        connection = self.database._connection
+
+        if any(direction == "text" for _, direction in keys):
+            fields = [field for field, direction in keys if direction == "text"]
+            weight_values = [float((weights or {}).get(field, 1)) for field in fields]
+            with connection:
+                if (fields, weight_values) != (self._text_fields, self._text_weights):
+                    connection.execute(f"DROP TABLE IF EXISTS {self._fts}")
+                    self._text_fields, self._text_weights = fields, weight_values
+                    connection.execute(
+                        f"CREATE VIRTUAL TABLE {self._fts} USING fts5({', '.join(self._fts_columns())}, "
+                        f"tokenize='porter unicode61')"
+                    )
+                    for rowid, text, types in connection.execute(f"SELECT rowid, doc, types FROM {self._table}").fetchall():
+                        connection.execute(
+                            f"INSERT INTO {self._fts} (rowid, {', '.join(self._fts_columns())}) "
+                            f"VALUES (?, {', '.join('?' for _ in fields)})",
+                            (rowid, *self._text_values(_decode(text, types)))
+                        )
+                self._text_index_name = name
+                connection.execute(
+                    "INSERT OR REPLACE INTO _store_meta (key, value) VALUES (?, ?)",
+                    (f"text:{self.name}", json.dumps({"fields": fields, "weights": weight_values, "name": name}))
+                )
+            return name
+
+        columns = ", ".join(f"{_field_sql(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in keys)
+        conditions = []
+        if partialFilterExpression:
+            for key, value in partialFilterExpression.items():
+                if isinstance(value, bool):
+                    conditions.append(f"{_field_sql(key)} = {int(value)}")
+                elif isinstance(value, (int, float)):
+                    conditions.append(f"{_field_sql(key)} = {value}")
+                elif isinstance(value, str):
+                    conditions.append(f"{_field_sql(key)} = '{value.replace(chr(39), chr(39) * 2)}'")
+                elif isinstance(value, dict) and value == {"$exists": True}:
+                    conditions.append(f"{_field_sql(key)} IS NOT NULL")
+                elif (isinstance(value, dict) and len(value) == 1
+                      and next(iter(value)) in ("$gt", "$gte", "$lt", "$lte")
+                      and isinstance(next(iter(value.values())), (int, float))
+                      and not isinstance(next(iter(value.values())), bool)):
+                    (op, operand), = value.items()
+                    sql_op = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                    conditions.append(f"{_field_sql(key)} {sql_op} {operand}")
+                else:
+                    raise OperationFailure(f"Unsupported partialFilterExpression for the SQLite store: {key}")
+        if sparse:
+            conditions.extend(f"{_field_sql(field)} IS NOT NULL" for field, _ in keys)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        index_name = f'"{self.name}__{name}"'
+        try:
+            with connection:
+                connection.execute(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {self._table} ({columns}){where}"
+                )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"E11000 duplicate key error building index {name}: {e}", 11000)
+        self._indexed.update(field for field, _ in keys)
+        return name
+
+    async def create_index(self, keys, **kwargs):
+        return await self._run(self._create_index, keys, **kwargs)
+
+    def _index_information(self) -> Dict[str, dict]:
+        prefix = f"{self.name}__"
+        info = {"_id_": {"key": [("_id", 1)]}}
+        for name, sql in self.database._connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (self.name,)
+        ):
+            if name.startswith(prefix):
+                info[name[len(prefix):]] = {"unique": sql.upper().startswith("CREATE UNIQUE")}
+        if self._text_index_name:
+            info[self._text_index_name] = {"text": self._text_fields}
+        return info
+
+    async def index_information(self) -> Dict[str, dict]:
+        return await self._run(self._index_information)
+
+    def _drop_index(self, name: str):
+        connection = self.database._connection
+        with connection:
+            if name == self._text_index_name:
+                connection.execute(f"DROP TABLE IF EXISTS {self._fts}")
+                connection.execute("DELETE FROM _store_meta WHERE key = ?", (f"text:{self.name}",))
+            elif name in self._index_information():
+                connection.execute(f'DROP INDEX "{self.name}__{name}"')
+            else:
+                raise OperationFailure(f"index not found with name [{name}]")
+        self._load_existing_indexes()
+
+    async def drop_index(self, name: str, **kwargs):
+        await self._run(self._drop_index, name)
+
+    def _drop(self):
+        with self.database._connection:
+            self.database._connection.execute(f"DELETE FROM {self._table}")
+            if self._text_fields:
+                self.database._connection.execute(f"DELETE FROM {self._fts}")
+
+    async def drop(self, **kwargs):
+        await self._run(self._drop)
+
+
+def _run_stage(documents: List[dict], name: str, spec) -> List[dict]:
+    if name == "$match":
+        return [doc for doc in documents if _matches(doc, _normalize(spec))]
+    if name in ("$addFields", "$set"):
+        for doc in documents:
+            for field, expression in spec.items():
+                _set_path(doc, field, _evaluate(doc, expression))
+        return documents
+    if name == "$project":
+        if all(isinstance(value, (int, bool)) for value in spec.values()):
+            return [_project(doc, spec) for doc in documents]
+        results = []
+        for doc in documents:
+            result = {} if spec.get("_id", 1) == 0 or "_id" not in doc else {"_id": doc["_id"]}
+            for field, expression in spec.items():
+                if field == "_id" and expression in (0, False):
+                    continue
+                if expression in (1, True):
+                    values = _resolve(doc, field.split("."))
+                    if values:
+                        _set_path(result, field, values[0])
+                elif expression not in (0, False):
+                    _set_path(result, field, _evaluate(doc, expression))
+            results.append(result)
+        return results
+    if name == "$unset":
+        for doc in documents:
+            for field in ([spec] if isinstance(spec, str) else spec):
+                _unset_path(doc, field)
+        return documents
+    if name == "$sort":
+        _sort_documents(documents, _normalize_sort(spec))
+        return documents
+    if name == "$skip":
+        return documents[spec:]
+    if name == "$limit":
+        return documents[:spec]
+    if name == "$count":
+        return [{spec: len(documents)}] if documents else []
+    if name == "$unwind":
+        path = spec if isinstance(spec, str) else spec["path"]
+        field = path.lstrip("$")
+        results = []
+        for doc in documents:
+            values = _get(doc, field, None)
+            if isinstance(values, list):
+                for value in values:
+                    unwound = copy.deepcopy(doc)
+                    _set_path(unwound, field, value)
+                    results.append(unwound)
+            elif values is not None:
+                results.append(doc)
+        return results
+    if name == "$group":
+        groups: Dict[str, dict] = {}
+        accumulators = {k: v for k, v in spec.items() if k != "_id"}
+        for doc in documents:
+            key_value = _evaluate(doc, spec["_id"])
+            key = json.dumps(key_value, default=str, sort_keys=True)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"_id": key_value, "__values": {field: [] for field in accumulators}}
+            for field, accumulator in accumulators.items():
+                (op, expression), = accumulator.items()
+                group["__values"][field].append(_evaluate(doc, expression) if op != "$count" else 1)
+        results = []
+        for group in groups.values():
+            result = {"_id": group["_id"]}
+            for field, accumulator in accumulators.items():
+                op = next(iter(accumulator))
+                values = group["__values"][field]
+                present = [v for v in values if v is not None]
+                if op in ("$sum", "$count"):
+                    result[field] = sum(_numeric(values))
+                elif op == "$avg":
+                    numbers = _numeric(values)
+                    result[field] = sum(numbers) / len(numbers) if numbers else None
+                elif op in ("$min", "$max"):
+                    result[field] = (min if op == "$min" else max)(present, key=_sort_key) if present else None
+                elif op == "$first":
+                    result[field] = values[0] if values else None
+                elif op == "$last":
+                    result[field] = values[-1] if values else None
+                elif op == "$push":
+                    result[field] = values
+                elif op == "$addToSet":
+                    unique = []
+                    for value in values:
+                        if value not in unique:
+                            unique.append(value)
+                    result[field] = unique
+                else:
+                    raise OperationFailure(f"Unsupported accumulator for the SQLite store: {op}")
+            results.append(result)
+        return results
+    raise OperationFailure(f"Unsupported aggregation stage for the SQLite store: {name}")
+
+
+class SQLiteDatabase:
+    """A MongoDB-like database backed by one SQLite file
+
+    All SQLite work runs on a single worker thread, which serializes writes the
+    way a single mongod would and keeps the event loop free.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._connection = self._executor.submit(self._connect).result()
+        self._collections: Dict[str, SQLiteCollection] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS _store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Context-manager transactions need an explicit BEGIN in autocommit mode
+        connection.isolation_level = "DEFERRED"
+        return connection
+
+    async def _run(self, function):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function)
+
+    def get_collection(self, name: str) -> SQLiteCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = self._executor.submit(SQLiteCollection, self, name).result()
+        return collection
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> SQLiteCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def create_collection(self, name: str, **kwargs) -> SQLiteCollection:
+        return self.get_collection(name)
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        def names():
+            rows = self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '%\\_\\_fts%' ESCAPE '\\' "
+                "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+            ).fetchall()
+            return [row[0] for row in rows]
+        return await self._run(names)
+
+    async def command(self, command, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            await self._run(lambda: self._connection.execute("SELECT 1").fetchone())
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command for the SQLite store: {name}")
+
+    def close(self):
+        self._executor.submit(self._connection.close).result()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,59 @@
+"""Storage backend selection and the data access interface the routes rely on.
+
+Routes talk to collections through the subset of Motor's API declared by
+`DocumentCollection`. Two backends implement it: Motor against MongoDB (the
+default) and the embedded SQLite store in `sqlite_store`, selected with
+STORAGE_BACKEND=mongo|sqlite.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Optional, Protocol
+
+STORAGE_BACKENDS = ("mongo", "sqlite")
+
+
+class DocumentCursor(Protocol):
+    def sort(self, key_or_list, direction=None) -> "DocumentCursor": ...
+    def skip(self, skip: int) -> "DocumentCursor": ...
+    def limit(self, limit: int) -> "DocumentCursor": ...
+    def __aiter__(self) -> AsyncIterator[dict]: ...
+    async def to_list(self, length: Optional[int] = None) -> List[dict]: ...
+
+
+class DocumentCollection(Protocol):
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> DocumentCursor: ...
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> Optional[dict]: ...
+    async def count_documents(self, filter: dict, **kwargs) -> int: ...
+    def aggregate(self, pipeline: List[dict], **kwargs) -> DocumentCursor: ...
+    async def insert_one(self, document: dict, **kwargs) -> Any: ...
+    async def insert_many(self, documents: List[dict], **kwargs) -> Any: ...
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> Any: ...
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> Any: ...
+    async def find_one_and_update(self, filter: dict, update: dict, **kwargs) -> Optional[dict]: ...
+    async def find_one_and_delete(self, filter: dict, **kwargs) -> Optional[dict]: ...
+    async def delete_one(self, filter: dict, **kwargs) -> Any: ...
+    async def delete_many(self, filter: dict, **kwargs) -> Any: ...
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> Any: ...
+    async def create_index(self, keys, **kwargs) -> str: ...
+    async def index_information(self) -> dict: ...
+    async def drop_index(self, name: str, **kwargs) -> None: ...
+
+
+class DocumentDatabase(Protocol):
+    def __getattr__(self, name: str) -> DocumentCollection: ...
+    def __getitem__(self, name: str) -> DocumentCollection: ...
+    async def command(self, command, **kwargs) -> dict: ...
+
+
+@dataclass
+class StorageSettings:
+    backend: str = "mongo"
+    sqlite_path: str = "vinted.db"
+
+    @classmethod
+    def from_env(cls) -> "StorageSettings":
+        """Read the backend choice from STORAGE_BACKEND and SQLITE_PATH"""
+        backend = os.environ.get("STORAGE_BACKEND", "mongo").lower()
+        if backend not in STORAGE_BACKENDS:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND {backend!r}; expected one of {', '.join(STORAGE_BACKENDS)}")
+        return cls(backend=backend, sqlite_path=os.environ.get("SQLITE_PATH", "vinted.db"))
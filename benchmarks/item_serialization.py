@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Microbenchmark per-item cost of the item list read path.
+
+Compares the previous path (VintedItem(**doc) + a per-item metrics coroutine,
+then FastAPI re-validating against response_model and encoding with json) with
+the raw-document path (batch compute_item_metrics + orjson).
+
+    python benchmarks/item_serialization.py --items 1000 --photos 0
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from backend.models import VintedItem  # noqa: E402
+from backend.item_metrics import compute_item_metrics, fill_item_defaults  # noqa: E402
+
+
+async def legacy_calculate_item_metrics(item):
+    """The per-item metrics coroutine the list route used to await for every item"""
+    if item.sold_price is not None:
+        total_costs = (item.purchase_price + item.shipping_cost + item.vinted_fee +
+                       item.buyer_protection_fee + item.expenses_total)
+        profit = item.sold_price - total_costs
+        item.profit_margin = profit
+        if item.purchase_price > 0:
+            item.roi_percentage = (profit / item.purchase_price) * 100
+        if item.listed_at and item.sold_at:
+            item.days_to_sell = (item.sold_at - item.listed_at).days
+    return item
+
+
+def make_document(photo_bytes):
+    listed_at = datetime.utcnow() - timedelta(days=random.randint(1, 90))
+    sold = random.random() < 0.4
+    document = VintedItem(
+        title="Benchmark jacket",
+        description="Synthetic item for serialization benchmarks",
+        category=random.choice(["Tops", "Outerwear", "Shoes"]),
+        brand=random.choice(["Zara", "Nike", "Stone Island"]),
+        size="M",
+        condition="Good",
+        purchase_price=round(random.uniform(5, 50), 2),
+        listed_price=round(random.uniform(15, 120), 2),
+        sold_price=round(random.uniform(15, 120), 2) if sold else None,
+        listed_at=listed_at,
+        sold_at=listed_at + timedelta(days=random.randint(1, 30)) if sold else None,
+        status="sold" if sold else "active",
+        main_photo="A" * photo_bytes if photo_bytes else None,
+        tags=["vintage", "casual"],
+    ).dict()
+    document["status"] = document["status"].value
+    document["id"] = str(uuid.uuid4())
+    return document
+
+
+def old_path(documents):
+    items = [VintedItem(**document) for document in documents]
+    loop = asyncio.new_event_loop()
+    items = [loop.run_until_complete(legacy_calculate_item_metrics(item)) for item in items]
+    loop.close()
+    adapter = TypeAdapter(List[VintedItem])
+    validated = adapter.validate_python(items)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def new_path(documents):
+    return orjson.dumps(compute_item_metrics(fill_item_defaults(documents)))
+
+
+def measure(function, documents, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        copies = [dict(document) for document in documents]
+        started = time.perf_counter()
+        function(copies)
+        best = min(best, time.perf_counter() - started)
+    return best / len(documents) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--photos", type=int, default=0, help="bytes of base64 main_photo per item")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = [make_document(args.photos) for _ in range(args.items)]
+    before = measure(old_path, documents, args.rounds)
+    after = measure(new_path, documents, args.rounds)
+    print(json.dumps({
+        "items": args.items,
+        "photo_bytes": args.photos,
+        "before_us_per_item": round(before, 2),
+        "after_us_per_item": round(after, 2),
+        "speedup": round(before / after, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Load-test every API route against seeded synthetic inventories.
+
+For each inventory size and photo size, seeds a fresh database (the embedded
+SQLite store or a local mongod), starts the app in-process and drives each
+route with a pool of concurrent async clients. Reports throughput and
+p50/p95/p99 latency per route as JSON; with --baseline, compares against a
+previous run and exits non-zero when a route regresses past --threshold.
+
+    python benchmarks/load_test.py --backend sqlite --sizes 1k 10k --photo-bytes 0 20000 \
+        --output benchmarks/baseline.json
+    python benchmarks/load_test.py --backend sqlite --sizes 1k 10k --photo-bytes 0 20000 \
+        --baseline benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import server  # noqa: E402
+from backend.admission import HEAVY  # noqa: E402
+from benchmarks.stats import percentile  # noqa: E402
+from benchmarks.synthetic import make_items  # noqa: E402
+
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+EXPENSE_CATEGORIES = ["shipping", "packaging", "cleaning", "repairs", "marketing", "other"]
+SEARCH_QUERIES = ["black stone island jacket", "nike trainers", "vintage", "summer dress", "gucci"]
+SEED_BATCH_SIZE = 5000
+# Enables the admin routes for the in-process app
+ADMIN_TOKEN = "load-test"
+ADMIN_HEADERS = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@dataclass
+class Context:
+    rng: random.Random
+    item_ids: List[str]
+    deletable_item_ids: List[str]
+    expense_ids: List[str]
+    deletable_expense_ids: List[str]
+    notification_ids: List[str]
+    # Captured once the app is up, for the profile download route
+    profile_ids: List[str] = field(default_factory=list)
+
+    def item_id(self) -> str:
+        return self.rng.choice(self.item_ids)
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    path: Callable[[Context], str]
+    body: Optional[Callable[[Context], object]] = None
+    # Full scans and batch jobs get fewer requests so large inventories stay tractable
+    heavy: bool = False
+    params: Dict[str, object] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def expense_body(ctx: Context) -> dict:
+    return {
+        "item_id": ctx.item_id(),
+        "category": ctx.rng.choice(EXPENSE_CATEGORIES),
+        "amount": round(ctx.rng.uniform(0.5, 10), 2),
+        "description": "load test",
+    }
+
+
+def item_body(ctx: Context) -> dict:
+    return {
+        "title": f"Load test item {ctx.rng.randint(0, 10 ** 6)}",
+        "category": "Tops",
+        "brand": "Zara",
+        "condition": "Good",
+        "purchase_price": round(ctx.rng.uniform(2, 50), 2),
+        "listed_price": round(ctx.rng.uniform(20, 90), 2),
+    }
+
+
+ROUTES = [
+    Route("GET /", "GET", lambda ctx: "/"),
+    Route("GET /health/live", "GET", lambda ctx: "/health/live"),
+    Route("GET /health/ready", "GET", lambda ctx: "/health/ready"),
+    Route("GET /dashboard/stats", "GET", lambda ctx: "/dashboard/stats", heavy=True),
+    Route("POST /items", "POST", lambda ctx: "/items", item_body),
+    Route("GET /items", "GET", lambda ctx: "/items", params={"limit": 100}),
+    Route("GET /items?status", "GET", lambda ctx: "/items", params={"status": "active", "limit": 50}),
+    Route("GET /items/search", "GET", lambda ctx: "/items/search",
+          params={"q": lambda ctx: ctx.rng.choice(SEARCH_QUERIES), "limit": 20}),
+    Route("GET /items/queues/renewal", "GET", lambda ctx: "/items/queues/renewal", params={"limit": 20}),
+    Route("GET /items/queues/low-performing", "GET", lambda ctx: "/items/queues/low-performing",
+          params={"limit": 20}),
+    Route("POST /items/queues/renewal/renew", "POST", lambda ctx: "/items/queues/renewal/renew",
+          lambda ctx: {"item_ids": ctx.rng.sample(ctx.item_ids, 20)}, heavy=True),
+    Route("GET /items/{id}", "GET", lambda ctx: f"/items/{ctx.item_id()}"),
+    Route("PUT /items/{id}", "PUT", lambda ctx: f"/items/{ctx.item_id()}",
+          lambda ctx: {"views": ctx.rng.randint(0, 500), "likes": ctx.rng.randint(0, 50)}),
+    Route("DELETE /items/{id}", "DELETE", lambda ctx: f"/items/{ctx.deletable_item_ids.pop()}"),
+    Route("POST /items/bulk-update", "POST", lambda ctx: "/items/bulk-update",
+          lambda ctx: {"item_ids": ctx.rng.sample(ctx.item_ids, 20), "patch": {"views": ctx.rng.randint(0, 500)}},
+          heavy=True),
+    Route("POST /items/bulk-delete", "POST", lambda ctx: "/items/bulk-delete",
+          lambda ctx: {"filter": {"status": "archived"}, "dry_run": True}, heavy=True),
+    Route("POST /items/bulk-archive", "POST", lambda ctx: "/items/bulk-archive",
+          lambda ctx: {"filter": {"status": "draft"}, "dry_run": True}, heavy=True),
+    Route("POST /items/bulk-upload", "POST", lambda ctx: "/items/bulk-upload",
+          lambda ctx: {"items": [item_body(ctx) for _ in range(10)]}, heavy=True),
+    Route("POST /items/engagement", "POST", lambda ctx: "/items/engagement",
+          lambda ctx: {"deltas": [{"item_id": ctx.item_id(), "views": ctx.rng.randint(1, 20),
+                                   "likes": ctx.rng.randint(0, 2)} for _ in range(50)]}),
+    Route("GET /items/export/csv", "GET", lambda ctx: "/items/export/csv", heavy=True),
+    Route("GET /analytics/monthly", "GET", lambda ctx: "/analytics/monthly"),
+    Route("GET /analytics/trends", "GET", lambda ctx: "/analytics/trends"),
+    Route("GET /pricing/suggest", "GET", lambda ctx: "/pricing/suggest",
+          params={"category": "Tops", "brand": "Zara", "condition": "Good"}),
+    Route("GET /analytics/performance/{id}", "GET", lambda ctx: f"/analytics/performance/{ctx.item_id()}"),
+    Route("GET /analytics/items/{id}/history", "GET", lambda ctx: f"/analytics/items/{ctx.item_id()}/history",
+          params={"granularity": "hour"}),
+    Route("GET /analytics/engagement", "GET", lambda ctx: "/analytics/engagement", params={"granularity": "day"}),
+    Route("GET /notifications", "GET", lambda ctx: "/notifications"),
+    Route("PUT /notifications/{id}/read", "PUT",
+          lambda ctx: f"/notifications/{ctx.rng.choice(ctx.notification_ids)}/read"),
+    Route("POST /expenses", "POST", lambda ctx: "/expenses", expense_body),
+    Route("POST /expenses/bulk", "POST", lambda ctx: "/expenses/bulk",
+          lambda ctx: [expense_body(ctx) for _ in range(50)], heavy=True),
+    Route("GET /expenses", "GET", lambda ctx: "/expenses", params={"limit": 100}),
+    Route("GET /expenses/item/{id}", "GET", lambda ctx: f"/expenses/item/{ctx.item_id()}"),
+    Route("PUT /expenses/{id}", "PUT", lambda ctx: f"/expenses/{ctx.rng.choice(ctx.expense_ids)}",
+          lambda ctx: {"amount": round(ctx.rng.uniform(0.5, 10), 2)}),
+    Route("DELETE /expenses/{id}", "DELETE", lambda ctx: f"/expenses/{ctx.deletable_expense_ids.pop()}"),
+    Route("POST /roi-targets", "POST", lambda ctx: "/roi-targets",
+          lambda ctx: {"target_percentage": ctx.rng.choice([20.0, 30.0, 40.0])}),
+    Route("GET /roi-targets/current", "GET", lambda ctx: "/roi-targets/current"),
+    Route("POST /tasks/check-renewals", "POST", lambda ctx: "/tasks/check-renewals", heavy=True),
+    Route("POST /tasks/check-roi-alerts", "POST", lambda ctx: "/tasks/check-roi-alerts", heavy=True),
+    Route("POST /tasks/reconcile-expenses", "POST", lambda ctx: "/tasks/reconcile-expenses", heavy=True),
+    Route("POST /tasks/archive-items", "POST", lambda ctx: "/tasks/archive-items", heavy=True),
+    Route("GET /metrics", "GET", lambda ctx: "/metrics"),
+    Route("GET /admin/slow-queries", "GET", lambda ctx: "/admin/slow-queries", headers=ADMIN_HEADERS),
+    Route("GET /admin/profiles", "GET", lambda ctx: "/admin/profiles", headers=ADMIN_HEADERS),
+    Route("GET /admin/profiles/{id}", "GET", lambda ctx: f"/admin/profiles/{ctx.rng.choice(ctx.profile_ids)}",
+          headers=ADMIN_HEADERS),
+]
+
+
+async def seed(db, items: int, photo_bytes: int, reserved: int) -> Context:
+    """Seed items, expenses and notifications; returns the ids routes draw from"""
+    rng = random.Random(1234)
+    item_ids, batch = [], []
+    for item in make_items(items, photo_bytes=photo_bytes):
+        item_ids.append(item["id"])
+        batch.append(item)
+        if len(batch) >= SEED_BATCH_SIZE:
+            await db.vinted_items.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.vinted_items.insert_many(batch, ordered=False)
+
+    # Deletes get their own ids so they never race the other routes' targets,
+    # and nothing else is seeded against items that will be deleted
+    deletable_item_ids, item_ids = item_ids[:reserved], item_ids[reserved:]
+    now = datetime.utcnow()
+    expenses = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "item_id": rng.choice(item_ids),
+            "category": rng.choice(EXPENSE_CATEGORIES),
+            "amount": round(rng.uniform(0.5, 10), 2),
+            "description": None,
+            "date": now - timedelta(days=rng.randint(0, 365)),
+        }
+        for _ in range(max(reserved * 2, items // 4))
+    ]
+    for start in range(0, len(expenses), SEED_BATCH_SIZE):
+        await db.item_expenses.insert_many(expenses[start:start + SEED_BATCH_SIZE], ordered=False)
+
+    notifications = [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "type": "listing_renewal",
+         "title": "Seeded", "message": "Seeded notification", "data": {"item_id": rng.choice(item_ids)},
+         "read": False, "created_at": now}
+        for _ in range(200)
+    ]
+    await db.notifications.insert_many(notifications)
+
+    expense_ids = [expense["id"] for expense in expenses]
+    return Context(
+        rng=random.Random(99),
+        item_ids=item_ids,
+        deletable_item_ids=deletable_item_ids,
+        expense_ids=expense_ids[reserved:],
+        deletable_expense_ids=expense_ids[:reserved],
+        notification_ids=[n["id"] for n in notifications],
+    )
+
+
+async def drive(client: httpx.AsyncClient, route: Route, ctx: Context, requests: int, concurrency: int) -> dict:
+    latencies, status_codes = [], {}
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            params = {k: v(ctx) if callable(v) else v for k, v in route.params.items()}
+            body = route.body(ctx) if route.body else None
+            started = time.perf_counter()
+            response = await client.request(
+                route.method, route.path(ctx), params=params, json=body, headers=route.headers
+            )
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, requests))])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for code, count in status_codes.items() if code >= 400),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+    }
+
+
+async def run_scenario(args, items: int, photo_bytes: int) -> dict:
+    """Seed a fresh database, start the app in-process and load-test every route"""
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["STORAGE_BACKEND"] = args.backend
+        if args.backend == "sqlite":
+            os.environ["SQLITE_PATH"] = os.path.join(directory, "load_test.db")
+        else:
+            os.environ["MONGO_URL"] = args.mongo_url
+            os.environ["DB_NAME"] = args.db
+            admin = AsyncIOMotorClient(args.mongo_url)
+            await admin.drop_database(args.db)
+            admin.close()
+
+        os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+        server.roi_target_cache.clear()
+        async with server.lifespan(server.app):
+            started = time.perf_counter()
+            ctx = await seed(server.db, items, photo_bytes, reserved=args.requests)
+            seeded = time.perf_counter() - started
+            await server.create_indexes()
+
+            heavy_lane = server.admission_lanes[HEAVY].settings
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test/api", timeout=600.0) as client:
+                profiled = await client.get("/items", params={"limit": 10, "profile": "1"}, headers=ADMIN_HEADERS)
+                ctx.profile_ids.append(profiled.headers["x-profile-id"])
+                routes = {}
+                for route in ROUTES:
+                    if args.routes and route.name not in args.routes:
+                        continue
+                    requests = args.heavy_requests if route.heavy else args.requests
+                    # Stay within the heavy admission lane so runs measure latency, not 429s
+                    concurrency = min(args.concurrency, heavy_lane.concurrency) if route.heavy else args.concurrency
+                    routes[route.name] = await drive(client, route, ctx, requests, concurrency)
+                    print(f"  {route.name}: {routes[route.name]['p50_ms']} ms p50", file=sys.stderr)
+
+        if args.backend == "mongo":
+            admin = AsyncIOMotorClient(args.mongo_url)
+            await admin.drop_database(args.db)
+            admin.close()
+    return {"seed_seconds": round(seeded, 2), "routes": routes}
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> List[str]:
+    """Routes whose p95 latency or throughput got worse than the baseline by more than threshold"""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+        for name, stats in current["routes"].items():
+            before = previous["routes"].get(name)
+            if before is None:
+                continue
+            if stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                regressions.append(f"{scenario} {name}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+            if stats["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+                regressions.append(
+                    f"{scenario} {name}: throughput {before['throughput_rps']} -> {stats['throughput_rps']} rps"
+                )
+            if stats["errors"] and not before["errors"]:
+                regressions.append(f"{scenario} {name}: {stats['errors']} errors (baseline had none)")
+    return regressions
+
+
+async def run(args) -> dict:
+    scenarios = {}
+    for size in args.sizes:
+        for photo_bytes in args.photo_bytes:
+            name = f"items={size},photo_bytes={photo_bytes}"
+            print(f"{name} ({args.backend})", file=sys.stderr)
+            scenarios[name] = await run_scenario(args, SIZES[size], photo_bytes)
+    return {
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "heavy_requests": args.heavy_requests,
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="vinted_load_test")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["1k", "10k"])
+    parser.add_argument("--photo-bytes", nargs="+", type=int, default=[0, 20000],
+                        help="base64 photo size per item; 0 seeds items without photos")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--heavy-requests", type=int, default=5, help="requests per full-scan route")
+    parser.add_argument("--routes", nargs="*", help="only run these routes, e.g. 'GET /items'")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression in p95 latency or throughput")
+    args = parser.parse_args()
+
+    # One INFO line per request would drown the progress output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        regressions = compare(json.loads(Path(args.baseline).read_text()), results, args.threshold)
+        if regressions:
+            print("Regressions past threshold:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark ranked full-text item search on a synthetic corpus.
+
+Seeds a dedicated database with synthetic items, builds the application's
+indexes and times search_items_page for a set of representative queries.
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/search_latency.py --items 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import server  # noqa: E402
+from backend.models import DEFAULT_SELLER_ID  # noqa: E402
+from benchmarks.stats import percentile  # noqa: E402
+from benchmarks.synthetic import make_items  # noqa: E402
+
+QUERIES = [
+    ("black stone island jacket", {}),
+    ("nike trainers", {"status": "active"}),
+    ("vintage", {"min_price": 20.0, "max_price": 60.0}),
+    ("summer dress", {}),
+    ("gucci", {"status": "sold"}),
+]
+
+
+async def seed(collection, count, batch_size=5000):
+    batch = []
+    for item in make_items(count):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    server.db = client[args.db]
+    try:
+        if args.reseed or await server.db.vinted_items.estimated_document_count() != args.items:
+            await server.db.vinted_items.drop()
+            started = time.perf_counter()
+            await seed(server.db.vinted_items, args.items)
+            print(f"Seeded {args.items} items in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        await server.create_indexes()
+
+        results = {}
+        for q, filters in QUERIES:
+            latencies = []
+            returned = 0
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                page = await server.search_items_page(DEFAULT_SELLER_ID, q, limit=args.limit, **filters)
+                latencies.append((time.perf_counter() - started) * 1000)
+                returned = len(page["items"])
+            results[f"{q} {filters}".strip()] = {
+                "returned": returned,
+                "mean_ms": round(statistics.mean(latencies), 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+        return {"items": args.items, "limit": args.limit, "queries": results}
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="vinted_search_benchmark")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--reseed", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
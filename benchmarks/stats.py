@@ -0,0 +1,10 @@
+"""Summary statistics shared by the benchmark scripts."""
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Compare storage backend latency on representative data access patterns.
+
+Seeds the same synthetic corpus into the embedded SQLite store and, when
+reachable, MongoDB, builds the application's indexes on each and times the
+reads and writes the routes issue most.
+
+    python benchmarks/storage_latency.py --items 10000
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/storage_latency.py --backends sqlite mongo
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import server  # noqa: E402
+from backend.models import DEFAULT_SELLER_ID  # noqa: E402
+from backend.sqlite_store import SQLiteDatabase  # noqa: E402
+from benchmarks.stats import percentile  # noqa: E402
+from benchmarks.synthetic import make_items  # noqa: E402
+
+
+def operations(db, item_ids, rng):
+    """Named callables, each issuing one data access the routes perform"""
+    items = db.vinted_items
+    seller = {"seller_id": DEFAULT_SELLER_ID}
+    return {
+        "find_one_by_id": lambda: items.find_one({**seller, "id": rng.choice(item_ids)}, server.ITEM_PROJECTION),
+        "list_page_by_status": lambda: items.find({**seller, "status": "active"}, server.ITEM_LEAN_PROJECTION).sort(
+            "created_at", -1).limit(50).to_list(50),
+        "count_by_status": lambda: items.count_documents({**seller, "status": "sold"}),
+        "search_page": lambda: server.search_items_page(DEFAULT_SELLER_ID, "vintage jacket", limit=20),
+        "update_by_id": lambda: items.update_one({**seller, "id": rng.choice(item_ids)}, {"$inc": {"views": 1}}),
+        "expense_totals_aggregate": lambda: db.item_expenses.aggregate([
+            {"$match": seller},
+            {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}}
+        ]).to_list(None),
+    }
+
+
+async def seed(db, count, batch_size=5000):
+    batch, item_ids = [], []
+    for item in make_items(count):
+        item_ids.append(item["id"])
+        batch.append(item)
+        if len(batch) >= batch_size:
+            await db.vinted_items.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.vinted_items.insert_many(batch, ordered=False)
+    rng = random.Random(7)
+    await db.item_expenses.insert_many([
+        {"id": str(i), "item_id": rng.choice(item_ids), "category": rng.choice(["shipping", "packaging", "other"]),
+         "amount": round(rng.uniform(0.5, 10), 2)}
+        for i in range(min(count, 10000))
+    ])
+    return item_ids
+
+
+async def measure(db, args):
+    server.db = db
+    started = time.perf_counter()
+    item_ids = await seed(db, args.items)
+    seeded = time.perf_counter() - started
+    await server.create_indexes()
+
+    results = {"seed_seconds": round(seeded, 2)}
+    for name, operation in operations(db, item_ids, random.Random(42)).items():
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            await operation()
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
+    return results
+
+
+async def run(args):
+    results = {}
+    if "sqlite" in args.backends:
+        with tempfile.TemporaryDirectory() as directory:
+            db = SQLiteDatabase(os.path.join(directory, "benchmark.db"))
+            try:
+                results["sqlite"] = await measure(db, args)
+            finally:
+                db.close()
+    if "mongo" in args.backends:
+        client = AsyncIOMotorClient(args.mongo_url, serverSelectionTimeoutMS=2000)
+        try:
+            await client.admin.command("ping")
+            await client.drop_database(args.db)
+            results["mongo"] = await measure(client[args.db], args)
+            await client.drop_database(args.db)
+        except Exception as e:
+            results["mongo"] = {"error": str(e)}
+        finally:
+            client.close()
+    return {"items": args.items, "repeat": args.repeat, "backends": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=["sqlite", "mongo"], default=["sqlite", "mongo"])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="vinted_storage_benchmark")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Synthetic Vinted inventories for benchmarks."""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+BRANDS = ["Zara", "H&M", "Nike", "Adidas", "Stone Island", "Armani", "Gucci", "Prada", "Levi's", "Tommy Hilfiger"]
+CATEGORIES = ["Tops", "Bottoms", "Dresses", "Outerwear", "Shoes", "Accessories", "Bags", "Jewelry"]
+CONDITIONS = ["New with tags", "Like new", "Good", "Fair", "Poor"]
+SIZES = ["XS", "S", "M", "L", "XL", "XXL", "36", "38", "40", "42", "44"]
+COLORS = ["Black", "White", "Red", "Blue", "Green", "Yellow", "Purple", "Pink", "Brown", "Grey"]
+NOUNS = {
+    "Tops": ["t-shirt", "shirt", "blouse", "sweater", "hoodie"],
+    "Bottoms": ["jeans", "trousers", "shorts", "skirt"],
+    "Dresses": ["dress", "maxi dress", "summer dress"],
+    "Outerwear": ["jacket", "coat", "parka", "overshirt"],
+    "Shoes": ["trainers", "boots", "sneakers", "loafers"],
+    "Accessories": ["scarf", "belt", "cap", "sunglasses"],
+    "Bags": ["tote bag", "backpack", "crossbody bag"],
+    "Jewelry": ["necklace", "ring", "bracelet"],
+}
+TAGS = ["vintage", "trendy", "summer", "winter", "casual", "streetwear", "designer", "retro"]
+
+
+def make_item(rng: random.Random, photo_bytes: int = 0, now: datetime = None) -> dict:
+    """Build one raw vinted_items document"""
+    now = now or datetime.utcnow()
+    brand = rng.choice(BRANDS)
+    category = rng.choice(CATEGORIES)
+    color = rng.choice(COLORS)
+    noun = rng.choice(NOUNS[category])
+    created_at = now - timedelta(days=rng.randint(0, 720), seconds=rng.randint(0, 86399))
+    status = rng.choices(["active", "sold", "draft", "archived"], weights=[50, 35, 10, 5])[0]
+    listed_at = created_at + timedelta(days=rng.randint(0, 3)) if status in ("active", "sold") else None
+    sold_at = listed_at + timedelta(days=rng.randint(1, 90)) if status == "sold" else None
+    purchase_price = round(rng.uniform(2, 80), 2)
+    listed_price = round(purchase_price * rng.uniform(1.1, 3.0), 2)
+    photo = "A" * photo_bytes if photo_bytes else None
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "title": f"{color} {brand} {noun}",
+        "description": f"{rng.choice(CONDITIONS)} {color.lower()} {noun} from {brand}, size {rng.choice(SIZES)}.",
+        "category": category,
+        "brand": brand,
+        "size": rng.choice(SIZES),
+        "color": color,
+        "condition": rng.choice(CONDITIONS),
+        "purchase_price": purchase_price,
+        "listed_price": listed_price,
+        "sold_price": round(listed_price * rng.uniform(0.7, 1.0), 2) if sold_at else None,
+        "shipping_cost": round(rng.uniform(0, 6), 2),
+        "vinted_fee": round(rng.uniform(0, 3), 2),
+        "buyer_protection_fee": round(rng.uniform(0, 2), 2),
+        "views": rng.randint(0, 600),
+        "likes": rng.randint(0, 60),
+        "watchers": rng.randint(0, 20),
+        "messages": rng.randint(0, 10),
+        "photos": [photo] if photo else [],
+        "main_photo": photo,
+        "created_at": created_at,
+        "listed_at": listed_at,
+        "sold_at": sold_at,
+        "last_renewed_at": None,
+        "updated_at": sold_at or listed_at or created_at,
+        "version": 0,
+        "status": status,
+        "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        "profit_margin": None,
+        "roi_percentage": None,
+        "days_to_sell": None,
+        "expenses_total": 0.0,
+        "expenses_by_category": {},
+        "renewal_reminder_sent": False,
+        "low_roi_alert_sent": False,
+    }
+
+
+def make_items(count: int, seed: int = 42, photo_bytes: int = 0):
+    """Yield `count` reproducible item documents"""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    for _ in range(count):
+        yield make_item(rng, photo_bytes, now)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Measure PUT /api/items/{id} latency under concurrent load.
+
+Creates a pool of items, then runs concurrent workers that edit random items
+with and without If-Match, and reports p50/p95/p99 latency plus conflict
+counts.
+
+    python benchmarks/update_item_latency.py --url http://localhost:8001/api \
+        --items 50 --workers 32 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import percentile  # noqa: E402
+
+
+async def create_items(client, count):
+    item_ids = []
+    for i in range(count):
+        response = await client.post("/items", json={
+            "title": f"Benchmark item {i}",
+            "category": "Tops",
+            "brand": "Zara",
+            "condition": "Good",
+            "purchase_price": 10.0,
+            "listed_price": 25.0,
+        })
+        response.raise_for_status()
+        item_ids.append(response.json()["id"])
+    return item_ids
+
+
+async def worker(client, item_ids, etags, remaining, latencies, outcomes, use_if_match):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        item_id = random.choice(item_ids)
+        headers = {}
+        if use_if_match and item_id in etags:
+            headers["If-Match"] = etags[item_id]
+        payload = {"views": random.randint(0, 500), "likes": random.randint(0, 50)}
+        if random.random() < 0.1:
+            payload["status"] = random.choice(["active", "draft"])
+
+        started = time.perf_counter()
+        response = await client.put(f"/items/{item_id}", json=payload, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if "etag" in response.headers:
+            etags[item_id] = response.headers["etag"]
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=30.0) as client:
+        item_ids = await create_items(client, args.items)
+        results = {}
+        for mode, use_if_match in (("last_write_wins", False), ("if_match", True)):
+            latencies, outcomes, etags = [], {}, {}
+            remaining = [args.requests]
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                worker(client, item_ids, etags, remaining, latencies, outcomes, use_if_match)
+                for _ in range(args.workers)
+            ])
+            elapsed = time.perf_counter() - started
+            results[mode] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "mean_ms": round(statistics.mean(latencies), 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "status_codes": outcomes,
+            }
+
+        for item_id in item_ids:
+            await client.delete(f"/items/{item_id}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=os.environ.get("API_URL", "http://localhost:8001/api"))
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,12 +36,38 @@ const AddItemForm = ({ isOpen, onClose, onItemAdded, editingItem = null }) => {
 
   const [formData, setFormData] = useState(getInitialFormData);
   const [loading, setLoading] = useState(false);
+  const [priceSuggestion, setPriceSuggestion] = useState(null);
 
   // Update form data when editingItem changes
   useEffect(() => {
     setFormData(getInitialFormData());
   }, [editingItem]);
 
+  // Suggest a listing price from comparable sales once the category is known
+  useEffect(() => {
+    if (!isOpen || !formData.category.trim()) {
+      setPriceSuggestion(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const params = { category: formData.category };
+        ['brand', 'condition', 'size'].forEach(field => {
+          if (formData[field]) params[field] = formData[field];
+        });
+        const response = await axios.get(`${API}/pricing/suggest`, { params });
+        if (!cancelled) setPriceSuggestion(response.data.comparables > 0 ? response.data : null);
+      } catch (error) {
+        if (!cancelled) setPriceSuggestion(null);
+      }
+    }, 400);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [isOpen, formData.category, formData.brand, formData.condition, formData.size]);
+
   const handleInputChange = (e) => {
     const { name, value, type } = e.target;
     setFormData(prev => ({
@@ -288,6 +314,20 @@ const AddItemForm = ({ isOpen, onClose, onItemAdded, editingItem = null }) => {
                       className="w-full border border-gray-300 rounded-md px-3 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                       placeholder="0.00"
                     />
+                    {priceSuggestion && (
+                      <p className="mt-1 text-xs text-gray-600">
+                        Similar items sold for £{priceSuggestion.suggested_price_range.min.toFixed(2)}–£{priceSuggestion.suggested_price_range.max.toFixed(2)}
+                        {priceSuggestion.expected_days_to_sell != null && ` in ~${Math.round(priceSuggestion.expected_days_to_sell)} days`}
+                        {` (${priceSuggestion.comparables} sales)`}{' '}
+                        <button
+                          type="button"
+                          onClick={() => setFormData(prev => ({ ...prev, listed_price: priceSuggestion.suggested_price }))}
+                          className="text-blue-600 hover:underline"
+                        >
+                          Use £{priceSuggestion.suggested_price.toFixed(2)}
+                        </button>
+                      </p>
+                    )}
                   </div>
                 </div>
 
@@ -0,0 +1,31 @@
+"""Shared fixtures for API tests, which run the app in-process on the SQLite backend."""
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The server module, opened on a fresh SQLite database with process-local state reset"""
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "api.db"))
+    from backend import server
+
+    # Caches live for the life of the process; start each test empty
+    server.roi_target_cache.clear()
+    server.pricing_index._sellers.clear()
+    monkeypatch.setattr(server.item_archiver.settings, "enabled", False)
+    return server
+
+
+@pytest.fixture
+def client(server):
+    with TestClient(server.app) as client:
+        yield client
+
+
+def item_payload(**fields):
+    """A valid item create body, overridden by fields"""
+    return {
+        "title": "Denim jacket", "brand": "Levis", "category": "Jackets", "condition": "good",
+        "listed_price": 30.0, "purchase_price": 10.0, **fields
+    }
@@ -0,0 +1,75 @@
+"""Admission lanes: concurrency limits, bounded queues and 429 back-pressure."""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from backend.admission import HEAVY, INTERACTIVE, AdmissionLane, AdmissionMiddleware, LaneSettings
+
+
+def make_app(heavy_settings: LaneSettings):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post("/export")
+    async def export():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    app.add_middleware(
+        AdmissionMiddleware,
+        lanes={
+            INTERACTIVE: AdmissionLane(INTERACTIVE, LaneSettings(4, 4, 1.0, 1)),
+            HEAVY: AdmissionLane(HEAVY, heavy_settings),
+        },
+        heavy_routes={("POST", "/export")},
+    )
+    return app, release
+
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+
+def test_full_heavy_queue_rejects_with_retry_after_while_interactive_routes_keep_serving():
+    async def scenario():
+        app, release = make_app(LaneSettings(concurrency=1, queue_limit=1, queue_timeout_seconds=5.0, retry_after_seconds=7))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            running = asyncio.create_task(client.post("/export"))
+            queued = asyncio.create_task(client.post("/export"))
+            await asyncio.sleep(0.05)
+
+            rejected = await client.post("/export")
+            interactive = await client.get("/items")
+
+            release.set()
+            return rejected, interactive, await running, await queued
+
+    rejected, interactive, running, queued = run(scenario)
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "7"
+    assert interactive.status_code == 200
+    assert (running.status_code, queued.status_code) == (200, 200)
+
+
+def test_queued_request_times_out_with_429():
+    async def scenario():
+        app, release = make_app(LaneSettings(concurrency=1, queue_limit=4, queue_timeout_seconds=0.05, retry_after_seconds=1))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            running = asyncio.create_task(client.post("/export"))
+            await asyncio.sleep(0.02)
+            timed_out = await client.post("/export")
+            release.set()
+            await running
+            return timed_out
+
+    assert run(scenario).status_code == 429
+
+
+def test_heavy_routes_name_real_routes(server):
+    routes = {(method, route.path) for route in server.app.routes for method in getattr(route, "methods", ())}
+    assert server.HEAVY_ROUTES <= routes
@@ -0,0 +1,106 @@
+"""Moving cold items to the archive, and reads that reach into it with include_archived=true."""
+import csv
+import io
+from datetime import datetime, timedelta
+
+from backend.archival import ARCHIVE_COLLECTION, ItemArchiver
+from tests.conftest import item_payload
+
+
+def sold_item(client, **fields):
+    item = client.post("/api/items", json=item_payload(**fields)).json()
+    return client.put(f"/api/items/{item['id']}", json={"status": "sold", "sold_price": 40.0}).json()
+
+
+def make_cold(client, server, item_ids):
+    """Backdate the items past the archive cutoff"""
+    long_ago = datetime.utcnow() - timedelta(days=server.item_archiver.settings.after_days + 1)
+    client.portal.call(
+        server.db.vinted_items.update_many, {"id": {"$in": item_ids}}, {"$set": {"updated_at": long_ago}}
+    )
+
+
+def page_order(items):
+    return [item["id"] for item in sorted(items, key=lambda item: (item["created_at"], item["id"]))]
+
+
+def test_archiving_moves_cold_items_and_keeps_dashboard_totals(client, server):
+    cold = [sold_item(client, title=f"Sold {i}") for i in range(2)]
+    recent = sold_item(client, title="Recent sale")
+    draft = client.post("/api/items", json=item_payload(title="Draft")).json()
+    make_cold(client, server, [item["id"] for item in cold] + [draft["id"]])
+    before = client.get("/api/dashboard/stats").json()
+
+    assert client.post("/api/tasks/archive-items").json()["archived"] == 2
+
+    assert {item["id"] for item in client.get("/api/items").json()} == {recent["id"], draft["id"]}
+    after = client.get("/api/dashboard/stats").json()
+    for field in ("total_items", "sold_items", "total_revenue", "total_profit", "average_roi",
+                  "monthly_profit", "monthly_sales_count"):
+        assert after[field] == before[field], field
+    assert client.post("/api/tasks/archive-items").json()["archived"] == 0
+
+
+def test_include_archived_reads(client, server):
+    hot = [client.post("/api/items", json=item_payload(title=f"Hot {i}")).json() for i in range(3)]
+    cold = [sold_item(client, title=f"Cold {i}") for i in range(2)]
+    make_cold(client, server, [item["id"] for item in cold])
+    client.post("/api/tasks/archive-items")
+
+    pages = [
+        client.get("/api/items", params={"include_archived": True, "skip": skip, "limit": 2}).json()
+        for skip in (0, 2, 4)
+    ]
+    # Hot items first, then archived ones, each in (created_at, id) order
+    assert [item["id"] for page in pages for item in page] == page_order(hot) + page_order(cold)
+    assert "rollup_month" not in client.get("/api/items", params={"include_archived": True, "skip": 3}).json()[0]
+
+    archived_id = cold[0]["id"]
+    assert client.get(f"/api/items/{archived_id}").status_code == 404
+    response = client.get(f"/api/items/{archived_id}", params={"include_archived": True})
+    assert response.status_code == 200 and response.json()["title"] == "Cold 0"
+
+    def exported_ids(**params):
+        rows = csv.DictReader(io.StringIO(client.get("/api/items/export/csv", params=params).text))
+        return {row["ID"] for row in rows}
+    assert exported_ids() == {item["id"] for item in hot}
+    assert exported_ids(include_archived=True) == {item["id"] for item in hot + cold}
+
+
+def test_items_without_updated_at_age_from_creation(client, server):
+    item = sold_item(client)
+    long_ago = datetime.utcnow() - timedelta(days=server.item_archiver.settings.after_days + 1)
+    client.portal.call(
+        server.db.vinted_items.update_one, {"id": item["id"]},
+        {"$set": {"created_at": long_ago}, "$unset": {"updated_at": ""}}
+    )
+    assert client.post("/api/tasks/archive-items").json()["archived"] == 1
+
+
+def test_item_changed_while_archiving_stays_hot(client, server, monkeypatch):
+    item = sold_item(client)
+    make_cold(client, server, [item["id"]])
+
+    refresh = ItemArchiver._refresh_rollups
+
+    async def racing_refresh(self, db, seller_id, months):
+        await refresh(self, db, seller_id, months)
+        if not raced:
+            raced.append(True)
+            await db.vinted_items.update_one({"id": item["id"]}, {"$inc": {"version": 1}})
+
+    raced = []
+    monkeypatch.setattr(ItemArchiver, "_refresh_rollups", racing_refresh)
+    assert client.post("/api/tasks/archive-items").json()["archived"] == 0
+
+    assert client.get(f"/api/items/{item['id']}").status_code == 200
+    assert client.portal.call(server.db[ARCHIVE_COLLECTION].count_documents, {}) == 0
+    assert client.get("/api/dashboard/stats").json()["sold_items"] == 1
+
+
+def test_one_worker_holds_the_lease_at_a_time(client, server):
+    first, second = ItemArchiver(server.item_archiver.settings), ItemArchiver(server.item_archiver.settings)
+    assert client.portal.call(first._acquire_lease, server.db)
+    assert not client.portal.call(second._acquire_lease, server.db)
+    client.portal.call(first._release_lease, server.db)
+    assert client.portal.call(second._acquire_lease, server.db)
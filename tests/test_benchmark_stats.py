@@ -0,0 +1,19 @@
+"""Summary statistics used by the benchmark scripts."""
+import pytest
+
+from benchmarks.stats import percentile
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    ([], 50, 0.0),
+    ([7.0], 99, 7.0),
+    ([2.0, 1.0], 50, 1.0),
+    ([1.0, 2.0, 3.0, 4.0, 5.0, 6.0], 50, 3.0),
+    ([float(n) for n in range(1, 11)], 50, 5.0),
+    ([float(n) for n in range(1, 11)], 95, 10.0),
+    ([float(n) for n in range(1, 101)], 99, 99.0),
+    ([3.0, 1.0, 2.0], 0, 1.0),
+    ([3.0, 1.0, 2.0], 100, 3.0),
+])
+def test_percentile_is_nearest_rank(values, pct, expected):
+    assert percentile(values, pct) == expected
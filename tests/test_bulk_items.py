@@ -0,0 +1,86 @@
+"""Bulk item operations over id lists and filters."""
+from tests.conftest import item_payload
+
+
+def create_items(client, statuses):
+    ids = {}
+    for status in statuses:
+        item = client.post("/api/items", json=item_payload(title=f"{status} item")).json()
+        if status != "draft":
+            client.put(f"/api/items/{item['id']}", json={"status": status, **({"sold_price": 40.0} if status == "sold" else {})})
+        ids[status] = item["id"]
+    return ids
+
+
+def statuses(client):
+    return {item["title"].split()[0]: item["status"] for item in client.get("/api/items").json()}
+
+
+def test_bulk_archive_by_status_leaves_other_items_alone(client):
+    create_items(client, ["sold", "active", "draft", "archived"])
+
+    response = client.post("/api/items/bulk-archive", json={"filter": {"status": "sold"}}).json()
+    assert response["items"] == 1
+    assert statuses(client) == {"sold": "archived", "active": "active", "draft": "draft", "archived": "archived"}
+
+    assert client.post("/api/items/bulk-archive", json={"filter": {"status": "archived"}}).json()["items"] == 0
+    assert statuses(client)["active"] == "active"
+
+
+def event_item_ids(client, server, event_type):
+    async def fetch():
+        return await server.db.item_events.find({"type": event_type}, {"_id": 0}).to_list(None)
+    return sorted(event["meta"]["item_id"] for event in client.portal.call(fetch))
+
+
+def test_bulk_archive_dry_run_and_id_list(client, server):
+    ids = create_items(client, ["active", "draft", "archived"])
+
+    dry_run = client.post("/api/items/bulk-archive", json={"filter": {}, "dry_run": True}).json()
+    assert (dry_run["items"], dry_run["dry_run"]) == (2, True)
+    assert statuses(client)["active"] == "active"
+
+    response = client.post("/api/items/bulk-archive", json={"item_ids": [ids["draft"], ids["archived"]]}).json()
+    assert response["items"] == 1
+    assert statuses(client) == {"active": "active", "draft": "archived", "archived": "archived"}
+    # Only the item that changed gets an archived event
+    assert event_item_ids(client, server, "archived") == [ids["draft"]]
+
+
+def test_bulk_delete_by_filter_cascades_to_expenses(client):
+    ids = create_items(client, ["sold", "active"])
+    client.post("/api/expenses", json={"item_id": ids["sold"], "category": "shipping", "amount": 3.0})
+
+    response = client.post("/api/items/bulk-delete", json={"filter": {"status": "sold"}}).json()
+    assert (response["items"], response["expenses"]) == (1, 1)
+    assert statuses(client) == {"active": "active"}
+    assert client.get(f"/api/expenses/item/{ids['sold']}").json() == []
+
+
+def test_bulk_selection_requires_ids_or_filter(client):
+    assert client.post("/api/items/bulk-archive", json={}).status_code == 400
+
+
+def test_bulk_update_transitions_status_and_reports_outcomes(client):
+    ids = create_items(client, ["draft", "active"])
+
+    response = client.post("/api/items/bulk-update", json={
+        "item_ids": [ids["draft"], ids["active"], "missing"], "patch": {"status": "active", "listed_price": 25.0}
+    }).json()
+    assert (response["matched"], response["updated"]) == (2, 2)
+    assert [result["outcome"] for result in response["results"]] == ["updated", "updated", "not_found"]
+
+    items = {item["title"].split()[0]: item for item in client.get("/api/items").json()}
+    assert all(item["status"] == "active" and item["listed_price"] == 25.0 for item in items.values())
+    # Only the item that became active gets a new listed_at
+    assert items["draft"]["listed_at"] != items["active"]["listed_at"]
+
+
+def test_bulk_update_by_filter_with_renew(client):
+    create_items(client, ["sold", "active"])
+
+    response = client.post("/api/items/bulk-update", json={"filter": {"status": "active"}, "renew": True}).json()
+    assert response["updated"] == 1
+    items = {item["title"].split()[0]: item for item in client.get("/api/items").json()}
+    assert items["active"]["last_renewed_at"] is not None
+    assert items["sold"]["last_renewed_at"] is None
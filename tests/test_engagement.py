@@ -0,0 +1,84 @@
+"""The write-behind engagement buffer and POST /api/items/engagement."""
+import asyncio
+
+from backend.engagement import EngagementBuffer, EngagementSettings
+from tests.conftest import item_payload
+
+
+def buffer(**settings):
+    return EngagementBuffer(EngagementSettings(
+        **{"flush_interval_seconds": 60.0, "flush_max_items": 1000, "buffer_max_items": 100, **settings}
+    ))
+
+
+def test_buffer_coalesces_deltas_per_item():
+    async def scenario():
+        writes = []
+
+        async def writer(pending):
+            writes.append(pending)
+
+        engagement = buffer()
+        engagement.start(writer)
+        assert engagement.add("alice", {"a": {"views": 2}, "b": {"likes": 1}})
+        assert engagement.add("alice", {"a": {"views": 3, "likes": 1}})
+        assert engagement.add("bob", {"a": {"views": 1}})
+        assert engagement.pending_items() == 3
+        await engagement.stop()
+        return writes
+
+    assert asyncio.run(scenario()) == [{
+        ("alice", "a"): {"views": 5, "likes": 1}, ("alice", "b"): {"likes": 1}, ("bob", "a"): {"views": 1}
+    }]
+
+
+def test_buffer_rejects_new_items_when_full_and_retries_failed_flushes():
+    async def scenario():
+        attempts = []
+
+        async def flaky_writer(pending):
+            attempts.append(dict(pending))
+            if len(attempts) == 1:
+                raise RuntimeError("database unavailable")
+
+        engagement = buffer(buffer_max_items=2)
+        engagement.start(flaky_writer)
+        assert engagement.add("alice", {"a": {"views": 1}, "b": {"views": 1}})
+        assert not engagement.add("alice", {"c": {"views": 1}})
+        # Items already pending still take deltas
+        assert engagement.add("alice", {"a": {"views": 1}})
+
+        await engagement.flush()
+        assert engagement.pending_items() == 2
+        engagement.add("alice", {"b": {"views": 4}})
+        await engagement.stop()
+        return attempts
+
+    attempts = asyncio.run(scenario())
+    assert attempts[-1] == {("alice", "a"): {"views": 2}, ("alice", "b"): {"views": 5}}
+
+
+def test_engagement_route_applies_deltas_to_known_items(client, server):
+    item = client.post("/api/items", json=item_payload()).json()
+    response = client.post("/api/items/engagement", json={"deltas": [
+        {"item_id": item["id"], "views": 5, "likes": 1},
+        {"item_id": item["id"], "views": 2},
+        {"item_id": "nope", "views": 7},
+    ]})
+    assert response.status_code == 202
+    assert response.json()["items"] == 2
+    client.portal.call(server.engagement_buffer.flush)
+
+    stored = client.get(f"/api/items/{item['id']}").json()
+    assert (stored["views"], stored["likes"]) == (7, 1)
+
+    async def engagement_events():
+        return await server.db.item_events.find({"type": "engagement"}, {"_id": 0}).to_list(None)
+    events = client.portal.call(engagement_events)
+    assert [(event["meta"]["item_id"], event["deltas"]) for event in events] == [(item["id"], {"views": 7, "likes": 1})]
+
+
+def test_engagement_route_rejects_negative_deltas(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    response = client.post("/api/items/engagement", json={"deltas": [{"item_id": item["id"], "views": -50}]})
+    assert response.status_code == 422
@@ -0,0 +1,89 @@
+"""Expense routes and the denormalized expense totals they keep on items."""
+from tests.conftest import item_payload
+
+
+def create_item(client, **fields):
+    return client.post("/api/items", json=item_payload(**fields)).json()
+
+
+def expense_deltas(client, server, item_id):
+    async def fetch():
+        return await server.db.item_events.find(
+            {"meta.item_id": item_id, "type": "expense"}, {"_id": 0}
+        ).sort("at", 1).to_list(None)
+    return [event["deltas"]["expenses_total"] for event in client.portal.call(fetch)]
+
+
+def test_category_change_moves_totals_and_records_event(client, server):
+    item = create_item(client)
+    expense = client.post("/api/expenses", json={"item_id": item["id"], "category": "shipping", "amount": 4.0}).json()
+
+    response = client.put(f"/api/expenses/{expense['id']}", json={"category": "packaging", "amount": 6.0})
+    assert response.status_code == 200
+
+    stored = client.get(f"/api/items/{item['id']}").json()
+    assert stored["expenses_total"] == 6.0
+    assert stored["expenses_by_category"] == {"shipping": 0.0, "packaging": 6.0}
+    assert expense_deltas(client, server, item["id"]) == [4.0, 2.0]
+
+
+def test_reconcile_fixes_drift_across_batches(client, server, monkeypatch):
+    monkeypatch.setattr(server, "RECONCILE_BATCH_SIZE", 2)
+    items = [create_item(client, title=f"Item {i}") for i in range(5)]
+    for item in items:
+        client.post("/api/expenses", json={"item_id": item["id"], "category": "shipping", "amount": 3.0})
+
+    drifted = [items[0]["id"], items[4]["id"]]
+    client.portal.call(server.db.vinted_items.update_many, {"id": {"$in": drifted}}, {"$set": {"expenses_total": 99.0}})
+
+    result = client.post("/api/tasks/reconcile-expenses").json()
+    assert (result["corrected"], result["conflicts"]) == (2, 0)
+    assert all(client.get(f"/api/items/{item['id']}").json()["expenses_total"] == 3.0 for item in items)
+    assert client.post("/api/tasks/reconcile-expenses").json()["corrected"] == 0
+
+
+def test_reconcile_does_not_overwrite_concurrent_expense(client, server, monkeypatch):
+    item = create_item(client)
+    client.post("/api/expenses", json={"item_id": item["id"], "category": "shipping", "amount": 3.0})
+    client.portal.call(server.db.vinted_items.update_many, {}, {"$set": {"expenses_total": 50.0}})
+
+    # An expense lands after the sums are read but before the correction is written
+    aggregate = server.db.item_expenses.aggregate
+
+    async def racing_aggregate(pipeline):
+        async for row in aggregate(pipeline):
+            yield row
+        if not raced:
+            raced.append(True)
+            await server.insert_expense_batch([server.ItemExpense(item_id=item["id"], category="cleaning", amount=2.0)])
+
+    raced = []
+    monkeypatch.setattr(server.db.item_expenses, "aggregate", racing_aggregate)
+    result = client.post("/api/tasks/reconcile-expenses").json()
+
+    assert result["corrected"] == 1
+    stored = client.get(f"/api/items/{item['id']}").json()
+    assert stored["expenses_total"] == 5.0
+    assert stored["expenses_by_category"] == {"shipping": 3.0, "cleaning": 2.0}
+
+
+def test_csv_import_ignores_client_ids_and_keeps_multiline_fields(client, server):
+    item = create_item(client)
+    body = (
+        "item_id,category,amount,description,seller_id,id\n"
+        f'{item["id"]},shipping,2.5,"Royal Mail,\nsigned for",mallory,chosen-id\n'
+        f"{item['id']},packaging,1.5,,mallory,chosen-id-2\n"
+    ).encode()
+    # Split inside the quoted field so the record spans two chunks
+    split = body.index(b"signed")
+    response = client.post(
+        "/api/expenses/bulk", content=iter([body[:split], body[split:]]), headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+
+    expenses = client.get(f"/api/expenses/item/{item['id']}").json()
+    assert sorted(expense["description"] or "" for expense in expenses) == ["", "Royal Mail,\nsigned for"]
+    assert all(expense["seller_id"] == server.DEFAULT_SELLER_ID for expense in expenses)
+    assert not {expense["id"] for expense in expenses} & {"chosen-id", "chosen-id-2"}
+    assert client.get(f"/api/items/{item['id']}").json()["expenses_total"] == 4.0
@@ -0,0 +1,60 @@
+"""App startup and shutdown through the lifespan, and the liveness and readiness probes."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.sqlite_store import SQLiteDatabase
+
+
+def test_lifespan_opens_and_closes_the_store(server):
+    with TestClient(server.app) as client:
+        assert isinstance(server.db, SQLiteDatabase)
+        assert server.engagement_buffer._task is not None
+        assert client.get("/api/health/ready").status_code == 200
+
+    assert server.engagement_buffer._task is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(server.db.command("ping"))
+
+
+def test_probes_report_a_ready_store(client):
+    assert client.get("/api/health/live").json() == {"status": "alive"}
+
+    ready = client.get("/api/health/ready")
+    assert ready.status_code == 200
+    body = ready.json()
+    assert (body["status"], body["pool"], body["saturated"]) == ("ready", None, False)
+    assert set(body["admission"]) == {"interactive", "heavy"}
+
+
+def test_readiness_fails_while_the_store_does_not_answer(client, server, monkeypatch):
+    async def unavailable(command):
+        raise ConnectionError("store unavailable")
+
+    monkeypatch.setattr(server.db, "command", unavailable)
+    ready = client.get("/api/health/ready")
+    assert ready.status_code == 503
+    assert ready.json()["reason"] == "store unavailable"
+    assert client.get("/api/health/live").status_code == 200
+
+
+def test_app_starts_without_a_reachable_mongo(monkeypatch):
+    for name, value in {
+        "STORAGE_BACKEND": "mongo", "MONGO_URL": "mongodb://127.0.0.1:9", "DB_NAME": "unreachable",
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS": "200", "MONGO_CONNECT_TIMEOUT_MS": "200", "MONGO_HEAVY_POOL_SIZE": "0",
+    }.items():
+        monkeypatch.setenv(name, value)
+    from backend import server
+
+    # The lifespan only assigns the clients of the backend it opens
+    for name in ("client", "heavy_client", "db", "pool_stats", "heavy_pool_stats", "slow_query_log"):
+        monkeypatch.setattr(server, name, None)
+    monkeypatch.setattr(server.item_archiver.settings, "enabled", False)
+
+    with TestClient(server.app) as client:
+        assert client.get("/api/health/live").status_code == 200
+        ready = client.get("/api/health/ready")
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "not_ready"
+        assert ready.json()["pool"]["max_pool_size"] == 100
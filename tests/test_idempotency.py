@@ -0,0 +1,58 @@
+"""Idempotency-Key on item creation and bulk upload."""
+from datetime import datetime, timedelta
+
+from tests.conftest import item_payload
+
+
+def item_count(client, **headers):
+    return len(client.get("/api/items", headers=headers).json())
+
+
+def test_retried_create_is_replayed(client):
+    first = client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "create-1"})
+    retry = client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "create-1"})
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert retry.json() == first.json()
+    assert item_count(client) == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(client):
+    client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "create-1"})
+    reused = client.post("/api/items", json=item_payload(title="Other"), headers={"Idempotency-Key": "create-1"})
+    assert reused.status_code == 422
+    assert item_count(client) == 1
+
+
+def test_keys_are_scoped_per_seller(client):
+    client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "shared"})
+    bob = client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "shared", "X-Seller-Id": "bob"})
+    assert "idempotent-replayed" not in bob.headers
+    assert item_count(client, **{"X-Seller-Id": "bob"}) == 1
+
+
+def test_bulk_upload_is_replayed(client):
+    body = {"items": [item_payload(title="A"), item_payload(title="B")]}
+    first = client.post("/api/items/bulk-upload", json=body, headers={"Idempotency-Key": "upload-1"})
+    retry = client.post("/api/items/bulk-upload", json=body, headers={"Idempotency-Key": "upload-1"})
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert item_count(client) == 2
+
+
+def test_stale_claim_of_a_crashed_request_is_taken_over(client, server):
+    scoped_key = f"{server.DEFAULT_SELLER_ID}:create_item:crashed"
+    client.portal.call(server.db.idempotency_keys.insert_one, {
+        "key": scoped_key, "fingerprint": "unknown", "status": "in_progress",
+        "created_at": datetime.utcnow(), "locked_at": datetime.utcnow() - timedelta(hours=1),
+    })
+    # The crashed attempt got as far as inserting its item
+    crashed_item = server.VintedItem(**item_payload(title="Crashed"), id=server.derived_id(scoped_key))
+    client.portal.call(server.db.vinted_items.insert_one, crashed_item.dict())
+
+    retry = client.post("/api/items", json=item_payload(), headers={"Idempotency-Key": "crashed"})
+    assert retry.status_code == 200
+    assert (retry.json()["id"], retry.json()["title"]) == (crashed_item.id, "Crashed")
+    assert item_count(client) == 1
@@ -0,0 +1,91 @@
+"""Cache invalidations published through the invalidation bus.
+
+The cross-worker test tails a real capped collection, so it runs only when
+MONGO_URL points at a reachable server (a throwaway database is created and
+dropped).
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from backend.invalidation import InvalidationBus
+
+
+def recording_evictor(cache, evictions):
+    def evict(key):
+        evictions.append(key)
+        if key is None:
+            cache.clear()
+        else:
+            cache.pop(key, None)
+    return evict
+
+
+def test_publish_without_the_log_evicts_locally():
+    bus = InvalidationBus()
+    caches = {"roi_target": {"alice": 1, "bob": 2}, "pricing_index": {"alice": 3}}
+    for name, cache in caches.items():
+        bus.register(name, recording_evictor(cache, []))
+
+    asyncio.run(bus.publish("roi_target", "alice"))
+    asyncio.run(bus.publish("unregistered", "alice"))
+    assert caches == {"roi_target": {"bob": 2}, "pricing_index": {"alice": 3}}
+
+    bus._evict_all()
+    assert caches == {"roi_target": {}, "pricing_index": {}}
+
+
+def test_roi_target_writes_evict_the_cached_target(client, server):
+    assert client.get("/api/roi-targets/current").json()["target_percentage"] == 30.0
+    assert server.DEFAULT_SELLER_ID in server.roi_target_cache
+    client.post("/api/roi-targets", json={"target_percentage": 45.0, "is_active": False})
+    assert server.DEFAULT_SELLER_ID not in server.roi_target_cache
+    client.post("/api/roi-targets", json={"target_percentage": 50.0})
+    assert client.get("/api/roi-targets/current").json()["target_percentage"] == 50.0
+
+
+def test_invalidations_reach_other_workers():
+    if not os.environ.get("MONGO_URL"):
+        pytest.skip("MONGO_URL not set")
+
+    async def scenario():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=2000)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            pytest.skip("MongoDB not reachable")
+        db = client[f"invalidation_{uuid.uuid4().hex[:12]}"]
+        # Two workers, each with its own copy of the cache
+        publisher, subscriber = InvalidationBus(), InvalidationBus()
+        caches = {"publisher": {"alice": 1, "bob": 2}, "subscriber": {"alice": 1, "bob": 2}}
+        evictions = {"publisher": [], "subscriber": []}
+        publisher.register("roi_target", recording_evictor(caches["publisher"], evictions["publisher"]))
+        subscriber.register("roi_target", recording_evictor(caches["subscriber"], evictions["subscriber"]))
+        try:
+            await publisher.start(db)
+            await subscriber.start(db)
+            # Both open the log in the background
+            for _ in range(100):
+                if publisher._collection is not None and subscriber._collection is not None:
+                    break
+                await asyncio.sleep(0.05)
+            await publisher.publish("roi_target", "alice")
+            for _ in range(100):
+                if "alice" not in caches["subscriber"]:
+                    break
+                await asyncio.sleep(0.05)
+            # Give the publisher's own tail time to see (and skip) its entry
+            await asyncio.sleep(0.2)
+        finally:
+            await publisher.stop()
+            await subscriber.stop()
+            await client.drop_database(db.name)
+            client.close()
+        return caches, evictions
+
+    caches, evictions = asyncio.run(scenario())
+    assert caches == {"publisher": {"bob": 2}, "subscriber": {"bob": 2}}
+    assert evictions == {"publisher": ["alice"], "subscriber": ["alice"]}
@@ -0,0 +1,61 @@
+"""The item event log, its hourly and daily rollups and the analytics routes that read them."""
+from tests.conftest import item_payload
+
+
+def events_of(client, server, item_id):
+    async def fetch():
+        return await server.db.item_events.find({"meta.item_id": item_id}, {"_id": 0}).sort("at", 1).to_list(None)
+    return client.portal.call(fetch)
+
+
+def totals(buckets, *fields):
+    """Fields summed over buckets, so a write that crosses an hour or day boundary still adds up"""
+    return tuple(sum(bucket.get(field, 0) for bucket in buckets) for field in fields)
+
+
+def test_writes_append_events_with_changes_and_deltas(client, server):
+    item = client.post("/api/items", json=item_payload()).json()
+    client.put(f"/api/items/{item['id']}", json={"views": 3})
+    client.put(f"/api/items/{item['id']}", json={"listed_price": 25.0, "views": 10})
+
+    created, viewed, repriced = events_of(client, server, item["id"])
+    assert created["type"] == "created"
+    assert created["changes"]["listed_price"] == {"from": None, "to": 30.0}
+    assert (viewed["type"], viewed["deltas"]) == ("updated", {"views": 3})
+    assert repriced["changes"]["listed_price"] == {"from": 30.0, "to": 25.0}
+    assert repriced["deltas"] == {"views": 7}
+
+
+def test_item_history_sums_counters_per_bucket(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    client.put(f"/api/items/{item['id']}", json={"listed_price": 25.0, "views": 10})
+    client.put(f"/api/items/{item['id']}", json={"listed_price": 28.0, "likes": 2})
+
+    for granularity in ("hour", "day"):
+        response = client.get(f"/api/analytics/items/{item['id']}/history", params={"granularity": granularity})
+        assert response.status_code == 200
+        buckets = response.json()["buckets"]
+        assert totals(buckets, "events", "views", "likes", "price_changes", "price_drops") == (3, 10, 2, 2, 1)
+        assert min(bucket["min_price"] for bucket in buckets) == 25.0
+        assert max(bucket["max_price"] for bucket in buckets) == 30.0
+        assert buckets[-1]["last_price"] == 28.0
+
+
+def test_seller_engagement_sums_items_per_bucket(client):
+    first = client.post("/api/items", json=item_payload()).json()
+    second = client.post("/api/items", json=item_payload()).json()
+    client.put(f"/api/items/{first['id']}", json={"views": 4, "messages": 1})
+    client.put(f"/api/items/{second['id']}", json={"views": 6})
+    other = client.post("/api/items", json=item_payload(), headers={"X-Seller-Id": "bob"}).json()
+    client.put(f"/api/items/{other['id']}", json={"views": 100}, headers={"X-Seller-Id": "bob"})
+
+    buckets = client.get("/api/analytics/engagement", params={"granularity": "hour"}).json()["buckets"]
+    assert totals(buckets, "events", "views", "messages") == (4, 10, 1)
+    assert max(bucket["items"] for bucket in buckets) <= 2
+
+
+def test_history_window_and_granularity(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    past = {"date_from": "2020-01-01T00:00:00", "date_to": "2020-01-02T00:00:00"}
+    assert client.get(f"/api/analytics/items/{item['id']}/history", params=past).json()["buckets"] == []
+    assert client.get("/api/analytics/engagement", params={"granularity": "week"}).status_code == 422
@@ -0,0 +1,64 @@
+"""Item metrics computed in Python and the matching pipeline stage and profit filter evaluated by the store."""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from backend.item_metrics import compute_item_metrics, item_metrics_stage, profit_range_expr
+from backend.sqlite_store import SQLiteDatabase
+
+ITEMS = [
+    {"id": "loss", "sold_price": 8.0, "purchase_price": 10.0, "listed_at": datetime(2024, 1, 1), "sold_at": datetime(2024, 1, 3)},
+    {"id": "fees", "sold_price": 30.0, "purchase_price": 10.0, "shipping_cost": 2.5, "vinted_fee": None, "expenses_total": 4.5},
+    {"id": "free", "sold_price": 12.0, "purchase_price": 0.0},
+    {"id": "unsold", "sold_price": None, "purchase_price": 5.0},
+]
+
+
+def test_compute_item_metrics():
+    items = compute_item_metrics([dict(item) for item in ITEMS])
+    by_id = {item["id"]: item for item in items}
+    assert by_id["loss"]["profit_margin"] == -2.0
+    assert by_id["loss"]["roi_percentage"] == -20.0
+    assert by_id["loss"]["days_to_sell"] == 2
+    assert by_id["fees"]["profit_margin"] == 13.0
+    assert "days_to_sell" not in by_id["fees"]
+    assert "roi_percentage" not in by_id["free"]
+    assert "profit_margin" not in by_id["unsold"]
+
+
+def test_item_metrics_stage_matches_compute_item_metrics(tmp_path):
+    async def scenario():
+        db = SQLiteDatabase(str(tmp_path / "metrics.db"))
+        try:
+            await db.vinted_items.insert_many([dict(item) for item in ITEMS])
+            return await db.vinted_items.aggregate([item_metrics_stage(), {"$project": {"_id": 0}}]).to_list(None)
+        finally:
+            db.close()
+
+    metrics = ("profit_margin", "roi_percentage", "days_to_sell")
+    in_store = {item["id"]: tuple(item.get(field) for field in metrics) for item in asyncio.run(scenario())}
+    computed = {
+        item["id"]: tuple(item.get(field) for field in metrics)
+        for item in compute_item_metrics([dict(item) for item in ITEMS])
+    }
+    assert in_store == computed
+
+
+@pytest.mark.parametrize("bounds, expected", [
+    ((None, None), ["fees", "free", "loss"]),
+    ((0.0, None), ["fees", "free"]),
+    ((None, 12.0), ["free", "loss"]),
+    ((13.0, 13.0), ["fees"]),
+])
+def test_profit_range_expr_matches_computed_profit(tmp_path, bounds, expected):
+    async def scenario():
+        db = SQLiteDatabase(str(tmp_path / "metrics.db"))
+        try:
+            await db.vinted_items.insert_many([dict(item) for item in ITEMS])
+            found = await db.vinted_items.find({"$expr": profit_range_expr(*bounds)}, {"_id": 0, "id": 1}).to_list(None)
+            return sorted(item["id"] for item in found)
+        finally:
+            db.close()
+
+    assert asyncio.run(scenario()) == expected
@@ -0,0 +1,75 @@
+"""Item read routes: raw projected documents and conditional GETs."""
+from datetime import datetime
+
+from backend.models import VintedItem
+from tests.conftest import item_payload
+
+
+def insert_raw(client, server, document):
+    client.portal.call(server.db.vinted_items.insert_one, document)
+
+
+def test_raw_documents_have_the_model_shape(client, server):
+    # Written before most fields existed
+    insert_raw(client, server, {
+        "id": "legacy", "seller_id": server.DEFAULT_SELLER_ID, "title": "Old coat", "brand": "Zara", "category": "Coats",
+        "condition": "good", "purchase_price": 10.0, "listed_price": 30.0, "status": "sold", "sold_price": 25.0,
+        "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)
+    })
+
+    [listed] = client.get("/api/items").json()
+    single = client.get("/api/items/legacy").json()
+    assert listed == single
+    assert "_id" not in listed
+    assert set(listed) == set(VintedItem.model_fields)
+    assert (listed["profit_margin"], listed["roi_percentage"], listed["tags"]) == (15.0, 150.0, [])
+
+
+def test_list_filters_and_paging(client):
+    for title, brand in [("A", "Zara"), ("B", "Nike"), ("C", "zara")]:
+        client.post("/api/items", json=item_payload(title=title, brand=brand))
+
+    assert sorted(item["title"] for item in client.get("/api/items", params={"brand": "ZARA"}).json()) == ["A", "C"]
+    assert len(client.get("/api/items", params={"skip": 1, "limit": 1}).json()) == 1
+
+
+def test_item_etag_and_304(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    response = client.get(f"/api/items/{item['id']}")
+    etag = response.headers["etag"]
+    assert etag == f'"{item["version"]}"'
+
+    not_modified = client.get(f"/api/items/{item['id']}", headers={"If-None-Match": etag})
+    assert (not_modified.status_code, not_modified.content, not_modified.headers["etag"]) == (304, b"", etag)
+    since = client.get(f"/api/items/{item['id']}", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert since.status_code == 304
+
+    client.put(f"/api/items/{item['id']}", json={"listed_price": 35.0})
+    changed = client.get(f"/api/items/{item['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_item_list_etag_changes_with_the_page(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    etag = client.get("/api/items").headers["etag"]
+    assert etag.startswith('W/"')
+
+    assert client.get("/api/items", headers={"If-None-Match": etag}).status_code == 304
+    # Different parameters are a different page
+    assert client.get("/api/items", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+
+    client.put(f"/api/items/{item['id']}", json={"title": "Renamed"})
+    assert client.get("/api/items", headers={"If-None-Match": etag}).status_code == 200
+    client.post("/api/items", json=item_payload(title="Another"))
+    assert client.get("/api/items", headers={"If-None-Match": client.get("/api/items").headers["etag"]}).status_code == 304
+
+
+def test_stale_if_match_is_a_conflict(client):
+    item = client.post("/api/items", json=item_payload()).json()
+    etag = client.get(f"/api/items/{item['id']}").headers["etag"]
+
+    assert client.put(f"/api/items/{item['id']}", json={"listed_price": 31.0}, headers={"If-Match": etag}).status_code == 200
+    stale = client.put(f"/api/items/{item['id']}", json={"listed_price": 32.0}, headers={"If-Match": etag})
+    assert stale.status_code == 409
+    assert client.get(f"/api/items/{item['id']}").json()["listed_price"] == 31.0
@@ -0,0 +1,35 @@
+"""Prometheus metrics and on-demand request profiling."""
+
+
+def test_metrics_label_requests_by_route_template(client):
+    client.get("/api/items/some-id")
+    client.get("/api/roi-targets/current")
+
+    metrics = client.get("/api/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    lines = metrics.text.splitlines()
+    assert any(
+        line.startswith("http_request_duration_seconds_count{")
+        and 'route="/api/items/{item_id}"' in line and 'status="404"' in line
+        for line in lines
+    )
+    assert not any("some-id" in line for line in lines)
+    assert any(line.startswith("cache_requests_total{") and 'cache="roi_target"' in line for line in lines)
+
+
+def test_admin_can_profile_a_single_request(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+
+    assert "x-profile-id" not in client.get("/api/items", headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get("/api/items", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+
+    profile_id = client.get("/api/items", params={"profile": "1"}, headers=admin).headers["x-profile-id"]
+    profiles = client.get("/api/admin/profiles", headers=admin).json()["profiles"]
+    assert profiles[0]["id"] == profile_id
+
+    download = client.get(f"/api/admin/profiles/{profile_id}", headers=admin)
+    assert download.status_code == 200
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in download.text.splitlines())
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
@@ -0,0 +1,56 @@
+"""Price suggestions from sold comparables."""
+from tests.conftest import item_payload
+
+
+def sell(client, price, **fields):
+    item = client.post("/api/items", json=item_payload(**fields)).json()
+    client.put(f"/api/items/{item['id']}", json={"status": "sold", "sold_price": price})
+    return item["id"]
+
+
+def suggest(client, **params):
+    return client.get("/api/pricing/suggest", params=params).json()
+
+
+def test_suggestion_falls_back_to_coarser_levels(client):
+    for price in (20.0, 22.0, 24.0, 26.0, 28.0):
+        sell(client, price, brand="Levis", category="Jackets", condition="good")
+    sell(client, 90.0, brand="Gucci", category="Jackets", condition="good")
+
+    levis = suggest(client, category="jackets", brand="LEVIS", condition="Good")
+    assert (levis["basis"], levis["comparables"], levis["suggested_price"]) == ("brand_category_condition", 5, 24.0)
+
+    # One Gucci sale is too few, so the whole category answers
+    gucci = suggest(client, category="Jackets", brand="Gucci", condition="good")
+    assert (gucci["basis"], gucci["comparables"]) == ("category", 6)
+
+    shoes = suggest(client, category="Shoes")
+    assert (shoes["basis"], shoes["comparables"]) == (None, 0)
+
+
+def test_suggestions_are_per_seller(client):
+    sell(client, 20.0)
+    other = client.get("/api/pricing/suggest", params={"category": "Jackets"}, headers={"X-Seller-Id": "bob"}).json()
+    assert other["comparables"] == 0
+
+
+def test_deleted_sales_leave_the_index(client):
+    first = sell(client, 20.0)
+    second = sell(client, 30.0)
+    assert suggest(client, category="Jackets")["comparables"] == 2
+
+    client.delete(f"/api/items/{first}")
+    assert suggest(client, category="Jackets")["comparables"] == 1
+
+    client.post("/api/items/bulk-delete", json={"item_ids": [second]})
+    assert suggest(client, category="Jackets")["comparables"] == 0
+
+
+def test_archived_sales_still_count_after_reload(client, server, monkeypatch):
+    sell(client, 20.0)
+    sell(client, 30.0)
+    monkeypatch.setattr(server.item_archiver.settings, "after_days", 0)
+    assert client.post("/api/tasks/archive-items").json()["archived"] == 2
+
+    server.pricing_index.evict(None)
+    assert suggest(client, category="Jackets")["comparables"] == 2
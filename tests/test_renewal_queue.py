@@ -0,0 +1,78 @@
+"""The renewal and low-performer work queues and bulk renew."""
+from datetime import datetime, timedelta
+
+from tests.conftest import item_payload
+
+
+def upload(client, *items):
+    now = datetime.utcnow()
+    client.post("/api/items/bulk-upload", json={"items": [
+        item_payload(
+            id=item_id, title=item_id, status=status, views=views,
+            listed_at=(now - timedelta(days=listed_days_ago)).isoformat()
+        )
+        for item_id, status, listed_days_ago, views in items
+    ]})
+
+
+def renewal_queue(client, **params):
+    return client.get("/api/items/queues/renewal", params=params).json()
+
+
+def test_renewal_queue_is_ranked_and_paged(client):
+    upload(client, ("fresh", "active", 5, 0), ("old", "active", 90, 0), ("older", "active", 120, 0),
+           ("due", "active", 40, 0), ("sold", "sold", 200, 0))
+
+    queue = renewal_queue(client)
+    assert [item["title"] for item in queue["items"]] == ["older", "old", "due"]
+    assert (queue["total"], queue["has_more"]) == (3, False)
+    page = renewal_queue(client, skip=1, limit=1)
+    assert ([item["title"] for item in page["items"]], page["has_more"]) == (["old"], True)
+
+    low = client.get("/api/items/queues/low-performing").json()
+    assert [item["title"] for item in low["items"]] == ["older", "old"]
+
+
+def test_renew_by_filter_keeps_the_filter_status(client):
+    upload(client, ("old", "active", 90, 0), ("sold", "sold", 200, 0))
+
+    response = client.post("/api/items/queues/renewal/renew", json={"filter": {"status": "sold"}}).json()
+    assert response["items"] == 0
+    assert renewal_queue(client)["total"] == 1
+
+
+def test_renew_whole_queue_records_events_for_renewed_items_only(client, server):
+    upload(client, ("old", "active", 90, 0), ("due", "active", 40, 0), ("fresh", "active", 5, 0))
+    ids = {item["title"]: item["id"] for item in client.get("/api/items").json()}
+
+    dry_run = client.post("/api/items/queues/renewal/renew", json={"dry_run": True}).json()
+    assert (dry_run["items"], renewal_queue(client)["total"]) == (2, 2)
+
+    response = client.post("/api/items/queues/renewal/renew", json={"item_ids": [ids["old"], ids["fresh"]]}).json()
+    assert response["items"] == 2
+    assert client.post("/api/items/queues/renewal/renew").json()["items"] == 1
+    assert renewal_queue(client)["total"] == 0
+
+    async def renewed_ids():
+        return await server.db.item_events.find({"type": "renewed"}, {"_id": 0}).to_list(None)
+    events = client.portal.call(renewed_ids)
+    assert sorted(event["meta"]["item_id"] for event in events) == sorted([ids["old"], ids["fresh"], ids["due"]])
+
+
+def test_renew_skips_items_that_stopped_being_due(client, server, monkeypatch):
+    upload(client, ("old", "active", 90, 0), ("due", "active", 40, 0))
+    ids = {item["title"]: item["id"] for item in client.get("/api/items").json()}
+
+    # "due" sells after the batch is selected but before it is renewed
+    update_many = server.db.vinted_items.update_many
+
+    async def racing_update_many(query, update):
+        await server.db.vinted_items.update_one({"id": ids["due"]}, {"$set": {"status": "sold"}})
+        return await update_many(query, update)
+
+    monkeypatch.setattr(server.db.vinted_items, "update_many", racing_update_many)
+    assert client.post("/api/items/queues/renewal/renew").json()["items"] == 1
+
+    async def renewed_ids():
+        return [event["meta"]["item_id"] async for event in server.db.item_events.find({"type": "renewed"})]
+    assert client.portal.call(renewed_ids) == [ids["old"]]
@@ -0,0 +1,36 @@
+"""Low-ROI alert thresholds."""
+from tests.conftest import item_payload
+
+
+def sell_item(client, purchase_price, sold_price, title):
+    item = client.post("/api/items", json=item_payload(title=title, purchase_price=purchase_price)).json()
+    client.put(f"/api/items/{item['id']}", json={"status": "sold", "sold_price": sold_price})
+    return item
+
+
+def alerted_titles(client):
+    return sorted(
+        notification["message"].split("'")[1]
+        for notification in client.get("/api/notifications").json()
+        # The task's alerts carry the target they were checked against
+        if notification["type"] == "profit_alert" and "target" in notification["data"]
+    )
+
+
+def test_alerts_use_20_percent_until_a_target_is_set(client):
+    sell_item(client, 10.0, 11.5, "15% ROI")
+    sell_item(client, 10.0, 12.5, "25% ROI")
+
+    assert client.post("/api/tasks/check-roi-alerts").json()["message"] == "Sent 1 ROI alerts"
+    assert alerted_titles(client) == ["15% ROI"]
+    # Checking alerts does not store a default target
+    assert client.get("/api/roi-targets/current").json()["target_percentage"] == 30.0
+
+
+def test_alerts_use_the_active_target(client):
+    client.post("/api/roi-targets", json={"target_percentage": 50.0})
+    sell_item(client, 10.0, 14.0, "40% ROI")
+    sell_item(client, 10.0, 16.0, "60% ROI")
+
+    client.post("/api/tasks/check-roi-alerts")
+    assert alerted_titles(client) == ["40% ROI"]
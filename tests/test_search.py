@@ -0,0 +1,25 @@
+"""Ranked full-text item search."""
+from tests.conftest import item_payload
+
+
+def test_search_ranks_title_matches_first_and_pages(client):
+    client.post("/api/items", json=item_payload(title="Summer dress", brand="Zara", description="pairs with a denim jacket"))
+    client.post("/api/items", json=item_payload(title="Denim jacket", brand="Levis"))
+    client.post("/api/items", json=item_payload(title="Running shoes", brand="Nike"))
+
+    page = client.get("/api/items/search", params={"q": "jackets"}).json()
+    assert [item["title"] for item in page["items"]] == ["Denim jacket", "Summer dress"]
+    assert page["items"][0]["score"] > page["items"][1]["score"]
+
+    first = client.get("/api/items/search", params={"q": "jacket", "limit": 1}).json()
+    assert ([item["title"] for item in first["items"]], first["has_more"]) == (["Denim jacket"], True)
+
+
+def test_search_filters_and_seller_scope(client):
+    client.post("/api/items", json=item_payload(title="Denim jacket", listed_price=80.0))
+    client.post("/api/items", json=item_payload(title="Denim jacket", listed_price=20.0), headers={"X-Seller-Id": "bob"})
+
+    assert client.get("/api/items/search", params={"q": "denim", "max_price": 50}).json()["items"] == []
+    bob = client.get("/api/items/search", params={"q": "denim"}, headers={"X-Seller-Id": "bob"}).json()
+    assert [item["listed_price"] for item in bob["items"]] == [20.0]
+    assert client.get("/api/items/search", params={"q": ""}).status_code == 422
@@ -0,0 +1,62 @@
+"""Slow query shapes, explain summaries and the listener that feeds the log."""
+from types import SimpleNamespace
+
+from backend.slow_queries import (
+    SlowQueryListener, SlowQueryLog, SlowQuerySettings, command_shape, redact, summarize_explain
+)
+
+
+def test_redact_keeps_fields_operators_and_paths():
+    assert redact({"seller_id": "alice", "price": {"$gte": 10, "$lte": 20}, "tags": ["a", "b"]}) == {
+        "seller_id": "?", "price": {"$gte": "?", "$lte": "?"}, "tags": ["?"]
+    }
+    assert redact({"$expr": {"$gt": ["$sold_price", "$purchase_price"]}}) == {
+        "$expr": {"$gt": ["$sold_price", "$purchase_price"]}
+    }
+
+
+def test_command_shape():
+    find = {"find": "vinted_items", "filter": {"seller_id": "alice"}, "sort": {"created_at": -1}, "limit": 5}
+    assert command_shape("find", find) == {"filter": {"seller_id": "?"}, "sort": {"created_at": -1}}
+    update = {"update": "vinted_items", "updates": [{"q": {"id": "a"}, "u": {}}, {"q": {"id": "b"}, "u": {}}]}
+    assert command_shape("update", update) == {"q": [{"id": "?"}]}
+
+
+def test_summarize_explain_flags_scans_and_examined_ratio():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"totalDocsExamined": 500, "totalKeysExamined": 0, "nReturned": 5, "executionTimeMillis": 40},
+    }
+    summary = summarize_explain(explain, ratio_threshold=10.0)
+    assert summary["stages"] == ["COLLSCAN", "SORT"]
+    assert summary["examined_ratio"] == 100.0
+    assert summary["flags"] == ["COLLSCAN", "HIGH_EXAMINED_RATIO"]
+
+
+def command_events(request_id, command, duration_ms):
+    name = next(iter(command))
+    started = SimpleNamespace(command_name=name, command=command, database_name="vinted", request_id=request_id,
+                              connection_id=("db", 27017))
+    finished = SimpleNamespace(command_name=name, request_id=request_id, connection_id=("db", 27017),
+                               duration_micros=int(duration_ms * 1000))
+    return started, finished
+
+
+def test_listener_logs_only_commands_over_the_threshold():
+    log = SlowQueryLog(SlowQuerySettings(enabled=True, threshold_ms=50.0))
+    listener = SlowQueryListener(log)
+    for request_id, duration_ms in ((1, 10.0), (2, 80.0), (3, 120.0)):
+        started, finished = command_events(request_id, {"find": "vinted_items", "filter": {"id": "x"}}, duration_ms)
+        listener.started(started)
+        listener.succeeded(finished)
+
+    assert [entry["duration_ms"] for entry in log.query()] == [120.0, 80.0]
+    assert log.query(collection="item_expenses") == []
+    [group] = log.summary()
+    assert (group["collection"], group["count"], group["total_ms"], group["max_ms"]) == ("vinted_items", 2, 200.0, 120.0)
+
+
+def test_admin_route_reports_when_disabled(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    response = client.get("/api/admin/slow-queries", headers={"X-Admin-Token": "secret"})
+    assert response.json() == {"enabled": False, "entries": [], "summary": []}
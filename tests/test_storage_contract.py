@@ -0,0 +1,244 @@
+"""Contract tests every storage backend must pass.
+
+Runs against the embedded SQLite store always, and against MongoDB when
+MONGO_URL points at a reachable server (a throwaway database is created and
+dropped per test).
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from backend.sqlite_store import SQLiteDatabase
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def run(request, tmp_path):
+    """Run an async scenario against a fresh database of the parametrized backend"""
+    backend = request.param
+    if backend == "mongo" and not os.environ.get("MONGO_URL"):
+        pytest.skip("MONGO_URL not set")
+
+    def runner(scenario):
+        async def main():
+            if backend == "sqlite":
+                db = SQLiteDatabase(str(tmp_path / "contract.db"))
+                try:
+                    await scenario(db)
+                finally:
+                    db.close()
+                return
+            from motor.motor_asyncio import AsyncIOMotorClient
+            client = AsyncIOMotorClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=2000)
+            name = f"contract_{uuid.uuid4().hex[:12]}"
+            try:
+                await client.admin.command("ping")
+            except Exception:
+                pytest.skip("MongoDB not reachable")
+            try:
+                await scenario(client[name])
+            finally:
+                await client.drop_database(name)
+                client.close()
+
+        asyncio.run(main())
+
+    return runner
+
+
+def items(count=10):
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "id": f"item-{i}",
+            "title": f"Item {i}",
+            "brand": "Zara" if i % 2 else "Nike",
+            "status": "sold" if i % 3 == 0 else "active",
+            "purchase_price": float(i),
+            "sold_price": float(i * 2) if i % 3 == 0 else None,
+            "tags": ["denim"] if i % 4 == 0 else [],
+            "created_at": base + timedelta(days=i),
+        }
+        for i in range(count)
+    ]
+
+
+def test_insert_and_find_round_trip(run):
+    async def scenario(db):
+        await db.vinted_items.create_index("id", unique=True)
+        await db.vinted_items.insert_many(items())
+        item = await db.vinted_items.find_one({"id": "item-3"}, {"_id": 0})
+        assert item["title"] == "Item 3"
+        assert item["created_at"] == datetime(2024, 1, 4)
+        assert "_id" not in item
+        with pytest.raises(DuplicateKeyError):
+            await db.vinted_items.insert_one({"id": "item-3"})
+
+    run(scenario)
+
+
+def test_query_operators(run):
+    async def scenario(db):
+        await db.vinted_items.create_index("status")
+        await db.vinted_items.insert_many(items())
+        find = db.vinted_items.find
+
+        async def ids(query):
+            return sorted(doc["id"] for doc in await find(query, {"_id": 0, "id": 1}).to_list(None))
+
+        assert await ids({"status": "sold"}) == ["item-0", "item-3", "item-6", "item-9"]
+        assert await ids({"purchase_price": {"$gte": 7, "$lt": 9}}) == ["item-7", "item-8"]
+        assert await ids({"brand": {"$regex": "^zar", "$options": "i"}, "purchase_price": {"$lt": 4}}) == ["item-1", "item-3"]
+        assert await ids({"id": {"$in": ["item-1", "item-2", "nope"]}}) == ["item-1", "item-2"]
+        assert await ids({"sold_price": None, "purchase_price": {"$lt": 3}}) == ["item-1", "item-2"]
+        assert await ids({"tags": "denim"}) == ["item-0", "item-4", "item-8"]
+        assert await ids({"$or": [{"id": "item-1"}, {"purchase_price": {"$gt": 8}}]}) == ["item-1", "item-9"]
+        assert await ids({"$expr": {"$gt": ["$sold_price", 10]}}) == ["item-6", "item-9"]
+        assert await ids({"created_at": {"$gte": datetime(2024, 1, 9)}}) == ["item-8", "item-9"]
+        assert await ids({"missing": {"$exists": True}}) == []
+        assert await db.vinted_items.count_documents({"status": {"$ne": "sold"}}) == 6
+
+    run(scenario)
+
+
+def test_sort_skip_limit(run):
+    async def scenario(db):
+        await db.vinted_items.create_index([("created_at", -1), ("id", -1)])
+        await db.vinted_items.insert_many(items())
+        page = await db.vinted_items.find({}, {"_id": 0}).sort(
+            [("created_at", -1), ("id", -1)]
+        ).skip(2).limit(3).to_list(3)
+        assert [doc["id"] for doc in page] == ["item-7", "item-6", "item-5"]
+        by_brand = await db.vinted_items.find({"status": "active"}).sort([("brand", 1), ("purchase_price", -1)]).to_list(None)
+        assert [doc["id"] for doc in by_brand][:2] == ["item-8", "item-4"]
+        streamed = [doc["id"] async for doc in db.vinted_items.find({"brand": "Nike"}).sort("id", 1)]
+        assert streamed == ["item-0", "item-2", "item-4", "item-6", "item-8"]
+
+    run(scenario)
+
+
+def test_updates(run):
+    async def scenario(db):
+        collection = db.vinted_items
+        await collection.insert_many(items(3))
+        result = await collection.update_one({"id": "item-1"}, {"$set": {"title": "Renamed"}, "$inc": {"version": 1}})
+        assert (result.matched_count, result.modified_count) == (1, 1)
+        result = await collection.update_many({"status": "active"}, {"$set": {"status": "archived"}})
+        assert result.modified_count == 2
+        updated = await collection.find_one_and_update(
+            {"id": "item-1", "version": 1}, {"$inc": {"version": 1}, "$unset": {"tags": ""}},
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+        assert updated["version"] == 2 and "tags" not in updated
+        before = await collection.find_one_and_update({"id": "item-2"}, {"$set": {"views": 5}}, projection={"_id": 0})
+        assert "views" not in before
+        assert await collection.find_one_and_update({"id": "item-1", "version": 1}, {"$inc": {"version": 1}}) is None
+
+        upserted = await collection.find_one_and_update(
+            {"is_active": True}, {"$setOnInsert": {"target": 30.0}}, projection={"_id": 0},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        assert upserted == {"is_active": True, "target": 30.0}
+
+        bulk = await collection.bulk_write([
+            UpdateOne({"id": "item-0"}, {"$inc": {"expenses_total": 5.0, "expenses_by_category.shipping": 5.0}}),
+            UpdateOne({"id": "nope"}, {"$set": {"x": 1}}),
+        ], ordered=False)
+        assert (bulk.matched_count, bulk.modified_count) == (1, 1)
+        item = await collection.find_one({"id": "item-0"})
+        assert item["expenses_by_category"] == {"shipping": 5.0}
+
+    run(scenario)
+
+
+def test_deletes(run):
+    async def scenario(db):
+        await db.notifications.create_index("data.item_id", sparse=True)
+        await db.notifications.insert_many([{"id": str(i), "data": {"item_id": f"item-{i % 3}"}} for i in range(9)])
+        assert (await db.notifications.delete_many({"data.item_id": {"$in": ["item-0", "item-1"]}})).deleted_count == 6
+        deleted = await db.notifications.find_one_and_delete({"id": "2"}, projection={"_id": 0})
+        assert deleted["data"] == {"item_id": "item-2"}
+        assert (await db.notifications.delete_one({"id": "2"})).deleted_count == 0
+        assert await db.notifications.count_documents({}) == 2
+
+    run(scenario)
+
+
+def test_partial_unique_index(run):
+    async def scenario(db):
+        await db.roi_targets.create_index(
+            "is_active", unique=True, partialFilterExpression={"is_active": True}
+        )
+        await db.roi_targets.insert_one({"id": "a", "is_active": True})
+        await db.roi_targets.insert_one({"id": "b", "is_active": False})
+        await db.roi_targets.insert_one({"id": "c", "is_active": False})
+        with pytest.raises(DuplicateKeyError):
+            await db.roi_targets.insert_one({"id": "d", "is_active": True})
+
+    run(scenario)
+
+
+def test_partial_index_with_range_filter(run):
+    async def scenario(db):
+        await db.vinted_items.create_index(
+            [("listed_at", 1)],
+            partialFilterExpression={"status": "active", "views": {"$lt": 10}},
+            name="low_performing"
+        )
+        await db.vinted_items.insert_many(items())
+        await db.vinted_items.update_many({}, {"$set": {"listed_at": datetime(2024, 1, 1)}})
+        await db.vinted_items.update_many({"purchase_price": {"$gte": 5}}, {"$set": {"views": 20}})
+        await db.vinted_items.update_many({"purchase_price": {"$lt": 5}}, {"$set": {"views": 1}})
+        found = await db.vinted_items.find(
+            {"status": "active", "views": {"$lt": 10}, "listed_at": {"$lt": datetime(2024, 2, 1)}},
+            {"_id": 0, "id": 1}
+        ).sort("id", 1).to_list(None)
+        assert [item["id"] for item in found] == ["item-1", "item-2", "item-4"]
+        assert "low_performing" in await db.vinted_items.index_information()
+
+    run(scenario)
+
+
+def test_aggregation(run):
+    async def scenario(db):
+        await db.item_expenses.insert_many([
+            {"item_id": f"item-{i % 2}", "category": "shipping" if i % 3 else "packaging", "amount": float(i)}
+            for i in range(6)
+        ])
+        groups = await db.item_expenses.aggregate([
+            {"$match": {"amount": {"$gt": 0}}},
+            {"$group": {"_id": {"item_id": "$item_id", "category": "$category"}, "total": {"$sum": "$amount"}}},
+            {"$sort": {"_id.item_id": 1, "_id.category": 1}},
+        ]).to_list(None)
+        assert groups == [
+            {"_id": {"item_id": "item-0", "category": "shipping"}, "total": 6.0},
+            {"_id": {"item_id": "item-1", "category": "packaging"}, "total": 3.0},
+            {"_id": {"item_id": "item-1", "category": "shipping"}, "total": 6.0},
+        ]
+
+    run(scenario)
+
+
+def test_text_search(run):
+    async def scenario(db):
+        await db.vinted_items.create_index(
+            [("title", "text"), ("brand", "text"), ("description", "text")],
+            weights={"title": 10, "brand": 5, "description": 1}, name="items_text_search"
+        )
+        await db.vinted_items.insert_many([
+            {"id": "1", "title": "Denim jacket", "brand": "Levis", "description": "classic"},
+            {"id": "2", "title": "Summer dress", "brand": "Zara", "description": "goes with a denim jacket"},
+            {"id": "3", "title": "Running shoes", "brand": "Nike", "description": "barely worn"},
+        ])
+        results = await db.vinted_items.find(
+            {"$text": {"$search": "jackets"}}, {"_id": 0, "id": 1, "score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})]).to_list(None)
+        assert [doc["id"] for doc in results] == ["1", "2"]
+        assert results[0]["score"] > results[1]["score"]
+        assert await db.vinted_items.count_documents({"$text": {"$search": "shoes -nike"}}) == 0
+
+    run(scenario)